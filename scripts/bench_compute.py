@@ -0,0 +1,255 @@
+"""
+[INPUT]: argparse, json, platform, statistics, time, numpy, pandas, athenaclaw.tools.compute.sandbox
+[OUTPUT]: CLI — compute 沙箱基准：固定语料 × 合成行情（1k/100k/1M bar），输出 p50/p95 延迟与内存峰值，并与基线对比
+[POS]: scripts/ 性能回归工具；exec_compute / _serialize / HELPERS 改动前后各跑一次，或用 --check 对比 bench_compute_baseline.json
+[PROTOCOL]: 变更时更新此头部，然后检查 scripts/README.md
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from athenaclaw.tools.compute.sandbox import exec_compute
+
+
+BASELINE_PATH = Path(__file__).with_name("bench_compute_baseline.json")
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+REPEATS = {"1k": 30, "100k": 10, "1m": 3}
+TIMEOUT_MS = 120_000              # 基准测的是耗时本身，不让沙箱超时截断
+DEFAULT_TOLERANCE = 0.25          # p50 比基线慢 25% 以上算回归
+MIN_DELTA_MS = 2.0                # 同时要求绝对差超过 2ms，过滤 1k 级别的计时噪声
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 语料
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    group: str
+    code: str
+    max_bars: int | None = None    # 逐窗口 Python / n×路径矩阵类用例只在较小数据上跑
+
+
+CORPUS: tuple[Case, ...] = (
+    # 指标
+    Case("latest_close", "indicator", "latest(close)"),
+    Case("rsi", "indicator", "latest(ta.rsi(close, 14))"),
+    Case("ema_cross", "indicator", "crossover(ta.ema(close, 12), ta.ema(close, 26))"),
+    Case("bbands_macd", "indicator", "{'bb': bbands(close, 20, 2), 'macd': macd(close)}"),
+    Case("atr_multi_line", "indicator", (
+        "tr = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)\n"
+        "atr = tr.rolling(14).mean()\n"
+        "{'atr': latest(atr), 'atr_pct': latest(atr / close)}"
+    )),
+    Case("rolling_zscore", "indicator", "latest(rolling_zscore(close, 50))"),
+    Case("rolling_slope_r2", "indicator", "{'slope': latest(rolling_slope(close, 30)), 'r2': latest(rolling_r2(close, 30))}"),
+    Case("rolling_apply_python", "indicator",
+         "latest(close.rolling(30).apply(lambda a: np.polyfit(np.arange(a.size), a, 1)[0], raw=True))",
+         max_bars=1_000),
+    # 重采样 / 聚合
+    Case("resample_daily", "resample", (
+        "df.set_index('date').resample('1D')"
+        ".agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).tail(5)"
+    )),
+    Case("groupby_hour_volume", "resample", "df.groupby(date.dt.hour)['volume'].mean().to_dict()"),
+    Case("returns_stats", "resample", "r = close.pct_change()\n{'mean': r.mean(), 'std': r.std(), 'skew': r.skew()}"),
+    # 回测 / 重采样统计
+    Case("backtest_ema", "backtest", (
+        "sig = (ta.ema(close, 12) > ta.ema(close, 26)).astype(int)\n"
+        "backtest(sig, df, fees=0.0005)['metrics']"
+    )),
+    Case("strategy_bootstrap", "backtest", (
+        "sig = (close > close.rolling(50).mean()).astype(int)\n"
+        "bootstrap(strategy_returns(sig, df), n=200, block=20, seed=1)"
+    ), max_bars=100_000),
+    # 大输出（序列化 / 输出治理）
+    Case("return_dataframe", "output", "df"),
+    Case("return_list", "output", "close.tolist()"),
+    Case("return_big_dict", "output", "{str(i): v for i, v in enumerate(close.tail(5000).tolist())}"),
+    Case("return_nested", "output", "[{'i': i, 'v': v, 'd': {'x': [v] * 3}} for i, v in enumerate(close.tail(300))]"),
+)
+
+
+def synthetic_ohlcv(n: int, seed: int = 42) -> pd.DataFrame:
+    """确定性的分钟级几何随机游走 OHLCV（高低价包住开收盘）。"""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.0005, n)) * close
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=n, freq="min"),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(100, 10_000, n).astype(float),
+    })
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 运行
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_case(case: Case, df: pd.DataFrame, repeat: int, warmup: int = 1) -> dict[str, Any]:
+    """先预热，再计时 repeat 次；内存单独再跑一次（tracemalloc 会拖慢计时，不与延迟混测）。"""
+    for _ in range(warmup):
+        out = exec_compute(case.code, df, {}, timeout_ms=TIMEOUT_MS)
+        if "error" in out:
+            return {"error": out["error"]}
+
+    walls: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        exec_compute(case.code, df, {}, timeout_ms=TIMEOUT_MS)
+        walls.append((time.perf_counter() - started) * 1000)
+
+    profile: dict[str, Any] = {}
+    exec_compute(case.code, df, {}, timeout_ms=TIMEOUT_MS, profile=profile, trace_memory=True)
+    return {
+        "p50_ms": round(statistics.median(walls), 3),
+        "p95_ms": round(_percentile(walls, 0.95), 3),
+        "min_ms": round(min(walls), 3),
+        "py_peak_mb": profile.get("py_peak_mb"),
+        "phases_ms": profile.get("phases_ms"),
+        "runs": repeat,
+    }
+
+
+def run_corpus(
+    sizes: list[str],
+    *,
+    cases: tuple[Case, ...] = CORPUS,
+    name_filter: str | None = None,
+    repeat: int | None = None,
+    log: Any = None,
+) -> dict[str, dict[str, Any]]:
+    """{size: {case: 结果}}；size 是 SIZES 的键。"""
+    results: dict[str, dict[str, Any]] = {}
+    for size in sizes:
+        n = SIZES[size]
+        df = synthetic_ohlcv(n)
+        results[size] = {}
+        for case in cases:
+            if name_filter and name_filter not in case.name:
+                continue
+            if case.max_bars is not None and n > case.max_bars:
+                continue
+            results[size][case.name] = run_case(case, df, repeat or REPEATS[size])
+            if log is not None:
+                log(size, case, results[size][case.name])
+    return results
+
+
+def environment() -> dict[str, Any]:
+    import os
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[dict[str, Any]]:
+    """返回 p50 相对基线变慢超过 tolerance（且绝对差 > MIN_DELTA_MS）的用例，以及新出错的用例。"""
+    regressions: list[dict[str, Any]] = []
+    for size, cases in results.items():
+        for name, row in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None or "error" in base:
+                continue
+            if "error" in row:
+                regressions.append({"size": size, "case": name, "error": row["error"]})
+                continue
+            delta = row["p50_ms"] - base["p50_ms"]
+            if delta > MIN_DELTA_MS and row["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+                regressions.append({
+                    "size": size,
+                    "case": name,
+                    "baseline_p50_ms": base["p50_ms"],
+                    "p50_ms": row["p50_ms"],
+                    "ratio": round(row["p50_ms"] / base["p50_ms"], 2),
+                })
+    return regressions
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _print_row(size: str, case: Case, row: dict[str, Any]) -> None:
+    if "error" in row:
+        print(f"{size:>5}  {case.name:<22} ERROR {row['error']}")
+        return
+    mem = row.get("py_peak_mb")
+    mem_s = f"{mem:9.2f}" if mem is not None else "      n/a"
+    print(f"{size:>5}  {case.name:<22} {row['p50_ms']:10.2f} {row['p95_ms']:10.2f} {mem_s}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="compute 沙箱基准（p50/p95 延迟与 Python 堆峰值）")
+    parser.add_argument("--sizes", default="1k,100k,1m", help="逗号分隔：1k,100k,1m")
+    parser.add_argument("--filter", default=None, help="只跑名称包含该子串的用例")
+    parser.add_argument("--repeat", type=int, default=None, help="覆盖每个规模的默认计时次数")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="基线 JSON 路径")
+    parser.add_argument("--save", action="store_true", help="把本次结果写为新基线")
+    parser.add_argument("--check", action="store_true", help="与基线对比，有回归时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="p50 允许变慢的比例，默认 0.25")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"未知规模: {', '.join(unknown)}（可选 {', '.join(SIZES)}）")
+
+    print(f"{'size':>5}  {'case':<22} {'p50_ms':>10} {'p95_ms':>10} {'peak_mb':>9}")
+    results = run_corpus(sizes, name_filter=args.filter, repeat=args.repeat, log=_print_row)
+
+    if args.save:
+        payload = {"environment": environment(), "results": results}
+        args.baseline.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n基线已写入 {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            print(f"\n基线不存在: {args.baseline}（先用 --save 生成）")
+            return 1
+        stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if stored.get("environment") != environment():
+            print(f"\n注意：基线环境不同 {stored.get('environment')} → {environment()}，对比仅供参考")
+        regressions = compare(results, stored.get("results", {}), args.tolerance)
+        if regressions:
+            print("\n回归：")
+            for item in regressions:
+                print(f"  {json.dumps(item, ensure_ascii=False)}")
+            return 1
+        print("\n无回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
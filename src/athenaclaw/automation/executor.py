@@ -133,15 +133,18 @@ class AutomationExecutor:
                 profile=task.reaction.tool_profile,
             ))
             bundle.kernel.max_rounds = task.reaction.budget.max_rounds
-            session = bundle.session_store.load()
-            session.id = f"automation:{task.id}"
-            if executor_type == "skill":
-                text = f"/skill:{task.reaction.executor.name} {rendered_prompt}".strip()
-            else:
-                text = rendered_prompt
-            reply = bundle.kernel.turn(text, session)
-            bundle.session_store.save(session)
-            return reply
+            try:
+                session = bundle.session_store.load()
+                session.id = f"automation:{task.id}"
+                if executor_type == "skill":
+                    text = f"/skill:{task.reaction.executor.name} {rendered_prompt}".strip()
+                else:
+                    text = rendered_prompt
+                reply = bundle.kernel.turn(text, session)
+                bundle.session_store.save(session)
+                return reply
+            finally:
+                bundle.close()
 
         if executor_type == "subagent":
             bundle = build_kernel_bundle(
@@ -155,12 +158,15 @@ class AutomationExecutor:
                 task_id=task.id,
                 profile=task.reaction.tool_profile,
             ))
-            system = getattr(bundle.kernel, "_subagent_system", None)
-            if system is None:
-                raise RuntimeError("当前 workspace 中没有可用 subagent")
-            context = self._build_subagent_context(task.id, event)
-            result = system.invoke(str(task.reaction.executor.name), rendered_prompt, context)
-            return result.response
+            try:
+                system = getattr(bundle.kernel, "_subagent_system", None)
+                if system is None:
+                    raise RuntimeError("当前 workspace 中没有可用 subagent")
+                context = self._build_subagent_context(task.id, event)
+                result = system.invoke(str(task.reaction.executor.name), rendered_prompt, context)
+                return result.response
+            finally:
+                bundle.close()
 
         raise RuntimeError(f"未知 executor.type: {executor_type}")
 
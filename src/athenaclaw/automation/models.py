@@ -1,6 +1,6 @@
 """
 [INPUT]: dataclasses, datetime, typing, zoneinfo
-[OUTPUT]: automation 领域模型与校验辅助
+[OUTPUT]: automation 领域模型与校验辅助；INDICATOR_FIELDS
 [POS]: 自动化子系统协议层：TaskDefinition / Draft / Run / Receipt / TriggerEvent / 校验
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
@@ -29,6 +29,23 @@ TASK_CONTEXT_VIEWS = {
     "artifact_excerpt",
 }
 
+# 快照中可用于触发/读取的数值字段（与默认指标集一一对应）
+INDICATOR_FIELDS = (
+    "close",
+    "ema_20",
+    "macd",
+    "macd_signal",
+    "macd_hist",
+    "rsi_14",
+    "atr_14",
+    "bb_upper",
+    "bb_middle",
+    "bb_lower",
+    "vwap",
+    "high_20",
+    "low_20",
+)
+
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -61,6 +78,7 @@ class PriceThresholdTrigger:
     poll_sec: int
     cooldown_sec: int = 0
     max_data_age_sec: int = 120
+    field: str = "close"
 
     def __post_init__(self) -> None:
         if self.type != "price_threshold":
@@ -77,6 +95,8 @@ class PriceThresholdTrigger:
             raise ValueError("cooldown_sec 不能小于 0")
         if self.max_data_age_sec <= 0:
             raise ValueError("max_data_age_sec 必须大于 0")
+        if self.field not in INDICATOR_FIELDS:
+            raise ValueError(f"field 必须是 {', '.join(INDICATOR_FIELDS)}")
 
 
 TriggerSpec = CronTrigger | PriceThresholdTrigger
@@ -311,6 +331,7 @@ def parse_trigger(data: dict[str, Any]) -> TriggerSpec:
             poll_sec=int(data.get("poll_sec", 0)),
             cooldown_sec=int(data.get("cooldown_sec", 0)),
             max_data_age_sec=int(data.get("max_data_age_sec", 120)),
+            field=str(data.get("field") or "close").strip().lower() or "close",
         )
     raise ValueError(f"未知 trigger.type: {raw_type!r}")
 
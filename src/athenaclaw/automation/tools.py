@@ -15,6 +15,7 @@ from typing import Any
 from athenaclaw.automation.cron import preview as cron_preview
 from athenaclaw.automation.models import (
     CONTROL_ACTIONS,
+    INDICATOR_FIELDS,
     TASK_CONTEXT_VIEWS,
     TASK_STATUSES,
     CronTrigger,
@@ -244,6 +245,7 @@ def register(
                                 "触发器定义。"
                                 "cron 写法：type='cron' + cron_expr + timezone。"
                                 "价格监控写法：type='price_threshold' + symbol + interval + condition + threshold + poll_sec。"
+                                "指标监控同样用 price_threshold，额外写 field（如 rsi_14/ema_20/macd_hist），默认 close。"
                                 "不要使用 schedule。"
                             ),
                             "properties": {
@@ -258,6 +260,11 @@ def register(
                                 "poll_sec": {"type": "integer"},
                                 "cooldown_sec": {"type": "integer"},
                                 "max_data_age_sec": {"type": "integer"},
+                                "field": {
+                                    "type": "string",
+                                    "enum": list(INDICATOR_FIELDS),
+                                    "description": "与 threshold 比较的字段；默认 close，也可用增量指标如 rsi_14",
+                                },
                             },
                         },
                         "reaction": {
@@ -590,6 +597,7 @@ def _preview(task: TaskDefinition) -> str:
         f"任务 {task.name} ({task.id})\n"
         f"- type: price_threshold\n"
         f"- symbol: {task.trigger.symbol}\n"
+        f"- field: {task.trigger.field}\n"
         f"- condition: {task.trigger.condition}\n"
         f"- threshold: {task.trigger.threshold}\n"
         f"- poll_sec: {task.trigger.poll_sec}\n"
@@ -1,7 +1,7 @@
 """
-[INPUT]: asyncio, datetime, dotenv, agent.runtime, agent.automation.*, market schema
+[INPUT]: asyncio, datetime, pandas, dotenv, agent.runtime, agent.automation.*, market schema, compute.streaming
 [OUTPUT]: AutomationWorker, main
-[POS]: 自动化 worker：周期扫描 task 定义，驱动 cron 与价格阈值任务
+[POS]: 自动化 worker：周期扫描 task 定义，驱动 cron 与价格/指标阈值任务（增量指标引擎跨 poll 复用，漏 bar 时用 history 补齐）
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
@@ -15,9 +15,11 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
+import pandas as pd
 from dotenv import load_dotenv
 
-from athenaclaw.tools.market.schema import build_market_query
+from athenaclaw.tools.compute.streaming import IndicatorEngine
+from athenaclaw.tools.market.schema import build_market_query, minute_delta
 from athenaclaw.automation.cron import SimpleCron
 from athenaclaw.automation.delivery import DiscordDeliveryChannel, TelegramDeliveryChannel, WebhookDeliveryChannel
 from athenaclaw.automation.executor import AutomationExecutor
@@ -45,6 +47,7 @@ class AutomationWorker:
             store=store,
             delivery_channels=_build_delivery_channels(),
         )
+        self._indicators = IndicatorEngine()
 
     async def run_forever(self) -> None:
         while True:
@@ -108,6 +111,14 @@ class AutomationWorker:
             state.last_success_at = run.finished_at
         state.next_fire_at = cron.next_after(next_fire, timezone=trigger.timezone).astimezone(timezone.utc).isoformat()
 
+    def _backfill(self, trigger: PriceThresholdTrigger, symbol: str) -> None:
+        history = self._market_adapter.fetch(build_market_query(
+            symbol=trigger.symbol,
+            interval=trigger.interval,
+            mode="history",
+        ))
+        self._indicators.ingest(symbol, trigger.interval, history.df)
+
     def _handle_price_threshold(self, task: TaskDefinition, state: TaskRuntimeState, now: datetime) -> None:
         trigger = task.trigger
         assert isinstance(trigger, PriceThresholdTrigger)
@@ -117,6 +128,12 @@ class AutomationWorker:
                 return
         state.last_polled_at = now.isoformat()
 
+        symbol = build_market_query(symbol=trigger.symbol, interval=trigger.interval).normalized_symbol
+        uses_indicators = trigger.field != "close"
+        if uses_indicators and not self._indicators.has(symbol, trigger.interval):
+            # 指标触发首次 poll：先用盘中 history 预热，之后每次只喂 latest bar
+            self._backfill(trigger, symbol)
+
         result = self._market_adapter.fetch(build_market_query(
             symbol=trigger.symbol,
             interval=trigger.interval,
@@ -124,13 +141,23 @@ class AutomationWorker:
         ))
         if result.df.empty:
             return
+        if uses_indicators:
+            indicator_state = self._indicators.state(symbol, trigger.interval)
+            if indicator_state is not None and _missed_bars(indicator_state.last_ts, result.df, trigger.interval):
+                # 两次 poll 之间漏了 bar：用 history 补齐（ingest 只回放 last_ts 之后的部分）
+                self._backfill(trigger, symbol)
 
         current_price = float(result.df.iloc[-1]["close"])
         as_of = str(result.as_of or "")
         if self._is_stale(as_of, now, trigger.max_data_age_sec):
             return
 
-        current_side = "above" if current_price >= trigger.threshold else "below"
+        indicators = self._indicators.ingest(symbol, trigger.interval, result.df) or {}
+        observed = current_price if trigger.field == "close" else indicators.get(trigger.field)
+        if observed is None:
+            return
+
+        current_side = "above" if observed >= trigger.threshold else "below"
         previous_side = state.last_side
         state.last_side = current_side
 
@@ -166,6 +193,9 @@ class AutomationWorker:
                 "condition": trigger.condition,
                 "threshold": trigger.threshold,
                 "current_price": current_price,
+                "field": trigger.field,
+                "current_value": observed,
+                "indicators": indicators,
                 "as_of": as_of,
                 "source": result.source,
             },
@@ -188,6 +218,16 @@ class AutomationWorker:
         return now - ts > timedelta(seconds=max_age_sec)
 
 
+def _missed_bars(last_ts: Any, df: Any, interval: str) -> bool:
+    """latest 帧的第一根 bar 与引擎最后一根之间是否隔了不止一个周期（按 bar 边界取整比较）。"""
+    if last_ts is None:
+        return False
+    step = minute_delta(interval)
+    first = pd.Timestamp(df["date"].iloc[0]).tz_localize(None)
+    last = pd.Timestamp(last_ts).tz_localize(None)
+    return first.floor(step) - last.floor(step) > step
+
+
 def _parse_dt(text: str, fallback_tz) -> datetime:
     raw = str(text or "").strip()
     if not raw:
@@ -484,6 +484,10 @@ def main() -> None:
                 show_process_messages=show_process_messages,
             )
 
+        async def close(self) -> None:
+            self._driver.close()
+            await super().close()
+
         async def on_interaction(self, interaction: Any) -> None:
             handled = await _handle_command_interaction(
                 interaction=interaction,
@@ -152,7 +152,7 @@ class IMDriver:
                 base = turn_input if isinstance(turn_input, TurnInput) else TurnInput(text=str(turn_input))
                 turn_input = TurnInput(text=base.text, attachments=base.attachments, refs=refs)
             try:
-                reply = await asyncio.to_thread(chat.bundle.kernel.turn, turn_input, chat.session)
+                reply = await self._run_turn(chat, turn_input)
             except Exception as exc:
                 await self._backend.send_text(msg.conversation_id, f"发生错误: {type(exc).__name__}: {exc}")
                 return
@@ -182,6 +182,14 @@ class IMDriver:
                 if chunk:
                     await self._backend.send_text(msg.conversation_id, chunk)
 
+    async def _run_turn(self, chat: ChatState, turn_input: str | TurnInput) -> str:
+        """优先走 Kernel.aturn（原生异步、可取消）；只有同步 turn 的 kernel 退回线程。"""
+        kernel = chat.bundle.kernel
+        aturn = getattr(kernel, "aturn", None)
+        if aturn is not None:
+            return await aturn(turn_input, chat.session)
+        return await asyncio.to_thread(kernel.turn, turn_input, chat.session)
+
     async def _typing_heartbeat(self, conversation_id: str) -> None:
         while True:
             try:
@@ -278,6 +286,12 @@ class IMDriver:
             "未知命令。可用: /start /help /new /reset /compact /context /status",
         )
 
+    def close(self) -> None:
+        """关闭所有会话的 bundle（trace 写入线程等），适配器退出时调用。"""
+        chats, self._chats = self._chats, {}
+        for chat in chats.values():
+            chat.bundle.close()
+
     async def _get_or_create_chat(self, conversation_id: str) -> ChatState:
         existing = self._chats.get(conversation_id)
         if existing is not None:
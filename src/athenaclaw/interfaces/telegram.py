@@ -502,7 +502,10 @@ def main() -> None:
 
     # polling
     # drop_pending_updates 等价于 deleteWebhook(drop_pending_updates=...)
-    app.run_polling(drop_pending_updates=drop_pending, allowed_updates=["message", "callback_query"])
+    try:
+        app.run_polling(drop_pending_updates=drop_pending, allowed_updates=["message", "callback_query"])
+    finally:
+        driver.close()
 
 
 if __name__ == "__main__":
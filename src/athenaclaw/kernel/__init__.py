@@ -1,3 +1,4 @@
+from athenaclaw.kernel.events import AsyncSubscriber, EventBus
 from athenaclaw.kernel.models import (
     DataStore,
     ExecutionContext,
@@ -9,16 +10,20 @@ from athenaclaw.kernel.models import (
     ToolDef,
 )
 from athenaclaw.kernel.prompts import AUTOMATION_GUIDE, SEED_PROMPT, TRADE_GUIDE, WORKSPACE_GUIDE
+from athenaclaw.kernel.results import ResultStore
 from athenaclaw.kernel.service import Kernel
 
 __all__ = [
     "AUTOMATION_GUIDE",
+    "AsyncSubscriber",
     "DataStore",
+    "EventBus",
     "ExecutionContext",
     "Kernel",
     "MEMORY_MAX_CHARS",
     "MemoryCompressor",
     "Permission",
+    "ResultStore",
     "SEED_PROMPT",
     "Session",
     "TRADE_GUIDE",
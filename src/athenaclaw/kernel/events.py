@@ -0,0 +1,255 @@
+"""
+[INPUT]: collections, fnmatch, re, threading, time
+[OUTPUT]: EventBus — wire/emit 分发器（模式预编译 + 按事件名缓存路由）；AsyncSubscriber — 后台线程消费的订阅者（有界队列 + 溢出策略，可限定只丢高频增量）；OVERFLOW_POLICIES；merge_delta
+[POS]: kernel 事件层：Kernel.wire/emit 的实现；慢订阅者（trace 落盘等）挂成 AsyncSubscriber，emit 只入队，不阻塞模型流
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import deque
+from fnmatch import translate
+from typing import Any, Callable
+
+
+Handler = Callable[[str, Any], Any]
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+_WILDCARDS = frozenset("*?[")
+_MAX_ROUTES = 4096                # 事件名含路径（write:xxx.md）时防止路由缓存无限增长
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 异步订阅者
+# ─────────────────────────────────────────────────────────────────────────────
+
+def merge_delta(old: Any, new: Any) -> Any:
+    """coalesce 的默认合并：流式增量（带 content 字符串的 dict）拼接 content，其余事件保留最新一条。"""
+    if (
+        isinstance(old, dict) and isinstance(new, dict)
+        and isinstance(old.get("content"), str) and isinstance(new.get("content"), str)
+    ):
+        return {**new, "content": old["content"] + new["content"]}
+    return new
+
+
+class AsyncSubscriber:
+    """
+    在独立后台线程里调用 handler 的订阅者；emit 侧只做一次入队，永不阻塞。
+
+    队列满时按 overflow 处理：
+    - drop_oldest：丢弃最早的待处理事件（默认，适合只关心最新状态的消费者）
+    - drop_newest：丢弃刚到的事件
+    - coalesce：与队列中最近一条同名事件合并（merge(old, new)，默认拼接 llm.chunk 之类的增量）；
+      没有同名事件可合并时退化为 drop_oldest
+
+    lossy 为事件名模式元组时，只有匹配的事件（高频增量）会被丢弃 / 合并；其余事件（生命周期、审计）
+    到达时挤掉最早一条可丢事件，没有可丢的也照样入队（此时队列允许超出 maxsize）。
+    lossy=None 表示所有事件都可丢。
+
+    handler 看到的是 emit 时的对象引用，不做拷贝；handler 抛出的异常只计数，不影响其他订阅者。
+    """
+
+    def __init__(
+        self,
+        handler: Handler,
+        *,
+        maxsize: int = 1024,
+        overflow: str = "drop_oldest",
+        merge: Callable[[Any, Any], Any] = merge_delta,
+        lossy: tuple[str, ...] | None = None,
+        name: str | None = None,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知溢出策略: {overflow}（可选 {', '.join(OVERFLOW_POLICIES)}）")
+        if maxsize < 1:
+            raise ValueError("maxsize 必须 ≥ 1")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.merge = merge
+        self._lossy = None if lossy is None else [_compile(pattern) for pattern in lossy]
+        self.name = name or getattr(handler, "__qualname__", "subscriber")
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self._queue: deque[list[Any]] = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    def __call__(self, event: str, data: Any = None) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._queue) >= self.maxsize and not self._make_room(event, data):
+                return
+            self._queue.append([event, data])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"event:{self.name}", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _is_lossy(self, event: str) -> bool:
+        return self._lossy is None or any(match(event) for match in self._lossy)
+
+    def _evict_lossy(self) -> bool:
+        """丢掉最早一条可丢事件；没有可丢事件返回 False。"""
+        if self._lossy is None:
+            self._queue.popleft()
+            self.dropped += 1
+            return True
+        for i, item in enumerate(self._queue):
+            if self._is_lossy(item[0]):
+                del self._queue[i]
+                self.dropped += 1
+                return True
+        return False
+
+    def _make_room(self, event: str, data: Any) -> bool:
+        """队列已满；返回 False 表示新事件已被吸收（丢弃或合并），无需再入队。"""
+        if not self._is_lossy(event):
+            self._evict_lossy()
+            return True
+        if self.overflow == "drop_newest":
+            self.dropped += 1
+            return False
+        if self.overflow == "coalesce":
+            for item in reversed(self._queue):
+                if item[0] == event:
+                    item[1] = self.merge(item[1], data)
+                    self.coalesced += 1
+                    return False
+        if self._evict_lossy():
+            return True
+        self.dropped += 1
+        return False
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                event, data = self._queue.popleft()
+                self._busy = True
+            try:
+                self.handler(event, data)
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + int(self._busy)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """等待已入队事件处理完；超时返回 False。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """处理完剩余事件后停止后台线程；之后到达的事件直接忽略。"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "pending": self.pending,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 分发器
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _compile(pattern: str) -> Callable[[str], bool]:
+    """无通配符的模式直接比较字符串；有通配符的按 fnmatchcase 语义预编译成正则。"""
+    if _WILDCARDS.isdisjoint(pattern):
+        return pattern.__eq__
+    match = re.compile(translate(pattern)).match
+    return lambda event: match(event) is not None
+
+
+class EventBus:
+    """
+    wire/emit 分发：每个事件名第一次出现时按注册顺序匹配一次全部模式，结果缓存为 handler 元组；
+    之后同名事件（llm.chunk 等高频增量）只需一次 dict 查找。订阅变化时清空缓存。
+
+    handler 调用顺序与旧实现一致：按模式首次注册顺序，同一模式内按追加顺序。
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[Handler]] = {}
+        self._matchers: dict[str, Callable[[str], bool]] = {}
+        self._routes: dict[str, tuple[Handler, ...]] = {}
+        self._async: list[AsyncSubscriber] = []
+
+    def subscribe(self, pattern: str, handler: Handler) -> None:
+        if pattern not in self._handlers:
+            self._handlers[pattern] = []
+            self._matchers[pattern] = _compile(pattern)
+        self._handlers[pattern].append(handler)
+        if isinstance(handler, AsyncSubscriber) and handler not in self._async:
+            self._async.append(handler)
+        self._routes = {}
+
+    def route(self, event: str) -> tuple[Handler, ...]:
+        handlers = self._routes.get(event)
+        if handlers is None:
+            handlers = tuple(
+                h
+                for pattern, hs in self._handlers.items()
+                if self._matchers[pattern](event)
+                for h in hs
+            )
+            routes = self._routes
+            if len(routes) >= _MAX_ROUTES:
+                routes.clear()
+            routes[event] = handlers
+        return handlers
+
+    def publish(self, event: str, data: Any = None) -> None:
+        """按缓存路由依次调用 handler；Kernel.emit 的唯一分发路径。"""
+        for handler in self.route(event):
+            handler(event, data)
+
+    @property
+    def patterns(self) -> tuple[str, ...]:
+        return tuple(self._handlers)
+
+    @property
+    def subscribers(self) -> tuple[AsyncSubscriber, ...]:
+        return tuple(self._async)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """等所有异步订阅者处理完已入队事件（测试、落盘前、进程退出前调用）。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ok = True
+        for sub in self._async:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ok = sub.flush(remaining) and ok
+        return ok
@@ -0,0 +1,175 @@
+"""
+[INPUT]: hashlib, json, re, collections, pathlib
+[OUTPUT]: ResultStore — 会话级大结果存储（内存 + 可选落盘目录）；result_handle_preview — 写入 history 的紧凑预览；referenced_handles；HANDLE_PATTERN
+[POS]: kernel 上下文治理：超过阈值的工具结果不再内联进 history，只留预览 + 句柄，由 result_get 工具按需分页读取
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable
+
+
+HANDLE_PATTERN = re.compile(r"\bres_[0-9a-f]{12}\b")
+PREVIEW_CHARS = 1200
+MAX_MEMORY_BYTES = 64 * 1024 * 1024     # 内存中 blob 总量上限；已落盘的 blob 可被淘汰后再从磁盘读回
+_MAX_KEYS = 30
+
+
+def _render(result: Any) -> str:
+    """结果 → 可分页的文本：字符串原样保存，其余按缩进 JSON（非 ASCII 不转义，便于按行检索）。"""
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, default=str, ensure_ascii=False, indent=1)
+
+
+class ResultStore:
+    """
+    会话级 blob 存储：句柄 = 内容哈希（同一结果重复出现只存一份）。
+
+    root 为 None 时纯内存，超出 max_bytes 按最久未用淘汰；绑定 root 后 persist() 把 blob 写成
+    root/<handle>.txt，淘汰只丢内存副本，get() 未命中时回退读盘 —— 会话重载后旧句柄仍然可读。
+    """
+
+    def __init__(self, root: Path | None = None, max_bytes: int = MAX_MEMORY_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._blobs: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._dirty: set[str] = set()
+
+    def __contains__(self, handle: str) -> bool:
+        return handle in self._blobs or self._path(handle) is not None
+
+    def _path(self, handle: str) -> Path | None:
+        if self.root is None or not HANDLE_PATTERN.fullmatch(handle):
+            return None
+        path = self.root / f"{handle}.txt"
+        return path if path.exists() else None
+
+    def put(self, result: Any) -> tuple[str, str]:
+        """存入结果，返回 (handle, 文本)。"""
+        text = _render(result)
+        handle = "res_" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        if handle not in self._blobs:
+            self._blobs[handle] = text
+            self._bytes += len(text)
+            self._dirty.add(handle)
+        self._blobs.move_to_end(handle)
+        self._evict()
+        return handle, text
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._blobs) > 1:
+            handle, text = next(iter(self._blobs.items()))
+            if handle in self._dirty and self.root is not None:
+                self._write(handle, text)
+            del self._blobs[handle]
+            self._dirty.discard(handle)
+            self._bytes -= len(text)
+
+    def get(self, handle: str) -> str | None:
+        text = self._blobs.get(handle)
+        if text is not None:
+            self._blobs.move_to_end(handle)
+            return text
+        path = self._path(handle)
+        return path.read_text(encoding="utf-8") if path is not None else None
+
+    def _write(self, handle: str, text: str) -> None:
+        assert self.root is not None
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / f"{handle}.txt").write_text(text, encoding="utf-8")
+
+    def persist(self, root: Path | None = None, keep: Iterable[str] | None = None) -> None:
+        """
+        把未落盘的 blob 写到 root；keep 不为 None 时删除不在其中的 blob（内存与磁盘），
+        用于会话保存时清掉已被压缩出 history 的句柄。
+        """
+        if root is not None:
+            if root != self.root:
+                self._dirty.update(self._blobs)
+            self.root = root
+        if keep is not None:
+            keep = set(keep)
+            for handle in [h for h in self._blobs if h not in keep]:
+                self._bytes -= len(self._blobs.pop(handle))
+                self._dirty.discard(handle)
+            if self.root is not None and self.root.exists():
+                for path in self.root.glob("res_*.txt"):
+                    if path.stem not in keep:
+                        path.unlink(missing_ok=True)
+        if self.root is None:
+            return
+        for handle in sorted(self._dirty):
+            if handle in self._blobs:
+                self._write(handle, self._blobs[handle])
+        self._dirty.clear()
+
+    def page(self, handle: str, offset: int = 0, limit: int = 8000) -> dict[str, Any]:
+        """按字符区间读取；返回 content / total_chars / next_offset（读完时不含）。"""
+        text = self.get(handle)
+        if text is None:
+            return {"error": f"句柄不存在或已过期: {handle}"}
+        total = len(text)
+        start = max(0, int(offset))
+        if start >= total and total:
+            return {"error": f"offset {start} 超出范围（共 {total} 字符）"}
+        end = min(total, start + max(1, int(limit)))
+        out: dict[str, Any] = {"handle": handle, "content": text[start:end], "offset": start, "total_chars": total}
+        if end < total:
+            out["next_offset"] = end
+        return out
+
+    def search(self, handle: str, pattern: str, max_lines: int = 200) -> dict[str, Any]:
+        """按正则检索行（1-indexed 行号），适合在大日志 / 大表里定位。"""
+        text = self.get(handle)
+        if text is None:
+            return {"error": f"句柄不存在或已过期: {handle}"}
+        try:
+            regex = re.compile(pattern)
+        except re.error as exc:
+            return {"error": f"pattern 不是合法正则: {exc}"}
+        matches: list[str] = []
+        total = 0
+        for number, line in enumerate(text.split("\n"), 1):
+            if regex.search(line):
+                total += 1
+                if len(matches) < max_lines:
+                    matches.append(f"{number}| {line}")
+        out: dict[str, Any] = {"handle": handle, "matches": matches, "match_count": total}
+        if total > len(matches):
+            out["truncated"] = True
+        return out
+
+
+def result_handle_preview(handle: str, text: str, result: Any, *, source: str) -> dict[str, Any]:
+    """写进 history 的占位：句柄 + 规模 + 开头预览（dict 结果附顶层键名）。"""
+    preview: dict[str, Any] = {
+        "_offloaded": True,
+        "handle": handle,
+        "source": source,
+        "total_chars": len(text),
+        "total_lines": text.count("\n") + 1,
+    }
+    if isinstance(result, dict):
+        preview["keys"] = [str(k) for k in list(result)[:_MAX_KEYS]]
+    preview["preview"] = text[:PREVIEW_CHARS] + ("…" if len(text) > PREVIEW_CHARS else "")
+    preview["note"] = "完整结果未放入上下文。需要细节时用 result_get(handle, offset, limit) 分页读取，或传 pattern 按行检索。"
+    return preview
+
+
+def referenced_handles(history: Iterable[dict]) -> set[str]:
+    """history 中 tool 消息仍引用的句柄（会话保存时据此清理无主 blob）。"""
+    handles: set[str] = set()
+    for message in history:
+        if message.get("role") == "tool":
+            content = message.get("content")
+            if isinstance(content, str) and "res_" in content:
+                handles.update(HANDLE_PATTERN.findall(content))
+    return handles
@@ -1,25 +1,31 @@
 """
-[INPUT]: json, pathlib, shutil, enum, agent.skills, agent.subagents, agent.messages, agent.providers (LLMProvider/LLMResult/LLMToolCall/OpenAIChatProvider)
-[OUTPUT]: Kernel — 核心协调器（_do_llm_call 统一入口 + _stream_complete 流式 + tool policy + per-turn execution context + skill 合约验证 + 降级事件）；Session — 会话容器（含 summary 摘要）；DataStore — 数据注册表；Permission — 文件权限级别；MemoryCompressor — 压缩策略接口；MEMORY_MAX_CHARS；WORKSPACE_GUIDE；EVOLUTION_GUIDE；skill_invoke
+[INPUT]: json, pathlib, shutil, enum, kernel.events (EventBus/AsyncSubscriber), agent.skills, agent.subagents, agent.messages, agent.providers (LLMProvider/LLMResult/LLMToolCall/OpenAIChatProvider)
+[OUTPUT]: Kernel — 核心协调器（turn / aturn 共用 _turn_flow + _do_llm_call 统一入口 + _stream_complete 流式 + tool policy + 同轮 parallel_safe 工具并发（流式时参数完整即提前启动） + per-turn execution context + skill 合约验证 + 降级事件）；Session — 会话容器（含 summary 摘要）；DataStore — 数据注册表；Permission — 文件权限级别；MemoryCompressor — 压缩策略接口；MEMORY_MAX_CHARS；WORKSPACE_GUIDE；EVOLUTION_GUIDE；skill_invoke
 [POS]: agent 包核心，系统唯一协调中心：ReAct loop + 声明式 wire/emit + DataStore + 权限 + 自举 + Skill Engine + SubAgent System + stream/非 stream 双轨 LLM 调用
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
 import os
 import shutil
-from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as futures_wait
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 from fnmatch import fnmatch
 from pathlib import Path
-from typing import Any, Callable, Protocol
+from typing import Any, Awaitable, Callable, Generator, Protocol
 
+from athenaclaw.kernel.events import AsyncSubscriber, EventBus
+from athenaclaw.kernel.results import ResultStore, referenced_handles, result_handle_preview
+from athenaclaw.llm.context import TokenCounter, TokenLedger, message_tokens
 from athenaclaw.llm.messages import ContextRef, TurnInput, build_user_message, ensure_turn_input, normalize_history, render_turn_input
-from athenaclaw.llm.providers import LLMProvider, LLMResult, LLMToolCall, OpenAIChatProvider
+from athenaclaw.llm.providers import LLMProvider, LLMResult, LLMToolCall, OpenAIChatProvider, usage_fields
 from athenaclaw.skills import (
     Skill,
     build_available_skills_prompt,
@@ -39,6 +45,11 @@ from athenaclaw.subagents.system import SubAgentSystem
 
 MEMORY_MAX_CHARS = 100_000
 
+SUMMARY_HEADER = (
+    "## 前段对话摘要\n"
+    "以下是之前对话的压缩摘要，不是新消息。基于此背景继续对话：\n\n"
+)
+
 WORKSPACE_GUIDE = """\
 <workspace>
 你的工作区是你长期成长的外部器官。你不只是完成当前这次回复，也要在反复协作中越来越懂这位用户，越来越贴合他的需求。
@@ -244,13 +255,25 @@ class Permission(Enum):
 # Session
 # ─────────────────────────────────────────────────────────────────────────────
 
+def results_dir(session_path: Path) -> Path:
+    """会话 JSON 旁的大结果目录：sessions/cli/x.json → sessions/cli/x.results/"""
+    return session_path.with_suffix(".results")
+
+
 class Session:
-    """会话容器 — 维护完整消息历史 + 对话摘要 + 持久化"""
+    """会话容器 — 维护完整消息历史 + 对话摘要 + 增量 token 账本 + 持久化"""
 
     def __init__(self, session_id: str = "default") -> None:
         self.id = session_id
         self.history: list[dict] = []
         self.summary: str | None = None
+        self.tokens = TokenLedger()
+        self.results = ResultStore()
+        self.pending_compaction: tuple[Future, list[dict], int] | None = None  # 后台预压缩：(future, history 快照, 提交时 token 数)
+
+    def history_tokens(self, counter: TokenCounter | None = None) -> int:
+        """history 的 token 估算；只为上次调用之后追加的消息计数（不持久化）。"""
+        return self.tokens.sync(self.history, counter)
 
     def save(self, path: Path) -> None:
         """持久化到 JSON"""
@@ -261,6 +284,7 @@ class Session:
         path.write_text(json.dumps(
             data, ensure_ascii=False, indent=2,
         ), encoding="utf-8")
+        self.results.persist(results_dir(path), keep=referenced_handles(self.history))
 
     @classmethod
     def load(cls, path: Path) -> Session:
@@ -269,6 +293,7 @@ class Session:
         session = cls(session_id=data["id"])
         session.history = normalize_history(data["history"])
         session.summary = data.get("summary")
+        session.results = ResultStore(root=results_dir(path))
         session.repair()
         return session
 
@@ -320,6 +345,7 @@ class ExecutionContext:
     """单轮执行上下文。"""
 
     refs: tuple[ContextRef, ...] = ()
+    results: ResultStore | None = None      # 当前会话的大结果存储（result_get 从这里读）
 
     def first_ref(self, kind: str) -> ContextRef | None:
         for ref in self.refs:
@@ -332,12 +358,146 @@ class ExecutionContext:
 # Kernel
 # ─────────────────────────────────────────────────────────────────────────────
 
+async def _awaited(awaitable: Awaitable[Any]) -> Any:
+    return await awaitable
+
+
+class _StreamAccumulator:
+    """流式 chunk → LLMResult：拼接文本 / reasoning / 工具调用增量，推送 llm.chunk，并驱动工具提前执行。"""
+
+    def __init__(self, kernel: Kernel, round_num: int) -> None:
+        self.kernel = kernel
+        self.round_num = round_num
+        self.parts: list[str] = []
+        self.reasoning_parts: list[str] = []
+        self.tc_acc: dict[int, dict] = {}
+        self.finish_reason = "stop"
+        self.usage: Any = None
+        self.early = _EarlyDispatch(kernel) if kernel.tool_workers > 1 else None
+
+    def feed(self, chunk: Any) -> None:
+        # 部分 provider 在末尾 chunk（choices 为空）里附带 usage
+        self.usage = getattr(chunk, "usage", None) or self.usage
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta
+        if chunk.choices[0].finish_reason:
+            self.finish_reason = chunk.choices[0].finish_reason
+        if getattr(delta, "content", None):
+            self.parts.append(delta.content)
+            self.kernel.emit("llm.chunk", {"content": delta.content, "round": self.round_num})
+        reasoning_piece = getattr(delta, "reasoning_content", None)
+        if reasoning_piece is None:
+            model_extra = getattr(delta, "model_extra", None)
+            if isinstance(model_extra, dict):
+                reasoning_piece = model_extra.get("reasoning_content")
+        if reasoning_piece:
+            self.reasoning_parts.append(str(reasoning_piece))
+        if getattr(delta, "tool_calls", None):
+            tc_acc = self.tc_acc
+            for tc in delta.tool_calls:
+                idx = tc.index
+                if idx not in tc_acc:
+                    tc_acc[idx] = {"id": "", "name": "", "arguments": ""}
+                if tc.id:
+                    tc_acc[idx]["id"] = tc.id
+                if tc.function:
+                    if tc.function.name:
+                        tc_acc[idx]["name"] = tc.function.name
+                    if tc.function.arguments:
+                        tc_acc[idx]["arguments"] += tc.function.arguments
+            if self.early is not None:
+                self.early.advance(tc_acc)
+
+    def result(self) -> LLMResult:
+        if self.early is not None:
+            self.kernel._early_tools = self.early.close()
+
+        msg: dict[str, Any] = {"role": "assistant", "content": "".join(self.parts) or None}
+        tool_calls: list[LLMToolCall] = []
+        for v in self.tc_acc.values():
+            msg.setdefault("tool_calls", []).append({
+                "id": v["id"], "type": "function",
+                "function": {"name": v["name"], "arguments": v["arguments"]},
+            })
+            tool_calls.append(LLMToolCall(id=v["id"], name=v["name"], arguments=v["arguments"]))
+        if self.reasoning_parts:
+            msg["reasoning_content"] = "".join(self.reasoning_parts)
+        elif tool_calls:
+            # Keep streamed tool-call messages compatible with providers that
+            # require reasoning_content when thinking is enabled.
+            msg["reasoning_content"] = ""
+
+        return LLMResult(
+            assistant_message=msg,
+            finish_reason=self.finish_reason,
+            tool_calls=tool_calls,
+            **usage_fields(self.usage),
+        )
+
+
+class _EarlyDispatch:
+    """
+    流式阶段的工具提前执行：某个调用的 arguments 已是完整 JSON 对象时立即提交到线程池，
+    与模型继续生成后续内容重叠。
+
+    只处理消息开头连续的 parallel_safe 调用：一旦出现非 parallel_safe / 未知工具，后续调用都留给
+    _run_tool_calls 按原有批次与屏障语义执行，保证不会越过屏障提前运行。
+    """
+
+    def __init__(self, kernel: Kernel) -> None:
+        self.kernel = kernel
+        self.started: dict[str, tuple[dict, Future]] = {}
+        self._next = 0
+        self._blocked = False
+        self._pool: ThreadPoolExecutor | None = None
+
+    def advance(self, tc_acc: dict[int, dict]) -> None:
+        while not self._blocked and self._next in tc_acc:
+            entry = tc_acc[self._next]
+            if not entry["id"] or not entry["name"]:
+                return
+            tool_def = self.kernel._tools.get(entry["name"])
+            if tool_def is None or not tool_def.parallel_safe:
+                self._blocked = True
+                return
+            raw = entry["arguments"].rstrip()
+            if not raw.endswith("}"):
+                return
+            try:
+                args = json.loads(raw)
+            except json.JSONDecodeError:
+                return
+            if not isinstance(args, dict):
+                self._blocked = True
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.kernel.tool_workers, thread_name_prefix="tool-early")
+            self.kernel.emit("tool.call.start", {"name": entry["name"], "args": args, "early": True})
+            future = self._pool.submit(self.kernel._call_tool, entry["name"], tool_def, args)
+            self.started[entry["id"]] = (args, future)
+            self._next += 1
+
+    def close(self) -> dict[str, tuple[dict, Future]]:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        return self.started
+
+
 @dataclass
 class ToolDef:
-    """工具定义：名称 + OpenAI schema + 处理函数"""
+    """
+    工具定义：名称 + OpenAI schema + 处理函数。
+
+    parallel_safe=True 表示同一轮里可与其他 parallel_safe 调用并发执行：
+    handler 只做 I/O 或线程安全的写入，不弹确认、不依赖同轮其他调用的副作用顺序。
+    offloadable=False 表示结果总是内联、不转存为句柄（result_get 这类本身就在读句柄的工具）。
+    """
     name: str
     schema: dict
     handler: Callable
+    parallel_safe: bool = False
+    offloadable: bool = True
 
 
 class Kernel:
@@ -356,20 +516,29 @@ class Kernel:
         max_rounds: int = 15,
         context_window: int = 100_000,
         compact_recent_turns: int = 3,
+        tool_workers: int = 4,
     ) -> None:
         self.model = model
         self.max_rounds = max_rounds
+        self.tool_workers = tool_workers
+        self.result_inline_chars: int | None = None  # 工具结果序列化后超过该长度即转存为句柄；None → 全部内联
+        self.token_counter: TokenCounter | None = None  # None → 字节 // 4 粗估；bundle 在装了 tiktoken 时换成真实 tokenizer
+        self._prefix_tokens: tuple[tuple, int] | None = None  # ((counter, 前缀各条内容), token 数)：前缀不变时不重复计数
         self.context_window = context_window
         self.compact_recent_turns = compact_recent_turns
+        self.precompact_ratio: float | None = None  # 软水位：turn 结束时超过 context_window × ratio 即后台预压缩；None → 关闭
+        self._precompact_pool: ThreadPoolExecutor | None = None
         self.provider = provider or OpenAIChatProvider(
             base_url=base_url,
             api_key=api_key,
         )
         self.client = getattr(self.provider, "client", None)
         self.stream = False
+        self.stream_usage = True  # 流式请求带 stream_options.include_usage；provider 拒绝该参数时自动关闭
         self.data = DataStore()
         self._tools: dict[str, ToolDef] = {}
-        self._wires: defaultdict[str, list[Callable]] = defaultdict(list)
+        self._schema_cache: list[dict] | None = None
+        self._events = EventBus()
         self._permissions: dict[str, Permission] = {}
         self._system_prompt: str | None = None
         self._workspace: Path | None = None
@@ -379,6 +548,7 @@ class Kernel:
         self._subagent_system: SubAgentSystem | None = None
         self._tool_policy: ToolAccessPolicy | None = None
         self._execution_context = ExecutionContext()
+        self._early_tools: dict[str, tuple[dict, Future]] = {}
 
     @property
     def client(self) -> Any | None:
@@ -766,6 +936,7 @@ class Kernel:
                 schema=tool_info["schema"],
                 handler=tool_info["handler"],
             )
+        self._schema_cache = None
 
     def subagent(self, defn: SubAgentDef) -> dict[str, str] | None:
         """API 入口：程序化注册 SubAgent。返回 None 成功，dict 失败"""
@@ -792,8 +963,11 @@ class Kernel:
         description: str,
         parameters: dict,
         handler: Callable,
+        *,
+        parallel_safe: bool = False,
+        offloadable: bool = True,
     ) -> None:
-        """注册工具"""
+        """注册工具；parallel_safe / offloadable 见 ToolDef"""
         schema = {
             "type": "function",
             "function": {
@@ -802,7 +976,10 @@ class Kernel:
                 "parameters": parameters,
             },
         }
-        self._tools[name] = ToolDef(name=name, schema=schema, handler=handler)
+        self._tools[name] = ToolDef(
+            name=name, schema=schema, handler=handler, parallel_safe=parallel_safe, offloadable=offloadable,
+        )
+        self._schema_cache = None
 
     # ── 权限 ──────────────────────────────────────────────────────────────────
 
@@ -837,19 +1014,54 @@ class Kernel:
 
     # ── 声明式管道 ────────────────────────────────────────────────────────────
 
-    def wire(self, pattern: str, handler: Callable) -> None:
-        """注册管道处理器（支持 fnmatch 模式）"""
-        self._wires[pattern].append(handler)
+    def wire(
+        self,
+        pattern: str,
+        handler: Callable,
+        *,
+        background: bool = False,
+        maxsize: int = 1024,
+        overflow: str = "drop_oldest",
+    ) -> Callable:
+        """
+        注册管道处理器（支持 fnmatch 模式），返回实际挂上的 handler。
+
+        background=True 时包成 AsyncSubscriber：在后台线程消费，emit 只入队，
+        队列满时按 overflow（drop_oldest / drop_newest / coalesce）处理。
+        同一个 AsyncSubscriber 实例可以直接传给多次 wire，共享一个队列与线程。
+        """
+        if background and not isinstance(handler, AsyncSubscriber):
+            handler = AsyncSubscriber(handler, maxsize=maxsize, overflow=overflow)
+        self._events.subscribe(pattern, handler)
+        return handler
 
     def emit(self, event: str, data: Any = None) -> None:
-        """触发匹配的管道处理器"""
-        for pattern, handlers in self._wires.items():
-            if fnmatch(event, pattern):
-                for h in handlers:
-                    h(event, data)
+        """触发匹配的管道处理器（路由按事件名缓存；异步订阅者只入队）"""
+        self._events.publish(event, data)
+
+    def flush_events(self, timeout: float | None = 5.0) -> bool:
+        """等待后台订阅者处理完已入队的事件；超时返回 False。"""
+        return self._events.flush(timeout)
 
     # ── LLM 调用 ─────────────────────────────────────────────────────────────
 
+    def _llm_call_done(self, round_num: int, result: LLMResult) -> LLMResult:
+        self.emit("llm.call.done", {
+            "round": round_num,
+            "finish_reason": result.finish_reason,
+            "total_tokens": result.usage_total_tokens,
+            "prompt_tokens": result.usage_prompt_tokens,
+            "cached_tokens": result.usage_cached_tokens,
+        })
+        return result
+
+    def _llm_call_error(self, round_num: int, exc: Exception) -> None:
+        self.emit("llm.call.error", {
+            "round": round_num,
+            "error_type": type(exc).__name__,
+            "error": str(exc),
+        })
+
     def _do_llm_call(
         self,
         *,
@@ -859,6 +1071,7 @@ class Kernel:
         tools: list[dict] | None,
     ) -> LLMResult:
         """LLM 调用统一入口：stream / 非 stream 双轨，返回统一 LLMResult。"""
+        self._early_tools = {}
         self.emit("llm.call.start", {"round": round_num})
 
         try:
@@ -872,29 +1085,54 @@ class Kernel:
                     model=model, messages=messages, tools=tools,
                 )
         except Exception as exc:
-            self.emit("llm.call.error", {
-                "round": round_num,
-                "error_type": type(exc).__name__,
-                "error": str(exc),
-            })
+            self._llm_call_error(round_num, exc)
             raise
 
-        self.emit("llm.call.done", {
-            "round": round_num,
-            "finish_reason": result.finish_reason,
-            "total_tokens": result.usage_total_tokens,
-        })
-        return result
+        return self._llm_call_done(round_num, result)
 
-    def _stream_complete(
+    async def _ado_llm_call(
         self,
         *,
+        round_num: int,
         model: str,
         messages: list[dict],
         tools: list[dict] | None,
-        round_num: int,
     ) -> LLMResult:
-        """OpenAI streaming：逐 chunk 推送 llm.chunk 事件，返回统一 LLMResult。"""
+        """
+        _do_llm_call 的异步版：优先用 provider 的 async client / acomplete，
+        provider 没有异步能力时退回线程（此时取消只能等当前请求返回后生效）。
+        """
+        self._early_tools = {}
+        self.emit("llm.call.start", {"round": round_num})
+        native = inspect.iscoroutinefunction(getattr(self.provider, "acomplete", None))
+
+        try:
+            if self.stream and self.client is not None:
+                if native and getattr(self.provider, "async_client", None) is not None:
+                    result = await self._astream_complete(
+                        model=model, messages=messages,
+                        tools=tools, round_num=round_num,
+                    )
+                else:
+                    result = await asyncio.to_thread(
+                        self._stream_complete,
+                        model=model, messages=messages, tools=tools, round_num=round_num,
+                    )
+            elif native:
+                result = await self.provider.acomplete(  # type: ignore[attr-defined]
+                    model=model, messages=messages, tools=tools,
+                )
+            else:
+                result = await asyncio.to_thread(
+                    self.provider.complete, model=model, messages=messages, tools=tools,
+                )
+        except Exception as exc:
+            self._llm_call_error(round_num, exc)
+            raise
+
+        return self._llm_call_done(round_num, result)
+
+    def _stream_kwargs(self, model: str, messages: list[dict], tools: list[dict] | None) -> dict[str, Any]:
         compiled = (
             self.provider.compile_messages(messages)
             if hasattr(self.provider, "compile_messages")
@@ -903,63 +1141,63 @@ class Kernel:
         kwargs: dict[str, Any] = {"model": model, "messages": compiled, "stream": True}
         if tools:
             kwargs["tools"] = tools
+        if self.stream_usage:
+            # 末尾 chunk 附带 usage：缓存命中统计与 TPM 结算在流式路径上才有数据
+            kwargs["stream_options"] = {"include_usage": True}
+        return kwargs
+
+    def _drop_stream_usage(self, kwargs: dict[str, Any], exc: Exception) -> bool:
+        """provider 不认 stream_options（400/422）时关闭它并返回 True，调用方去掉参数重发一次。"""
+        if "stream_options" not in kwargs or getattr(exc, "status_code", None) not in (400, 422):
+            return False
+        self.stream_usage = False
+        del kwargs["stream_options"]
+        self.emit("llm.stream_usage.disabled", {"error": f"{type(exc).__name__}: {exc}"})
+        return True
 
-        chunks = self.client.chat.completions.create(**kwargs)
-        parts: list[str] = []
-        reasoning_parts: list[str] = []
-        tc_acc: dict[int, dict] = {}
-        finish_reason = "stop"
-
+    def _stream_complete(
+        self,
+        *,
+        model: str,
+        messages: list[dict],
+        tools: list[dict] | None,
+        round_num: int,
+    ) -> LLMResult:
+        """OpenAI streaming：逐 chunk 推送 llm.chunk 事件，返回统一 LLMResult。"""
+        kwargs = self._stream_kwargs(model, messages, tools)
+        try:
+            chunks = self.client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            if not self._drop_stream_usage(kwargs, exc):
+                raise
+            chunks = self.client.chat.completions.create(**kwargs)
+        acc = _StreamAccumulator(self, round_num)
         for chunk in chunks:
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-            if chunk.choices[0].finish_reason:
-                finish_reason = chunk.choices[0].finish_reason
-            if getattr(delta, "content", None):
-                parts.append(delta.content)
-                self.emit("llm.chunk", {"content": delta.content, "round": round_num})
-            reasoning_piece = getattr(delta, "reasoning_content", None)
-            if reasoning_piece is None:
-                model_extra = getattr(delta, "model_extra", None)
-                if isinstance(model_extra, dict):
-                    reasoning_piece = model_extra.get("reasoning_content")
-            if reasoning_piece:
-                reasoning_parts.append(str(reasoning_piece))
-            if getattr(delta, "tool_calls", None):
-                for tc in delta.tool_calls:
-                    idx = tc.index
-                    if idx not in tc_acc:
-                        tc_acc[idx] = {"id": "", "name": "", "arguments": ""}
-                    if tc.id:
-                        tc_acc[idx]["id"] = tc.id
-                    if tc.function:
-                        if tc.function.name:
-                            tc_acc[idx]["name"] = tc.function.name
-                        if tc.function.arguments:
-                            tc_acc[idx]["arguments"] += tc.function.arguments
-
-        msg: dict[str, Any] = {"role": "assistant", "content": "".join(parts) or None}
-        tool_calls: list[LLMToolCall] = []
-        for v in tc_acc.values():
-            msg.setdefault("tool_calls", []).append({
-                "id": v["id"], "type": "function",
-                "function": {"name": v["name"], "arguments": v["arguments"]},
-            })
-            tool_calls.append(LLMToolCall(id=v["id"], name=v["name"], arguments=v["arguments"]))
-        if reasoning_parts:
-            msg["reasoning_content"] = "".join(reasoning_parts)
-        elif tool_calls:
-            # Keep streamed tool-call messages compatible with providers that
-            # require reasoning_content when thinking is enabled.
-            msg["reasoning_content"] = ""
+            acc.feed(chunk)
+        return acc.result()
 
-        return LLMResult(
-            assistant_message=msg,
-            finish_reason=finish_reason,
-            tool_calls=tool_calls,
-            usage_total_tokens=0,
-        )
+    async def _astream_complete(
+        self,
+        *,
+        model: str,
+        messages: list[dict],
+        tools: list[dict] | None,
+        round_num: int,
+    ) -> LLMResult:
+        """_stream_complete 的异步版：用 provider.async_client 逐 chunk 消费，取消时连接随之关闭。"""
+        client = self.provider.async_client  # type: ignore[attr-defined]
+        # 编译消息（含图片编码）是 CPU 活：放到工作线程，不占事件循环
+        kwargs = await asyncio.to_thread(self._stream_kwargs, model, messages, tools)
+        try:
+            stream = await client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            if not self._drop_stream_usage(kwargs, exc):
+                raise
+            stream = await client.chat.completions.create(**kwargs)
+        acc = _StreamAccumulator(self, round_num)
+        async for chunk in stream:
+            acc.feed(chunk)
+        return acc.result()
 
     def _call_tool(self, name: str, tool_def: ToolDef, args: dict) -> Any:
         if self._tool_policy is not None:
@@ -967,20 +1205,348 @@ class Kernel:
             if denied:
                 return {"error": denied}
         try:
-            return tool_def.handler(args)
+            result = tool_def.handler(args)
+            if inspect.isawaitable(result):
+                # async handler 在同步 turn 里：当前线程没有运行中的事件循环，单独跑完
+                result = asyncio.run(_awaited(result))
+            return result
         except Exception as exc:
             return {"error": f"{type(exc).__name__}: {exc}"}
 
+    async def _acall_tool(self, name: str, tool_def: ToolDef, args: dict) -> Any:
+        """
+        异步执行单个工具：async handler 直接在事件循环上 await；同步 handler 放进线程，
+        既不阻塞循环，也让其中的 request_confirm 可以照常跨线程等待用户确认。
+        """
+        if self._tool_policy is not None:
+            denied = self._tool_policy.authorize(name, args)
+            if denied:
+                return {"error": denied}
+        try:
+            if inspect.iscoroutinefunction(tool_def.handler):
+                return await tool_def.handler(args)
+            result = await asyncio.to_thread(tool_def.handler, args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as exc:
+            return {"error": f"{type(exc).__name__}: {exc}"}
+
+    def _tool_content(self, tc: LLMToolCall, result: Any, session: Session) -> str:
+        """
+        工具结果 → tool 消息内容。
+
+        超过 result_inline_chars 的结果转存到 session.results，history 里只留句柄 + 预览，
+        之后每轮请求不再重复携带整份数据；错误结果与 offloadable=False 工具（result_get）的结果总是内联。
+        长度按不转义非 ASCII 的 JSON 计，与写进 history 的内容一致。
+        """
+        content = json.dumps(result, default=str, ensure_ascii=False)
+        limit = self.result_inline_chars
+        tool_def = self._tools.get(tc.name)
+        if (
+            limit is None
+            or len(content) <= limit
+            or (tool_def is not None and not tool_def.offloadable)
+            or (isinstance(result, dict) and "error" in result)
+        ):
+            return content
+        handle, text = session.results.put(result)
+        preview = json.dumps(result_handle_preview(handle, text, result, source=tc.name), ensure_ascii=False)
+        self.emit("context.offloaded", {
+            "name": tc.name,
+            "handle": handle,
+            "chars": len(content),
+            "inline_chars": len(preview),
+        })
+        return preview
+
+    def _tool_schemas(self) -> list[dict] | None:
+        """按工具名排序的 schema 列表（缓存到工具集变化为止），与注册顺序无关、跨进程字节稳定。"""
+        if self._schema_cache is None:
+            self._schema_cache = [self._tools[name].schema for name in sorted(self._tools)]
+        return self._schema_cache or None
+
+    def _prefix_messages(self, session: Session) -> list[dict]:
+        """
+        请求前缀：稳定部分在前，易变部分在后，让 provider 的 prompt cache 能命中整段 system。
+
+        system prompt（soul + 指南 + skills + team）只在 boot / soul 变更时重组，逐字节不变；
+        对话摘要随压缩变化，单独作为第二条 system 消息放在其后，而不是拼进 system prompt。
+        """
+        prefix: list[dict] = []
+        if self._system_prompt:
+            prefix.append({"role": "system", "content": self._system_prompt})
+        if session.summary:
+            prefix.append({"role": "system", "content": SUMMARY_HEADER + session.summary})
+        return prefix
+
+    def _context_tokens(self, prefix: list[dict], session: Session) -> int:
+        """请求的 token 估算：前缀与 history 用同一个 token_counter 计数，和 context_window 比较才有意义。"""
+        key = (self.token_counter, tuple(m["content"] for m in prefix))
+        if self._prefix_tokens is None or self._prefix_tokens[0] != key:
+            self._prefix_tokens = (key, sum(message_tokens(m, self.token_counter) for m in prefix))
+        return self._prefix_tokens[1] + session.history_tokens(self.token_counter)
+
+    def _tool_batches(self, tool_calls: list[LLMToolCall]) -> list[list[tuple[LLMToolCall, dict, ToolDef | None]]]:
+        """解析参数并切分批次：相邻的 parallel_safe 调用为一批，其余调用各自成批（屏障）。"""
+        calls: list[tuple[LLMToolCall, dict, ToolDef | None]] = []
+        for tc in tool_calls:
+            try:
+                args = json.loads(tc.arguments)
+            except json.JSONDecodeError:
+                args = {}
+            calls.append((tc, args, self._tools.get(tc.name)))
+
+        def _parallel(call: tuple[LLMToolCall, dict, ToolDef | None]) -> bool:
+            return self.tool_workers > 1 and call[2] is not None and call[2].parallel_safe
+
+        batches: list[list[tuple[LLMToolCall, dict, ToolDef | None]]] = []
+        i = 0
+        while i < len(calls):
+            j = i + 1
+            if _parallel(calls[i]):
+                while j < len(calls) and _parallel(calls[j]):
+                    j += 1
+            batches.append(calls[i:j])
+            i = j
+        return batches
+
+    def _finish_batch(
+        self,
+        batch: list[tuple[LLMToolCall, dict, ToolDef | None]],
+        results: list[Any],
+        done: list[tuple[LLMToolCall, Any]],
+    ) -> None:
+        for (tc, args, tool_def), result in zip(batch, results):
+            if tool_def:
+                self.emit(f"tool:{tc.name}", {"args": args, "result": result})
+            self.emit("tool.call.done", {"name": tc.name, "result": result})
+            done.append((tc, result))
+
+    def _run_tool_calls(
+        self,
+        tool_calls: list[LLMToolCall],
+        early: dict[str, tuple[dict, Future]] | None = None,
+    ) -> list[tuple[LLMToolCall, Any]]:
+        """
+        执行一条 assistant 消息里的全部工具调用，按原顺序返回 (调用, 结果)。
+
+        相邻的 parallel_safe 调用组成一批，在有界线程池里并发执行，整批耗时取最慢的一个；
+        其余调用是屏障，逐个串行。tool.call.start / tool:{name} / tool.call.done 都在当前线程
+        按原顺序发出：一批开始前依次发 start，整批结束后依次发 tool:{name} 与 done。
+        单个串行调用的事件序列与逐个执行时完全一致。
+
+        early 是流式阶段已提前启动的调用（tool_call id → (args, future)），
+        它们的 start 已经发过，这里只等待结果并入所在批次。
+        """
+        early = early or {}
+        done: list[tuple[LLMToolCall, Any]] = []
+        for batch in self._tool_batches(tool_calls):
+            for tc, args, _ in batch:
+                if tc.id not in early:
+                    self.emit("tool.call.start", {"name": tc.name, "args": args})
+
+            if len(batch) > 1 or batch[0][0].id in early:
+                with ThreadPoolExecutor(
+                    max_workers=min(self.tool_workers, len(batch)), thread_name_prefix="tool",
+                ) as pool:
+                    futures = [
+                        early[tc.id][1] if tc.id in early else pool.submit(self._call_tool, tc.name, tool_def, args)
+                        for tc, args, tool_def in batch
+                    ]
+                    results = [f.result() for f in futures]
+            else:
+                tc, args, tool_def = batch[0]
+                results = [
+                    self._call_tool(tc.name, tool_def, args) if tool_def else {"error": f"未知工具: {tc.name}"}
+                ]
+            self._finish_batch(batch, results, done)
+        return done
+
+    async def _arun_tool_calls(
+        self,
+        tool_calls: list[LLMToolCall],
+        early: dict[str, tuple[dict, Future]] | None = None,
+    ) -> list[tuple[LLMToolCall, Any]]:
+        """_run_tool_calls 的异步版：批次、屏障与事件顺序完全一致，并发改由事件循环调度。"""
+        early = early or {}
+        done: list[tuple[LLMToolCall, Any]] = []
+        limit = asyncio.Semaphore(max(1, self.tool_workers))
+
+        async def _one(tc: LLMToolCall, args: dict, tool_def: ToolDef | None) -> Any:
+            if tc.id in early:
+                return await asyncio.wrap_future(early[tc.id][1])
+            if tool_def is None:
+                return {"error": f"未知工具: {tc.name}"}
+            async with limit:
+                return await self._acall_tool(tc.name, tool_def, args)
+
+        for batch in self._tool_batches(tool_calls):
+            for tc, args, _ in batch:
+                if tc.id not in early:
+                    self.emit("tool.call.start", {"name": tc.name, "args": args})
+            results = await asyncio.gather(*(_one(tc, args, tool_def) for tc, args, tool_def in batch))
+            self._finish_batch(batch, list(results), done)
+        return done
+
+    # ── 后台预压缩 ────────────────────────────────────────────────────────────
+
+    def _drop_compiled(self) -> None:
+        """压缩换掉了大段 history：让 provider 释放被压掉消息的编译缓存（provider 不支持时忽略）。"""
+        invalidate = getattr(self.provider, "invalidate_compiled", None)
+        if callable(invalidate):
+            invalidate()
+
+    def _schedule_precompaction(self, session: Session, tokens: int) -> None:
+        """turn 结束时 history 超过软水位 → 在后台线程对当前 history 快照做摘要，不占用户等待时间。"""
+        if self.precompact_ratio is None or session.pending_compaction is not None:
+            return
+        if tokens <= int(self.context_window * self.precompact_ratio):
+            return
+        from athenaclaw.llm.context import compact_history
+
+        base = list(session.history)
+        if self._precompact_pool is None:
+            self._precompact_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompact")
+        future = self._precompact_pool.submit(
+            compact_history,
+            provider=self.provider, model=self.model,
+            history=base, recent_turns=self.compact_recent_turns,
+        )
+        session.pending_compaction = (future, base, tokens)
+        self.emit("context.precompact.start", {"tokens": tokens, "messages": len(base)})
+
+    def _adopt_precompaction(self, session: Session) -> bool:
+        """
+        已完成的预压缩在 turn 开始时一次性换入：摘要合并，快照部分替换为保留段，快照之后追加的消息原样接上。
+
+        history 已被改写（/compact、重载、prune）时快照不再是当前 history 的前缀，结果作废；未完成时不等待。
+        """
+        pending = session.pending_compaction
+        if pending is None or not pending[0].done():
+            return False
+        session.pending_compaction = None
+        future, base, tokens_before = pending
+        try:
+            result = future.result()
+        except Exception as exc:
+            self.emit("context.precompact.error", {"error_type": type(exc).__name__, "error": str(exc)})
+            return False
+        n = len(base)
+        current = session.history
+        if (
+            result.compressed_count == 0
+            or len(current) < n
+            or any(a is not b for a, b in zip(current, base))
+        ):
+            return False
+        session.history = result.retained + current[n:]
+        self._drop_compiled()
+        if result.summary:
+            session.summary = f"{session.summary}\n\n{result.summary}" if session.summary else result.summary
+        self.emit("context.compacted", {
+            "trigger": "background",
+            # 与前台压缩同口径，只统计快照内的消息；快照之后追加、原样接上的条数单列
+            "messages_before": result.compressed_count + result.retained_count,
+            "messages_after": result.retained_count,
+            "messages_compressed": result.compressed_count,
+            "messages_retained": result.retained_count,
+            "messages_appended": len(current) - n,
+            "tokens_before": tokens_before,
+            "summary_chars": len(result.summary),
+            "summary": result.summary,
+        })
+        return True
+
+    def close(self) -> None:
+        """停掉预压缩线程：排队中的摘要取消，正在跑的那次跑完即退出。之后再触发预压缩会重新建池；可重复调用。"""
+        pool, self._precompact_pool = self._precompact_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
     # ── ReAct loop ────────────────────────────────────────────────────────────
 
     def turn(self, user_input: str | TurnInput, session: Session) -> str:
         """核心：接收用户输入 → ReAct loop → 返回回复"""
+        from athenaclaw.llm.context import compact_history
+
+        flow = self._turn_flow(user_input, session)
+        try:
+            step = next(flow)
+            while True:
+                kind, payload = step
+                if kind == "llm":
+                    value: Any = self._do_llm_call(**payload)
+                elif kind == "tools":
+                    value = self._run_tool_calls(*payload)
+                elif kind == "wait":
+                    value = futures_wait([payload])
+                else:
+                    value = compact_history(**payload)
+                step = flow.send(value)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            flow.close()
+
+    async def aturn(self, user_input: str | TurnInput, session: Session) -> str:
+        """
+        turn 的异步版：同一套 ReAct 流程，LLM 请求走 async client，工具按 _arun_tool_calls 调度。
+
+        一个事件循环可以同时驱动多个 Kernel（每个会话一个）的 aturn；同一个 Kernel 同一时间只跑一个 turn。
+        被取消时（CancelledError）把 history / summary 恢复到本轮开始前的快照（本轮中途的压缩一并撤销），
+        emit turn.cancelled 后继续抛出。
+
+        LLM 请求的编译（compile_messages / 图片编码）与压缩在工作线程里做；token 估算、工具结果的
+        json.dumps 等轻量 CPU 工作仍在事件循环线程上，history 很大时会短暂占住循环。
+        """
+        from athenaclaw.llm.context import compact_history
+
+        history, summary = session.history, session.summary
+        before = list(history)
+        flow = self._turn_flow(user_input, session)
+        try:
+            step = next(flow)
+            while True:
+                kind, payload = step
+                if kind == "llm":
+                    value: Any = await self._ado_llm_call(**payload)
+                elif kind == "tools":
+                    value = await self._arun_tool_calls(*payload)
+                elif kind == "wait":
+                    value = await asyncio.wait([asyncio.wrap_future(payload)])
+                else:
+                    value = await asyncio.to_thread(lambda: compact_history(**payload))
+                step = flow.send(value)
+        except StopIteration as stop:
+            return stop.value
+        except asyncio.CancelledError:
+            # 压缩会整体换掉 session.history，按长度截断不可靠：把原列表原地恢复成快照再挂回去
+            if session.history is not history:
+                self._drop_compiled()
+            history[:] = before
+            session.history, session.summary = history, summary
+            self.emit("turn.cancelled", {"input": render_turn_input(ensure_turn_input(user_input))})
+            raise
+        finally:
+            flow.close()
+
+    def _turn_flow(self, user_input: str | TurnInput, session: Session) -> Generator[tuple[str, Any], Any, str]:
+        """
+        ReAct 流程本体（与 I/O 方式无关）：需要外部 I/O 时 yield 一个步骤，由 turn / aturn 执行后 send 回结果。
+
+        - ("llm", kwargs)        → LLMResult
+        - ("tools", (calls, early)) → [(LLMToolCall, result), ...]
+        - ("compact", kwargs)    → CompactResult
+        - ("wait", future)       → 无（等后台预压缩完成）
+        """
         previous_ctx = self._execution_context
         turn_input = ensure_turn_input(user_input)
-        self._execution_context = ExecutionContext(refs=turn_input.refs)
+        self._execution_context = ExecutionContext(refs=turn_input.refs, results=session.results)
         today = datetime.now().strftime("%Y-%m-%d")
         try:
             self.emit("turn.start", {"input": render_turn_input(turn_input)})
+            self._adopt_precompaction(session)
             expanded, expand_error, skill_name = expand_explicit_skill_command(
                 user_input=turn_input.text,
                 skills=self._skills,
@@ -1004,35 +1570,29 @@ class Kernel:
             if expanded:
                 self.emit("skill.expanded", {"input": turn_input.text, "skill": skill_name})
 
-            tool_schemas = [t.schema for t in self._tools.values()] or None
-
-            # prefix: system prompt + 对话摘要注入
-            system_content = self._system_prompt or ""
-            if session.summary:
-                system_content += (
-                    "\n\n## 前段对话摘要\n"
-                    "以下是之前对话的压缩摘要，不是新消息。基于此背景继续对话：\n\n"
-                    f"{session.summary}"
-                )
-            prefix = (
-                [{"role": "system", "content": system_content}]
-                if system_content else []
-            )
+            tool_schemas = self._tool_schemas()
+            prefix = self._prefix_messages(session)
 
             # 自动压缩：token > 85% context window 时触发
-            from athenaclaw.llm.context import estimate_tokens, compact_history
-
-            est = estimate_tokens(prefix + session.history)
+            est = self._context_tokens(prefix, session)
+            if est > int(self.context_window * 0.85) and session.pending_compaction is not None:
+                # 预压缩还没跑完：等它，而不是再发起一次同样的摘要请求
+                yield ("wait", session.pending_compaction[0])
+                if self._adopt_precompaction(session):
+                    prefix = self._prefix_messages(session)
+                    est = self._context_tokens(prefix, session)
             if est > int(self.context_window * 0.85):
-                result = compact_history(
-                    provider=self.provider, model=self.model,
-                    history=session.history, recent_turns=self.compact_recent_turns,
-                )
+                result = yield ("compact", {
+                    "provider": self.provider, "model": self.model,
+                    "history": session.history, "recent_turns": self.compact_recent_turns,
+                })
                 session.history = result.retained
+                self._drop_compiled()
                 if result.summary:
                     session.summary = (
                         f"{session.summary}\n\n{result.summary}" if session.summary else result.summary
                     )
+                prefix = self._prefix_messages(session)  # 摘要可能已变；稳定的 system 前缀不受影响
                 self.emit("context.compacted", {
                     "trigger": "auto",
                     "messages_before": result.compressed_count + result.retained_count,
@@ -1040,22 +1600,10 @@ class Kernel:
                     "messages_compressed": result.compressed_count,
                     "messages_retained": result.retained_count,
                     "tokens_before": est,
-                    "tokens_after": estimate_tokens(prefix + session.history),
+                    "tokens_after": self._context_tokens(prefix, session),
                     "summary_chars": len(result.summary),
                     "summary": result.summary,
                 })
-                # 重建 prefix（摘要可能已变）
-                system_content = self._system_prompt or ""
-                if session.summary:
-                    system_content += (
-                        "\n\n## 前段对话摘要\n"
-                        "以下是之前对话的压缩摘要，不是新消息。基于此背景继续对话：\n\n"
-                        f"{session.summary}"
-                    )
-                prefix = (
-                    [{"role": "system", "content": system_content}]
-                    if system_content else []
-                )
 
             reply = ""
 
@@ -1063,12 +1611,12 @@ class Kernel:
                 round_num = i + 1
                 self.emit("turn.round", {"round": round_num, "max": self.max_rounds})
 
-                response = self._do_llm_call(
-                    round_num=round_num,
-                    model=self.model,
-                    messages=prefix + session.history,
-                    tools=tool_schemas,
-                )
+                response = yield ("llm", {
+                    "round_num": round_num,
+                    "model": self.model,
+                    "messages": prefix + session.history,
+                    "tools": tool_schemas,
+                })
 
                 # 存储 assistant 消息
                 session.history.append(response.assistant_message)
@@ -1081,11 +1629,12 @@ class Kernel:
                 if response.finish_reason == "length":
                     # 撤销刚添加的截断消息
                     session.history.pop()
-                    result = compact_history(
-                        provider=self.provider, model=self.model,
-                        history=session.history, recent_turns=self.compact_recent_turns,
-                    )
+                    result = yield ("compact", {
+                        "provider": self.provider, "model": self.model,
+                        "history": session.history, "recent_turns": self.compact_recent_turns,
+                    })
                     session.history = result.retained
+                    self._drop_compiled()
                     if result.summary:
                         session.summary = (
                             f"{session.summary}\n\n{result.summary}" if session.summary else result.summary
@@ -1096,54 +1645,25 @@ class Kernel:
                         "messages_retained": result.retained_count,
                         "summary": result.summary,
                     })
-                    # 重建 prefix
-                    system_content = self._system_prompt or ""
-                    if session.summary:
-                        system_content += (
-                            "\n\n## 前段对话摘要\n"
-                            "以下是之前对话的压缩摘要，不是新消息。基于此背景继续对话：\n\n"
-                            f"{session.summary}"
-                        )
-                    prefix = (
-                        [{"role": "system", "content": system_content}]
-                        if system_content else []
-                    )
+                    prefix = self._prefix_messages(session)
                     continue
 
                 # 工具调用
                 if response.tool_calls:
-                    for tc in response.tool_calls:
-                        try:
-                            args = json.loads(tc.arguments)
-                        except json.JSONDecodeError:
-                            args = {}
-                        self.emit(
-                            "tool.call.start",
-                            {"name": tc.name, "args": args},
-                        )
-                        tool_def = self._tools.get(tc.name)
-                        if tool_def:
-                            result = self._call_tool(tc.name, tool_def, args)
-                            self.emit(f"tool:{tc.name}", {
-                                "args": args, "result": result,
-                            })
-                        else:
-                            result = {"error": f"未知工具: {tc.name}"}
-                        self.emit(
-                            "tool.call.done",
-                            {"name": tc.name, "result": result},
-                        )
-
+                    early, self._early_tools = self._early_tools, {}
+                    done = yield ("tools", (response.tool_calls, early))
+                    for tc, result in done:
                         session.history.append({
                             "role": "tool",
                             "tool_call_id": tc.id,
-                            "content": json.dumps(result, default=str),
+                            "content": self._tool_content(tc, result, session),
                         })
             else:
                 # max_rounds 耗尽
                 reply = f"[max_rounds={self.max_rounds} 耗尽]"
                 session.history.append({"role": "assistant", "content": reply})
 
+            self._schedule_precompaction(session, self._context_tokens(prefix, session))
             self.emit("turn.done", {"input": render_turn_input(turn_input), "reply": reply})
             return reply
         finally:
@@ -1,4 +1,21 @@
-from athenaclaw.llm.context import CompactResult, ContextInfo, compact_history, context_info, estimate_tokens
+from athenaclaw.llm.cassette import (
+    AsyncCassetteClient,
+    Cassette,
+    CassetteClient,
+    CassetteMissError,
+    use_cassette,
+)
+from athenaclaw.llm.context import (
+    CompactResult,
+    ContextInfo,
+    TokenLedger,
+    compact_history,
+    context_info,
+    estimate_tokens,
+    message_tokens,
+    tiktoken_counter,
+)
+from athenaclaw.llm.images import ImageEncoder, provider_image_limits
 from athenaclaw.llm.messages import (
     AttachmentRef,
     ContextRef,
@@ -12,6 +29,12 @@ from athenaclaw.llm.messages import (
     normalize_parts,
     render_turn_input,
 )
+from athenaclaw.llm.pool import (
+    ClientPool,
+    RateLimiter,
+    llm_priority,
+    shared_pool,
+)
 from athenaclaw.llm.providers import (
     LLMProvider,
     LLMResult,
@@ -21,17 +44,28 @@ from athenaclaw.llm.providers import (
     UnsupportedMediaError,
     message_to_dict,
 )
+from athenaclaw.llm.router import Endpoint, ProviderRouter, is_transient
 
 __all__ = [
+    "AsyncCassetteClient",
     "AttachmentRef",
+    "Cassette",
+    "CassetteClient",
+    "CassetteMissError",
+    "ClientPool",
     "CompactResult",
     "ContextInfo",
     "ContextRef",
+    "Endpoint",
+    "ImageEncoder",
     "LLMProvider",
     "LLMResult",
     "LLMToolCall",
     "OpenAIChatProvider",
     "ProviderInputError",
+    "ProviderRouter",
+    "RateLimiter",
+    "TokenLedger",
     "TurnInput",
     "UnsupportedMediaError",
     "build_user_message",
@@ -41,9 +75,16 @@ __all__ = [
     "ensure_turn_input",
     "estimate_tokens",
     "extract_text",
+    "is_transient",
+    "llm_priority",
     "message_to_dict",
+    "message_tokens",
     "normalize_history",
     "normalize_history_message",
     "normalize_parts",
+    "provider_image_limits",
     "render_turn_input",
+    "shared_pool",
+    "tiktoken_counter",
+    "use_cassette",
 ]
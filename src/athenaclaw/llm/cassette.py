@@ -0,0 +1,261 @@
+"""
+[INPUT]: asyncio, hashlib, json, re, threading, time, pathlib, openai.types.chat
+[OUTPUT]: Cassette — 请求/响应录制文件（JSONL，按归一化请求哈希索引）；CassetteClient / AsyncCassetteClient — 包在 OpenAI client 外的录制/回放层；use_cassette；CassetteMissError；CASSETTE_MODES
+[POS]: LLM provider 的离线层：record 录下真实模型的响应（含流式 chunk 与工具调用），replay 不联网按录制结果返回，
+       让 kernel / automation / IM 流程可以确定性地跑基准与回归
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+
+CASSETTE_MODES = ("record", "replay", "auto")
+
+# 不影响模型输出的请求参数，不参与哈希
+_VOLATILE_KEYS = frozenset({"stream_options", "timeout", "extra_headers", "extra_query", "extra_body", "user"})
+# 消息里的日期时间（用户消息头的当天日期、工具结果里的时间戳）会让同一段对话在不同日子哈希不同
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?")
+
+
+class CassetteMissError(RuntimeError):
+    """回放时找不到对应的录制（请求与录制时不一致，或还没录过）。"""
+
+
+def _mask(value: Any) -> Any:
+    if isinstance(value, str):
+        return _TIMESTAMP.sub("<ts>", value)
+    if isinstance(value, dict):
+        return {k: _mask(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_mask(v) for v in value]
+    return value
+
+
+def request_key(kwargs: dict[str, Any]) -> str:
+    """chat.completions.create 参数 → 稳定哈希：去掉无关参数、日期时间打码、键排序后取 sha256 前 16 位。"""
+    normalized = _mask({k: v for k, v in kwargs.items() if k not in _VOLATILE_KEYS})
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _dump(obj: Any) -> dict[str, Any]:
+    return obj.model_dump(mode="json", exclude_none=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 录制文件
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Cassette:
+    """
+    录制文件：每行一条 {"key", "model", "stream", "latency_ms", "response" | "chunks" + "delays_ms"}。
+
+    - record：忽略已有内容，全部请求打到真实模型，首次写入时清空文件
+    - replay：只读；找不到录制抛 CassetteMissError，不联网
+    - auto：有录制就回放，没有就打真实模型并追加
+
+    同一请求录了多次时按顺序回放，用完后重复最后一条（循环跑基准时不至于中途失败）。
+    latency_scale > 0 时回放按录制延迟 × scale 等待（流式按 chunk 间隔），0 表示不等待。
+    """
+
+    def __init__(self, path: Path | str, *, mode: str = "replay", latency_scale: float = 0.0) -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知 cassette 模式: {mode}（可选 {', '.join(CASSETTE_MODES)}）")
+        self.path = Path(path).expanduser()
+        self.mode = mode
+        self.latency_scale = max(0.0, float(latency_scale))
+        self.hits = 0
+        self.recorded = 0
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+        self._cursor: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._truncate = mode == "record"
+        if mode != "record" and self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    @property
+    def live(self) -> bool:
+        """是否可能访问真实模型。"""
+        return self.mode != "replay"
+
+    def lookup(self, key: str) -> dict[str, Any] | None:
+        """取下一条可回放的录制；record 模式或 auto 模式未命中返回 None（调用方应去请求真实模型）。"""
+        if self.mode == "record":
+            return None
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                if self.mode == "replay":
+                    raise CassetteMissError(
+                        f"cassette {self.path} 中没有请求 {key} 的录制；请求内容与录制时不一致，"
+                        "或需先用 record / auto 模式录制"
+                    )
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self.hits += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def record(self, entry: dict[str, Any]) -> None:
+        """追加一条录制（立即落盘，进程中途退出也不丢已完成的请求）。"""
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("w" if self._truncate else "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._truncate = False
+            self.recorded += 1
+
+    def delay(self, ms: float) -> float:
+        """录制延迟 → 回放等待秒数。"""
+        return ms * self.latency_scale / 1000.0
+
+
+def _entry(key: str, kwargs: dict[str, Any], **fields: Any) -> dict[str, Any]:
+    return {"key": key, "model": kwargs.get("model"), "stream": bool(kwargs.get("stream")), **fields}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# client 包装
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Chat:
+    def __init__(self, completions: Any) -> None:
+        self.completions = completions
+
+
+class CassetteClient:
+    """
+    同步 OpenAI client 的录制/回放包装，只实现 chat.completions.create（provider 与 kernel 流式路径用到的全部接口）。
+
+    inner 为真实 client；replay 模式可以为 None。
+    """
+
+    def __init__(self, cassette: Cassette, inner: Any | None = None) -> None:
+        self.cassette = cassette
+        self.inner = inner
+        self.chat = _Chat(self)
+
+    def create(self, **kwargs: Any) -> Any:
+        key = request_key(kwargs)
+        entry = self.cassette.lookup(key)
+        if entry is not None:
+            return self._replay_stream(entry) if entry["stream"] else self._replay(entry)
+        if self.inner is None:
+            raise CassetteMissError(f"请求 {key} 未录制，且没有可用的真实 client")
+        started = time.perf_counter()
+        response = self.inner.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, kwargs, response, started)
+        self.cassette.record(_entry(key, kwargs, latency_ms=_ms(time.perf_counter() - started), response=_dump(response)))
+        return response
+
+    def _replay(self, entry: dict[str, Any]) -> ChatCompletion:
+        wait = self.cassette.delay(entry.get("latency_ms", 0.0))
+        if wait:
+            time.sleep(wait)
+        return ChatCompletion.model_validate(entry["response"])
+
+    def _replay_stream(self, entry: dict[str, Any]) -> Iterator[ChatCompletionChunk]:
+        delays = entry.get("delays_ms") or []
+        for i, chunk in enumerate(entry["chunks"]):
+            wait = self.cassette.delay(delays[i] if i < len(delays) else 0.0)
+            if wait:
+                time.sleep(wait)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    def _record_stream(self, key: str, kwargs: dict[str, Any], stream: Any, started: float) -> Iterator[Any]:
+        chunks: list[dict[str, Any]] = []
+        delays: list[float] = []
+        last = started
+        for chunk in stream:
+            now = time.perf_counter()
+            delays.append(_ms(now - last))
+            last = now
+            chunks.append(_dump(chunk))
+            yield chunk
+        # 只录完整消费的流；中途取消 / 出错的请求不入带
+        self.cassette.record(_entry(key, kwargs, latency_ms=_ms(last - started), chunks=chunks, delays_ms=delays))
+
+
+class AsyncCassetteClient:
+    """AsyncOpenAI 的录制/回放包装；与 CassetteClient 共用同一个 Cassette。"""
+
+    def __init__(self, cassette: Cassette, inner: Any | None = None) -> None:
+        self.cassette = cassette
+        self.inner = inner
+        self.chat = _Chat(self)
+
+    async def create(self, **kwargs: Any) -> Any:
+        key = request_key(kwargs)
+        entry = self.cassette.lookup(key)
+        if entry is not None:
+            if entry["stream"]:
+                return self._replay_stream(entry)
+            wait = self.cassette.delay(entry.get("latency_ms", 0.0))
+            if wait:
+                await asyncio.sleep(wait)
+            return ChatCompletion.model_validate(entry["response"])
+        if self.inner is None:
+            raise CassetteMissError(f"请求 {key} 未录制，且没有可用的真实 client")
+        started = time.perf_counter()
+        response = await self.inner.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, kwargs, response, started)
+        self.cassette.record(_entry(key, kwargs, latency_ms=_ms(time.perf_counter() - started), response=_dump(response)))
+        return response
+
+    async def _replay_stream(self, entry: dict[str, Any]) -> AsyncIterator[ChatCompletionChunk]:
+        delays = entry.get("delays_ms") or []
+        for i, chunk in enumerate(entry["chunks"]):
+            wait = self.cassette.delay(delays[i] if i < len(delays) else 0.0)
+            if wait:
+                await asyncio.sleep(wait)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    async def _record_stream(self, key: str, kwargs: dict[str, Any], stream: Any, started: float) -> AsyncIterator[Any]:
+        chunks: list[dict[str, Any]] = []
+        delays: list[float] = []
+        last = started
+        async for chunk in stream:
+            now = time.perf_counter()
+            delays.append(_ms(now - last))
+            last = now
+            chunks.append(_dump(chunk))
+            yield chunk
+        self.cassette.record(_entry(key, kwargs, latency_ms=_ms(last - started), chunks=chunks, delays_ms=delays))
+
+
+def use_cassette(provider: Any, cassette: Cassette) -> Any:
+    """
+    把 OpenAIChatProvider 的同步 / 异步 client 换成录制/回放包装（原地修改并返回 provider）。
+
+    必须在构造 Kernel 之前调用：Kernel 在初始化时取 provider.client 作为流式路径的 client。
+    """
+    live_sync = provider.client if cassette.live else None
+    live_async = provider.async_client if cassette.live else None
+    provider.client = CassetteClient(cassette, live_sync)
+    provider.async_client = AsyncCassetteClient(cassette, live_async)
+    return provider
@@ -1,6 +1,6 @@
 """
-[INPUT]: json, dataclasses, typing, agent.messages, agent.providers
-[OUTPUT]: estimate_tokens, ContextInfo, context_info, CompactResult, compact_history
+[INPUT]: json, threading, dataclasses, typing, agent.messages, agent.providers, llm.pool, tiktoken(可选)
+[OUTPUT]: estimate_tokens, message_tokens, TokenLedger（增量 token 账本）, tiktoken_counter, ContextInfo, context_info, CompactResult, compact_history
 [POS]: 上下文管理纯函数层，零框架依赖，被 Kernel 和适配器调用
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
@@ -8,9 +8,17 @@
 from __future__ import annotations
 
 import json
+import threading
 from dataclasses import dataclass
+from typing import Any, Callable
 
-from athenaclaw.llm.messages import count_attachment_tokens, extract_text, normalize_history
+from athenaclaw.llm.messages import (
+    count_attachment_tokens,
+    extract_text,
+    normalize_history,
+    normalize_history_message,
+)
+from athenaclaw.llm.pool import llm_priority
 from athenaclaw.llm.providers import OpenAIChatProvider
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -31,6 +39,103 @@ def estimate_tokens(messages: list[dict]) -> int:
     return text_tokens + attachment_tokens
 
 
+TokenCounter = Callable[[str], int]
+
+
+def _byte_counter(text: str) -> int:
+    return len(text.encode("utf-8")) // 4
+
+
+class _TiktokenCounter:
+    """首次计数时才加载 BPE 文件；加载失败（离线 / 代理拦截 / 文件损坏）就永久退回字节 // 4。"""
+
+    __slots__ = ("_tiktoken", "_encoding", "_enc", "_lock")
+
+    def __init__(self, tiktoken: Any, encoding: str) -> None:
+        self._tiktoken = tiktoken
+        self._encoding = encoding
+        self._enc: Any = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Any:
+        with self._lock:
+            if self._enc is None:
+                try:
+                    self._enc = self._tiktoken.get_encoding(self._encoding)
+                except Exception:
+                    self._enc = False
+        return self._enc
+
+    def __call__(self, text: str) -> int:
+        enc = self._enc if self._enc is not None else self._load()
+        if enc is False:
+            return _byte_counter(text)
+        return len(enc.encode(text, disallowed_special=()))
+
+
+def tiktoken_counter(encoding: str = "cl100k_base") -> TokenCounter | None:
+    """
+    真实 tokenizer（tiktoken 已安装时）；未安装返回 None，调用方退回字节 // 4 粗估。
+    编码文件按需加载（首次使用会联网下载），启动时不阻塞也不会因网络失败报错。
+    """
+    try:
+        import tiktoken
+    except ModuleNotFoundError:
+        return None
+    return _TiktokenCounter(tiktoken, encoding)
+
+
+def message_tokens(message: dict, counter: TokenCounter | None = None) -> int:
+    """单条消息的 token 估算：与 estimate_tokens 同口径（序列化文本 + 附件预算）。"""
+    normalized = normalize_history_message(message)
+    if normalized.get("role") == "user":
+        normalized = {**normalized, "content": extract_text(normalized)}
+    text = json.dumps(normalized, ensure_ascii=False)
+    return (counter or _byte_counter)(text) + count_attachment_tokens(normalized)
+
+
+class TokenLedger:
+    """
+    history 的增量 token 账本：逐条缓存估算值并维护总数，预算检查不再每轮序列化整段历史。
+
+    sync(history) 按对象身份比对已记账的消息：只在尾部追加时记新消息，只在尾部弹出时减掉弹出的；
+    首条或边界消息换了对象（压缩/裁剪后整体替换 history）时整段重记一次。
+    消息被原地修改不会被发现——Kernel 只追加和整体替换 history，不原地改消息。
+    """
+
+    __slots__ = ("counter", "total", "_messages", "_counts")
+
+    def __init__(self, counter: TokenCounter | None = None) -> None:
+        self.counter = counter
+        self.total = 0
+        self._messages: list[dict] = []
+        self._counts: list[int] = []
+
+    def reset(self, counter: TokenCounter | None = None) -> None:
+        self.counter = counter
+        self.total = 0
+        self._messages.clear()
+        self._counts.clear()
+
+    def sync(self, history: list[dict], counter: TokenCounter | None = None) -> int:
+        """对齐到当前 history 并返回总 token 数；只对新增/移除的消息做工作。"""
+        if counter is not self.counter:
+            self.reset(counter)
+        keep = min(len(self._messages), len(history))
+        if keep and (history[0] is not self._messages[0] or history[keep - 1] is not self._messages[keep - 1]):
+            self.reset(counter)
+            keep = 0
+        if len(self._messages) > keep:
+            self.total -= sum(self._counts[keep:])
+            del self._messages[keep:], self._counts[keep:]
+        for message in history[keep:]:
+            count = message_tokens(message, self.counter)
+            self._messages.append(message)
+            self._counts.append(count)
+            self.total += count
+        return self.total
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 上下文统计
 # ─────────────────────────────────────────────────────────────────────────────
@@ -131,7 +236,8 @@ def compact_history(
 
     # LLM 压缩（含 fallback）
     use_provider = provider or OpenAIChatProvider(client=client)
-    summary = _llm_compress(use_provider, model, to_compress)
+    with llm_priority("compaction"):
+        summary = _llm_compress(use_provider, model, to_compress)
 
     return CompactResult(
         summary=summary,
@@ -0,0 +1,148 @@
+"""
+[INPUT]: base64, hashlib, io, os, threading, collections, pathlib, Pillow(可选)
+[OUTPUT]: ImageEncoder — 图片附件 → data URL（按内容哈希缓存 + 按 provider 尺寸上限缩放重压缩）；provider_image_limits
+[POS]: LLM provider 的图片编码层；OpenAIChatProvider 编译 image_ref 时调用，同一张图在 history 里存活多少轮都只读盘编码一次
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024      # 已编码 data URL 的内存上限（按字符数计）
+JPEG_QUALITY = 85
+_MAX_STAT_KEYS = 1024
+
+# OpenAI 视觉输入的处理上限：low 固定缩到 512；high/auto 先缩进 2048×2048，再把短边缩到 768。
+# 超过上限的像素在服务端也会被缩掉，提前缩放只是少传字节，不损失模型看到的信息。
+_DETAIL_LIMITS: dict[str, tuple[int, int | None]] = {
+    "low": (512, None),
+    "high": (2048, 768),
+    "auto": (2048, 768),
+}
+
+
+def provider_image_limits(detail: str) -> tuple[int, int | None]:
+    """image detail → (长边上限, 短边上限)。未知取值按 auto 处理。"""
+    return _DETAIL_LIMITS.get(detail, _DETAIL_LIMITS["auto"])
+
+
+def _target_size(width: int, height: int, max_side: int | None, max_short_side: int | None) -> tuple[int, int]:
+    scale = 1.0
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+    if max_short_side and min(width, height) * scale > max_short_side:
+        scale = max_short_side / min(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class ImageEncoder:
+    """
+    图片 → data URL，结果按内容哈希缓存。
+
+    两级键：(path, mtime_ns, size) → 内容哈希，只在文件变化时重读；内容哈希 → data URL，
+    同一张图换了路径也复用。缩放参数变化时调用方应新建 encoder（provider 构造时固定）。
+
+    Pillow 已安装时，超过 max_side / max_short_side 的图片按比例缩小并重压缩（无透明通道 → JPEG，
+    否则 PNG）；重压缩后反而更大、或 Pillow 无法识别的格式则原样发送。未安装 Pillow 只做缓存。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_side: int | None = None,
+        max_short_side: int | None = None,
+        quality: int = JPEG_QUALITY,
+        max_bytes: int = MAX_CACHE_BYTES,
+    ) -> None:
+        self.max_side = max_side
+        self.max_short_side = max_short_side
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._digests: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self._urls: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def data_url(self, path: str, mime_type: str) -> str:
+        st = os.stat(path)
+        stat_key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+            url = self._urls.get(digest) if digest is not None else None
+            if url is not None:
+                self._urls.move_to_end(digest)
+                self.hits += 1
+                return url
+
+        raw = Path(path).read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        with self._lock:
+            self._remember_digest(stat_key, digest)
+            url = self._urls.get(digest)
+            if url is not None:
+                self._urls.move_to_end(digest)
+                self.hits += 1
+                return url
+        self.misses += 1
+
+        data, mime = self._shrink(raw, mime_type)
+        url = f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+        with self._lock:
+            if digest not in self._urls:
+                self._urls[digest] = url
+                self._bytes += len(url)
+                self._evict()
+        return url
+
+    def _remember_digest(self, stat_key: tuple[str, int, int], digest: str) -> None:
+        self._digests[stat_key] = digest
+        self._digests.move_to_end(stat_key)
+        while len(self._digests) > _MAX_STAT_KEYS:
+            self._digests.popitem(last=False)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._urls) > 1:
+            _, url = self._urls.popitem(last=False)
+            self._bytes -= len(url)
+
+    def _shrink(self, raw: bytes, mime_type: str) -> tuple[bytes, str]:
+        if not (self.max_side or self.max_short_side):
+            return raw, mime_type
+        try:
+            from PIL import Image
+        except ModuleNotFoundError:
+            return raw, mime_type
+        try:
+            with Image.open(io.BytesIO(raw)) as img:
+                size = _target_size(img.width, img.height, self.max_side, self.max_short_side)
+                if size == (img.width, img.height) or getattr(img, "is_animated", False):
+                    return raw, mime_type
+                has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+                img = img.resize(size, Image.LANCZOS)
+                out = io.BytesIO()
+                if has_alpha:
+                    img.save(out, format="PNG", optimize=True)
+                    mime = "image/png"
+                else:
+                    img.convert("RGB").save(out, format="JPEG", quality=self.quality, optimize=True)
+                    mime = "image/jpeg"
+        except Exception:
+            return raw, mime_type
+        data = out.getvalue()
+        return (data, mime) if len(data) < len(raw) else (raw, mime_type)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._digests.clear()
+            self._urls.clear()
+            self._bytes = 0
@@ -0,0 +1,382 @@
+"""
+[INPUT]: asyncio, contextlib, contextvars, heapq, itertools, json, threading, time, weakref, openai (OpenAI/AsyncOpenAI)
+[OUTPUT]: RateLimiter — RPM/TPM 令牌桶（按优先级排队）；RateLimitedClient / AsyncRateLimitedClient；ClientPool / shared_pool — 进程级 client 复用；
+          llm_priority / current_priority；PRIORITIES
+[POS]: LLM provider 的连接与配额层：同进程内所有 bundle（各 IM 会话、automation 任务、压缩）共用同一组 HTTP 连接与同一个限流器，
+       突发请求在本地排队，而不是各自打满 provider 配额后收到 429
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Iterator
+
+import openai
+
+
+PRIORITIES = ("interactive", "automation", "compaction")     # 越靠前越优先
+_RANK = {name: rank for rank, name in enumerate(PRIORITIES)}
+BURST_SECONDS = 10.0            # 桶容量 = 10 秒的配额：允许小突发，又不会一瞬间打满一分钟的额度
+IMAGE_TOKENS = 765              # 与 detail=high 单图上限同口径；low 实际只有 85，宁可多估
+_ASYNC_POLL = 0.05              # 异步等待者非队首时的轮询间隔（秒）
+
+_priority: ContextVar[str | None] = ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def llm_priority(name: str) -> Iterator[None]:
+    """在当前上下文内把 LLM 请求标记为指定优先级（压缩等后台工作用）。"""
+    if name not in _RANK:
+        raise ValueError(f"未知优先级: {name}（可选 {', '.join(PRIORITIES)}）")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(default: str = "interactive") -> str:
+    return _priority.get() or default
+
+
+def request_tokens(kwargs: dict[str, Any]) -> int:
+    """chat.completions 请求的 token 预估（字节 // 4；图片按固定预算），用于 TPM 预扣，响应后按 usage 校正。"""
+    total = int(kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0)
+    for message in kwargs.get("messages") or ():
+        content = message.get("content")
+        if isinstance(content, str):
+            total += len(content.encode("utf-8")) // 4
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += len(str(part.get("text", "")).encode("utf-8")) // 4
+                else:
+                    total += IMAGE_TOKENS
+        for tc in message.get("tool_calls") or ():
+            total += len(str(tc.get("function", {}).get("arguments", ""))) // 4
+        total += 4
+    if kwargs.get("tools"):
+        total += len(json.dumps(kwargs["tools"], ensure_ascii=False).encode("utf-8")) // 4
+    return total
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 限流
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Bucket:
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute: int, burst_seconds: float, now: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def shortfall(self, amount: float) -> float:
+        """还差多少秒才够 amount（已够返回 0）。"""
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    RPM / TPM 双令牌桶，等待者按 (优先级, 到达顺序) 排队：只有队首能取令牌，
+    所以 interactive 请求到达后会插到排队中的 automation / compaction 之前（已发出的请求不受影响）。
+
+    TPM 先按预估扣减，响应后用 settle() 以 usage 校正；单个请求超过桶容量时按容量计，避免永远等不到。
+    同步调用在线程里阻塞等待；aacquire 不阻塞事件循环。
+    """
+
+    def __init__(
+        self,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        *,
+        burst_seconds: float = BURST_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.clock = clock
+        now = clock()
+        self._requests = _Bucket(rpm, burst_seconds, now) if rpm else None
+        self._tokens = _Bucket(tpm, burst_seconds, now) if tpm else None
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.granted: dict[str, int] = {name: 0 for name in PRIORITIES}
+        self.waited: dict[str, float] = {name: 0.0 for name in PRIORITIES}
+
+    @property
+    def enabled(self) -> bool:
+        return self._requests is not None or self._tokens is not None
+
+    def _poll(self, ticket: tuple[int, int], tokens: int) -> float | None:
+        """持锁调用：可放行时扣减并出队返回 None；否则返回等待秒数（0 = 不是队首，等通知）。"""
+        if self._queue[0] != ticket:
+            return 0.0
+        now = self.clock()
+        wait = 0.0
+        if self._requests is not None:
+            self._requests.refill(now)
+            wait = max(wait, self._requests.shortfall(1))
+        if self._tokens is not None:
+            self._tokens.refill(now)
+            wait = max(wait, self._tokens.shortfall(min(tokens, self._tokens.capacity)))
+        if wait > 0:
+            return wait
+        if self._requests is not None:
+            self._requests.level -= 1
+        if self._tokens is not None:
+            self._tokens.level -= min(tokens, self._tokens.capacity)
+        heapq.heappop(self._queue)
+        self._cond.notify_all()
+        return None
+
+    def _enqueue(self, priority: str) -> tuple[int, int]:
+        ticket = (_RANK.get(priority, len(PRIORITIES)), next(self._seq))
+        heapq.heappush(self._queue, ticket)
+        self._cond.notify_all()          # 新的队首可能是它：让当前队首重新检查
+        return ticket
+
+    def _abandon(self, ticket: tuple[int, int]) -> None:
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    def _granted(self, priority: str, started: float) -> float:
+        waited = time.monotonic() - started
+        with self._cond:
+            if priority in self.granted:
+                self.granted[priority] += 1
+                self.waited[priority] += waited
+        return waited
+
+    def acquire(self, tokens: int = 0, priority: str = "interactive") -> float:
+        """阻塞到可以发出一个请求；返回等待秒数。"""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._poll(ticket, tokens)
+                    if wait is None:
+                        break
+                    self._cond.wait(wait or 1.0)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+        return self._granted(priority, started)
+
+    async def aacquire(self, tokens: int = 0, priority: str = "interactive") -> float:
+        """acquire 的异步版：等待期间让出事件循环；任务取消时自动出队。"""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._poll(ticket, tokens)
+                if wait is None:
+                    break
+                await asyncio.sleep(wait or _ASYNC_POLL)
+        except BaseException:
+            with self._cond:
+                self._abandon(ticket)
+            raise
+        return self._granted(priority, started)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """按实际 usage 校正 TPM 预扣（少扣的补扣，可以扣成负数，由后续请求等待偿还）。"""
+        if self._tokens is None or actual <= 0:
+            return
+        with self._cond:
+            charged = min(estimated, self._tokens.capacity)
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + charged - actual)
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "granted": dict(self.granted),
+                "waited_s": {k: round(v, 3) for k, v in self.waited.items()},
+            }
+
+
+def _usage_total(obj: Any) -> int:
+    usage = getattr(obj, "usage", None)
+    return int(getattr(usage, "total_tokens", 0) or 0) if usage is not None else 0
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# client 包装
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Chat:
+    def __init__(self, completions: Any) -> None:
+        self.completions = completions
+
+
+class RateLimitedClient:
+    """
+    同步 OpenAI client 包装：chat.completions.create 前按优先级取配额，响应后按 usage 校正 TPM。
+
+    priority 是该 client 的默认优先级（bundle 按入口决定）；llm_priority() 上下文可以覆盖。
+    """
+
+    def __init__(self, inner: Any, limiter: RateLimiter, *, priority: str = "interactive") -> None:
+        self.inner = inner
+        self.limiter = limiter
+        self.priority = priority
+        self.chat = _Chat(self)
+
+    def create(self, **kwargs: Any) -> Any:
+        tokens = request_tokens(kwargs) if self.limiter.enabled else 0
+        self.limiter.acquire(tokens, current_priority(self.priority))
+        response = self.inner.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._settle_stream(response, tokens)
+        self.limiter.settle(tokens, _usage_total(response))
+        return response
+
+    def _settle_stream(self, stream: Any, tokens: int) -> Iterator[Any]:
+        actual = 0
+        for chunk in stream:
+            actual = _usage_total(chunk) or actual       # 仅在请求了 include_usage 时最后一个 chunk 带 usage
+            yield chunk
+        self.limiter.settle(tokens, actual)
+
+
+class AsyncRateLimitedClient:
+    """
+    AsyncOpenAI 包装：取配额不阻塞事件循环。
+
+    inner 是可调用对象，在请求时返回当前事件循环可用的 AsyncOpenAI（连接绑定事件循环，不能跨循环共享）。
+    """
+
+    def __init__(self, inner: Callable[[], Any], limiter: RateLimiter, *, priority: str = "interactive") -> None:
+        self.inner = inner
+        self.limiter = limiter
+        self.priority = priority
+        self.chat = _Chat(self)
+
+    async def create(self, **kwargs: Any) -> Any:
+        tokens = request_tokens(kwargs) if self.limiter.enabled else 0
+        await self.limiter.aacquire(tokens, current_priority(self.priority))
+        response = await self.inner().chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._settle_stream(response, tokens)
+        self.limiter.settle(tokens, _usage_total(response))
+        return response
+
+    async def _settle_stream(self, stream: Any, tokens: int) -> AsyncIterator[Any]:
+        actual = 0
+        async for chunk in stream:
+            actual = _usage_total(chunk) or actual
+            yield chunk
+        self.limiter.settle(tokens, actual)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 进程级池
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ClientPool:
+    """
+    按 (base_url, api_key) 复用 client 与限流器。
+
+    同步 OpenAI client 进程内唯一（底层 httpx 连接池线程安全，keep-alive 连接跨 bundle 复用）；
+    AsyncOpenAI 按事件循环各建一个，循环销毁后随之释放。限流器以首次创建时的 rpm/tpm 为准。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., Any] = openai.OpenAI,
+        async_factory: Callable[..., Any] = openai.AsyncOpenAI,
+    ) -> None:
+        self._factory = factory
+        self._async_factory = async_factory
+        self._clients: dict[tuple[str | None, str, int | None], Any] = {}
+        self._async: dict[tuple[str | None, str, int | None], weakref.WeakKeyDictionary] = {}
+        self._limiters: dict[tuple[str | None, str], RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _options(base_url: str | None, api_key: str, max_retries: int | None) -> dict[str, Any]:
+        options: dict[str, Any] = {"base_url": base_url, "api_key": api_key}
+        if max_retries is not None:
+            options["max_retries"] = max_retries
+        return options
+
+    def client(self, base_url: str | None, api_key: str, *, max_retries: int | None = None) -> Any:
+        """max_retries 为 None 时沿用 SDK 默认重试；由上层（ProviderRouter）负责重试时传 0。"""
+        key = (base_url, api_key, max_retries)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = self._factory(**self._options(base_url, api_key, max_retries))
+            return self._clients[key]
+
+    def async_client(self, base_url: str | None, api_key: str, *, max_retries: int | None = None) -> Any:
+        """当前运行中事件循环的 AsyncOpenAI（必须在协程内调用）。"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            per_loop = self._async.setdefault((base_url, api_key, max_retries), weakref.WeakKeyDictionary())
+            client = per_loop.get(loop)
+            if client is None:
+                client = per_loop[loop] = self._async_factory(**self._options(base_url, api_key, max_retries))
+            return client
+
+    def limiter(self, base_url: str | None, api_key: str, *, rpm: int | None = None, tpm: int | None = None) -> RateLimiter:
+        key = (base_url, api_key)
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = RateLimiter(rpm=rpm, tpm=tpm)
+            return self._limiters[key]
+
+    def clients(
+        self,
+        base_url: str | None,
+        api_key: str,
+        *,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        priority: str = "interactive",
+        max_retries: int | None = None,
+    ) -> tuple[RateLimitedClient, AsyncRateLimitedClient]:
+        """给一个 bundle 用的 (同步, 异步) client：共享连接与限流器，默认优先级各自独立。"""
+        limiter = self.limiter(base_url, api_key, rpm=rpm, tpm=tpm)
+        return (
+            RateLimitedClient(self.client(base_url, api_key, max_retries=max_retries), limiter, priority=priority),
+            AsyncRateLimitedClient(
+                lambda: self.async_client(base_url, api_key, max_retries=max_retries), limiter, priority=priority,
+            ),
+        )
+
+
+_shared: ClientPool | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> ClientPool:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ClientPool()
+        return _shared
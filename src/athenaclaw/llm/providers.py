@@ -1,19 +1,21 @@
 """
-[INPUT]: base64, pathlib, typing, openai, agent.messages
-[OUTPUT]: LLMProvider, LLMResult, OpenAIChatProvider, provider error helpers
+[INPUT]: asyncio, threading, collections, typing, openai (OpenAI/AsyncOpenAI), agent.messages, llm.images
+[OUTPUT]: LLMProvider, LLMResult, OpenAIChatProvider（complete / acomplete）, CompiledMessageCache, usage_fields, provider error helpers
 [POS]: LLM provider 抽象层：统一内部消息与 provider SDK 之间的编解码
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from __future__ import annotations
 
-import base64
+import asyncio
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from pathlib import Path
 from typing import Any, Protocol
 
 import openai
 
+from athenaclaw.llm.images import ImageEncoder, provider_image_limits
 from athenaclaw.llm.messages import extract_text, normalize_history_message, normalize_parts
 
 
@@ -38,6 +40,64 @@ class LLMResult:
     finish_reason: str
     tool_calls: list[LLMToolCall] = field(default_factory=list)
     usage_total_tokens: int = 0
+    usage_prompt_tokens: int = 0
+    usage_cached_tokens: int = 0         # prompt 中命中 provider 前缀缓存的部分
+
+
+class _CompiledEntry:
+    __slots__ = ("source", "values", "compiled")
+
+    def __init__(self, source: dict[str, Any], compiled: dict[str, Any]) -> None:
+        self.source = source                     # 强引用：保证 id(source) 在条目存活期间不被复用
+        self.values = tuple(source.values())
+        self.compiled = compiled
+
+
+class CompiledMessageCache:
+    """
+    消息编译缓存：按消息 dict 的对象身份命中，LRU 淘汰。
+
+    history 里的消息约定为追加后不再修改；为防万一，命中时再逐个比对顶层字段的对象身份
+    （content / tool_calls 等被整体替换即视为编辑，重新编译），嵌套结构的原地修改不在检测范围内。
+    多个线程（主循环 / 后台预压缩）可能共用一个 provider，读写加锁。
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, _CompiledEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, message: dict[str, Any]) -> dict[str, Any] | None:
+        key = id(message)
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or entry.source is not message
+                or len(entry.values) != len(message)
+                or any(a is not b for a, b in zip(entry.values, message.values()))
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.compiled
+
+    def put(self, message: dict[str, Any], compiled: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[id(message)] = _CompiledEntry(message, compiled)
+            self._entries.move_to_end(id(message))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
 
 
 class LLMProvider(Protocol):
@@ -63,21 +123,53 @@ class OpenAIChatProvider:
         api_key: str | None = None,
         image_detail: str = "low",
         client: Any | None = None,
+        async_client: Any | None = None,
+        images: ImageEncoder | None = None,
     ) -> None:
         self.image_detail = image_detail or "low"
-        self.client = client or openai.OpenAI(
-            base_url=base_url,
-            api_key=api_key or "dummy",
-        )
-
-    def complete(
+        # 图片附件编码：默认按 image_detail 对应的服务端处理上限缩放，编码结果跨轮缓存
+        if images is None:
+            max_side, max_short_side = provider_image_limits(self.image_detail)
+            images = ImageEncoder(max_side=max_side, max_short_side=max_short_side)
+        self.images = images
+        self._base_url = base_url
+        self._api_key = api_key or "dummy"
+        # 注入了同步 client（测试 / 自定义网关）而没给 async_client 时，不自建异步连接，
+        # 避免两条路径打到不同的后端；Kernel.aturn 会退回线程执行同步调用。
+        self._client = client or openai.OpenAI(base_url=base_url, api_key=self._api_key)
+        self._owns_client = client is None
+        self._async_client = async_client
+        self._compiled = CompiledMessageCache()
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    @client.setter
+    def client(self, value: Any) -> None:
+        if value is not self._client:
+            self._client = value
+            self._owns_client = False
+            self._async_client = None
+
+    @property
+    def async_client(self) -> Any | None:
+        """AsyncOpenAI（首次使用时按同样的 base_url / api_key 创建）；注入自定义同步 client 时为 None。"""
+        if self._async_client is None and self._owns_client:
+            self._async_client = openai.AsyncOpenAI(base_url=self._base_url, api_key=self._api_key)
+        return self._async_client
+
+    @async_client.setter
+    def async_client(self, value: Any | None) -> None:
+        self._async_client = value
+
+    def _request(
         self,
-        *,
         model: str,
         messages: list[dict[str, Any]],
-        tools: list[dict[str, Any]] | None = None,
-        temperature: float | None = None,
-    ) -> LLMResult:
+        tools: list[dict[str, Any]] | None,
+        temperature: float | None,
+    ) -> dict[str, Any]:
         kwargs: dict[str, Any] = {
             "model": model,
             "messages": self.compile_messages(messages),
@@ -86,14 +178,49 @@ class OpenAIChatProvider:
             kwargs["tools"] = tools
         if temperature is not None:
             kwargs["temperature"] = temperature
+        return kwargs
+
+    def complete(
+        self,
+        *,
+        model: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        temperature: float | None = None,
+    ) -> LLMResult:
+        try:
+            response = self.client.chat.completions.create(**self._request(model, messages, tools, temperature))
+        except Exception as exc:
+            if _looks_like_unsupported_image(exc):
+                raise UnsupportedMediaError("当前 MODEL 不支持图片输入。请切换到支持 vision 的模型。") from exc
+            raise
+        return self._result(response)
 
+    async def acomplete(
+        self,
+        *,
+        model: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        temperature: float | None = None,
+    ) -> LLMResult:
+        """complete 的异步版；没有 async client 时在线程里执行同步请求。"""
+        client = self.async_client
+        if client is None:
+            return await asyncio.to_thread(
+                self.complete, model=model, messages=messages, tools=tools, temperature=temperature,
+            )
+        # 编译消息（含图片编码）在工作线程里做，不占事件循环
+        request = await asyncio.to_thread(self._request, model, messages, tools, temperature)
         try:
-            response = self.client.chat.completions.create(**kwargs)
+            response = await client.chat.completions.create(**request)
         except Exception as exc:
             if _looks_like_unsupported_image(exc):
                 raise UnsupportedMediaError("当前 MODEL 不支持图片输入。请切换到支持 vision 的模型。") from exc
             raise
+        return self._result(response)
 
+    def _result(self, response: Any) -> LLMResult:
         choice = response.choices[0]
         message = getattr(choice, "message", None)
         tool_calls = [
@@ -104,57 +231,75 @@ class OpenAIChatProvider:
             )
             for tc in (getattr(message, "tool_calls", None) or [])
         ]
-        usage_total_tokens = getattr(getattr(response, "usage", None), "total_tokens", 0) or 0
         return LLMResult(
             assistant_message=message_to_dict(message),
             finish_reason=str(getattr(choice, "finish_reason", "") or ""),
             tool_calls=tool_calls,
-            usage_total_tokens=int(usage_total_tokens),
+            **usage_fields(getattr(response, "usage", None)),
         )
 
     def compile_messages(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
-        compiled: list[dict[str, Any]] = []
+        """
+        统一消息 → chat.completions 消息。
+
+        逐条按对象身份查编译缓存：每次请求只有新追加的 history 消息需要编译，
+        之前的消息（含图片 data URL）直接复用。返回的 dict 与缓存共享，调用方不要原地修改。
+        """
+        cache = self._compiled
+        out: list[dict[str, Any]] = []
         for message in messages:
-            normalized = normalize_history_message(message)
-            role = str(normalized.get("role", "")).strip()
-
-            if role == "user":
-                compiled.append({
-                    "role": "user",
-                    "content": self._compile_user_parts(normalized.get("parts", [])),
-                })
-                continue
-
-            if role == "assistant":
-                payload: dict[str, Any] = {
-                    "role": "assistant",
-                    "content": normalized.get("content"),
-                }
-                if normalized.get("reasoning_content") is not None:
-                    payload["reasoning_content"] = normalized["reasoning_content"]
-                elif normalized.get("tool_calls"):
-                    # Some thinking-enabled providers require every assistant
-                    # tool-call message to include reasoning_content, even for
-                    # old sessions created before we preserved it.
-                    payload["reasoning_content"] = ""
-                if normalized.get("tool_calls"):
-                    payload["tool_calls"] = normalized["tool_calls"]
-                compiled.append(payload)
+            if message.get("role") == "system":
+                # system 前缀每轮新建且编译成本可忽略，不占缓存条目
+                out.append(self._compile_message(message))
                 continue
+            compiled = cache.get(message)
+            if compiled is None:
+                compiled = self._compile_message(message)
+                cache.put(message, compiled)
+            out.append(compiled)
+        return out
+
+    def invalidate_compiled(self) -> None:
+        """丢弃编译缓存（压缩换掉大段 history、修改 image_detail 等之后调用）。"""
+        self._compiled.clear()
+
+    def _compile_message(self, message: dict[str, Any]) -> dict[str, Any]:
+        normalized = normalize_history_message(message)
+        role = str(normalized.get("role", "")).strip()
+
+        if role == "user":
+            return {
+                "role": "user",
+                "content": self._compile_user_parts(normalized.get("parts", [])),
+            }
 
-            if role == "tool":
-                compiled.append({
-                    "role": "tool",
-                    "tool_call_id": normalized.get("tool_call_id"),
-                    "content": normalized.get("content", ""),
-                })
-                continue
+        if role == "assistant":
+            payload: dict[str, Any] = {
+                "role": "assistant",
+                "content": normalized.get("content"),
+            }
+            if normalized.get("reasoning_content") is not None:
+                payload["reasoning_content"] = normalized["reasoning_content"]
+            elif normalized.get("tool_calls"):
+                # Some thinking-enabled providers require every assistant
+                # tool-call message to include reasoning_content, even for
+                # old sessions created before we preserved it.
+                payload["reasoning_content"] = ""
+            if normalized.get("tool_calls"):
+                payload["tool_calls"] = normalized["tool_calls"]
+            return payload
+
+        if role == "tool":
+            return {
+                "role": "tool",
+                "tool_call_id": normalized.get("tool_call_id"),
+                "content": normalized.get("content", ""),
+            }
 
-            compiled.append({
-                "role": role,
-                "content": normalized.get("content", extract_text(normalized)),
-            })
-        return compiled
+        return {
+            "role": role,
+            "content": normalized.get("content", extract_text(normalized)),
+        }
 
     def _compile_user_parts(self, parts: Any) -> list[dict[str, Any]]:
         compiled: list[dict[str, Any]] = []
@@ -167,9 +312,9 @@ class OpenAIChatProvider:
                 compiled.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": _path_to_data_url(
-                            path=str(part.get("path", "")),
-                            mime_type=str(part.get("mime_type", "")),
+                        "url": self.images.data_url(
+                            str(part.get("path", "")),
+                            str(part.get("mime_type", "")),
                         ),
                         "detail": self.image_detail,
                     },
@@ -179,6 +324,29 @@ class OpenAIChatProvider:
         return compiled
 
 
+def usage_fields(usage: Any) -> dict[str, int]:
+    """
+    provider usage → LLMResult 的 usage_* 字段。
+
+    缓存命中数兼容两种口径：OpenAI 的 prompt_tokens_details.cached_tokens，
+    DeepSeek 的 prompt_cache_hit_tokens（在 model_extra 里）。
+    """
+    if usage is None:
+        return {"usage_total_tokens": 0, "usage_prompt_tokens": 0, "usage_cached_tokens": 0}
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    if cached is None:
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached is None:
+        model_extra = getattr(usage, "model_extra", None)
+        if isinstance(model_extra, dict):
+            cached = model_extra.get("prompt_cache_hit_tokens")
+    return {
+        "usage_total_tokens": int(getattr(usage, "total_tokens", 0) or 0),
+        "usage_prompt_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
+        "usage_cached_tokens": int(cached or 0),
+    }
+
+
 def message_to_dict(msg: Any) -> dict[str, Any]:
     """OpenAI message 对象 → 统一 dict。"""
     if msg is None:
@@ -209,12 +377,6 @@ def message_to_dict(msg: Any) -> dict[str, Any]:
     return data
 
 
-def _path_to_data_url(*, path: str, mime_type: str) -> str:
-    raw = Path(path).read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"data:{mime_type};base64,{encoded}"
-
-
 def _looks_like_unsupported_image(exc: Exception) -> bool:
     message = str(exc).lower()
     patterns = (
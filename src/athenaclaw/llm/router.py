@@ -0,0 +1,431 @@
+"""
+[INPUT]: asyncio, concurrent.futures, contextvars, random, threading, time, dataclasses, openai (错误类型)
+[OUTPUT]: Endpoint — 一个可用的 LLM 端点（client + 可选模型覆盖 + 健康状态）；EndpointHealth / shared_health；ProviderRouter — 多端点路由（瞬时错误抖动退避重试 /
+          连续失败熔断后切换端点 / 首 token 超时对冲第二个请求），对外提供 .client / .async_client；is_transient
+[POS]: LLM provider 的可靠性层：包在 OpenAIChatProvider 的 client 之下，provider.complete、kernel 流式路径、aturn 都经过它；
+       单个端点变慢或出错时不再卡住 / 打断用户的 turn
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator
+
+import openai
+
+
+TRANSIENT_STATUS = frozenset({408, 409, 425, 429})
+_END = object()
+
+
+def is_transient(exc: BaseException) -> bool:
+    """值得重试 / 换端点的错误：连接失败、超时、限流、5xx。4xx 参数错误、鉴权失败等直接抛出。"""
+    if isinstance(exc, openai.APIConnectionError):       # 含 APITimeoutError
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in TRANSIENT_STATUS or exc.status_code >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+@dataclass
+class EndpointHealth:
+    failures: int = 0                   # 连续瞬时失败次数
+    down_until: float = 0.0             # 熔断截止时间（clock 口径）
+    ttft_ms: float | None = None        # 首 token 延迟的指数滑动平均
+
+
+_health: dict[str, EndpointHealth] = {}
+_health_lock = threading.Lock()
+
+
+def shared_health(key: str) -> EndpointHealth:
+    """进程级健康状态：各 bundle 的 router 指向同一端点时共用，一个会话探明的故障其他会话立即避开。"""
+    with _health_lock:
+        if key not in _health:
+            _health[key] = EndpointHealth()
+        return _health[key]
+
+
+@dataclass
+class Endpoint:
+    """
+    一个端点：client 实现 chat.completions.create；async_client 同理（协程版）。
+    model 不为 None 时覆盖请求里的 model（备用端点往往是另一家 / 另一个模型）。
+    health 默认各自独立；需要跨 router 共享时传 shared_health(key)。
+    """
+
+    name: str
+    client: Any
+    async_client: Any | None = None
+    model: str | None = None
+    health: EndpointHealth = field(default_factory=EndpointHealth)
+
+
+class _Opened:
+    """已拿到首个响应的请求：非流式为完整响应，流式为 (首个 chunk, 剩余迭代器)。"""
+
+    __slots__ = ("endpoint", "response", "first", "rest")
+
+    def __init__(self, endpoint: Endpoint, response: Any, first: Any = _END, rest: Any = None) -> None:
+        self.endpoint = endpoint
+        self.response = response
+        self.first = first
+        self.rest = rest
+
+
+class ProviderRouter:
+    """
+    多端点 LLM 路由。
+
+    - 重试：瞬时错误（is_transient）最多重试 retries 次；下一次尝试轮换到下一个健康端点，
+      只有一个端点可用时按 full jitter 指数退避（random × min(max_backoff, backoff × 2^n)）后重试同一端点
+    - 熔断：端点连续失败 failure_threshold 次后 cooldown 秒内排到候选末尾（其余端点都不可用时仍会尝试）
+    - 对冲：hedge_after 秒内没拿到首 token（非流式为完整响应），向下一个候选端点再发一份，先到者胜，
+      落后的请求被取消 / 关闭。只在首 token 之前生效：流已经开始输出后中途出错不重试（增量已推给用户）
+
+    健康状态与事件回调（listener，通常挂 kernel.emit）只在调用方线程更新 / 触发。
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        *,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        hedge_after: float | None = None,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        listener: Callable[[str, dict], Any] | None = None,
+        sleep: Callable[[float], Any] = time.sleep,
+        rng: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("至少需要一个端点")
+        self.endpoints = list(endpoints)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after if hedge_after and hedge_after > 0 else None
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.listener = listener
+        self.sleep = sleep
+        self.rng = rng
+        self.clock = clock
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self.client = _RoutedClient(self)
+        self.async_client = _AsyncRoutedClient(self)
+
+    # ── 健康状态 ──────────────────────────────────────────────────────────────
+
+    def candidates(self) -> list[Endpoint]:
+        """健康端点按配置顺序在前，熔断中的按恢复时间排在后面。"""
+        now = self.clock()
+        with _health_lock:
+            healthy = [ep for ep in self.endpoints if ep.health.down_until <= now]
+            down = sorted((ep for ep in self.endpoints if ep.health.down_until > now), key=lambda ep: ep.health.down_until)
+        return healthy + down
+
+    def _succeeded(self, endpoint: Endpoint, ttft: float) -> None:
+        ms = ttft * 1000
+        with _health_lock:
+            health = endpoint.health
+            health.failures = 0
+            health.down_until = 0.0
+            health.ttft_ms = round(ms if health.ttft_ms is None else 0.8 * health.ttft_ms + 0.2 * ms, 3)
+
+    def _failed(self, endpoint: Endpoint, exc: BaseException) -> None:
+        if not is_transient(exc):
+            return
+        with _health_lock:
+            health = endpoint.health
+            health.failures += 1
+            tripped = health.failures >= self.failure_threshold and health.down_until <= self.clock()
+            if tripped:
+                health.down_until = self.clock() + self.cooldown
+            failures = health.failures
+        if tripped:
+            self._emit("llm.endpoint.down", {
+                "endpoint": endpoint.name, "failures": failures, "cooldown_s": self.cooldown,
+            })
+
+    def _emit(self, event: str, data: dict) -> None:
+        if self.listener is not None:
+            self.listener(event, data)
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = self.clock()
+        with _health_lock:
+            return [
+                {
+                    "endpoint": ep.name,
+                    "healthy": ep.health.down_until <= now,
+                    "failures": ep.health.failures,
+                    "ttft_ms": ep.health.ttft_ms,
+                }
+                for ep in self.endpoints
+            ]
+
+    # ── 调度 ──────────────────────────────────────────────────────────────────
+
+    def _pick(self, attempt: int) -> tuple[Endpoint, Endpoint]:
+        """(本次主端点, 对冲端点)：按尝试次数在候选中轮换；只有一个端点时对冲也发往它。"""
+        order = self.candidates()
+        now = self.clock()
+        healthy = [ep for ep in order if ep.health.down_until <= now] or order
+        primary = healthy[attempt % len(healthy)]
+        others = [ep for ep in order if ep is not primary]
+        return primary, (others[0] if others else primary)
+
+    def _request(self, endpoint: Endpoint, kwargs: dict[str, Any]) -> dict[str, Any]:
+        return kwargs if endpoint.model is None else {**kwargs, "model": endpoint.model}
+
+    def _delay(self, attempt: int) -> float:
+        return self.rng() * min(self.max_backoff, self.backoff * (2 ** attempt))
+
+    def _retry(self, attempt: int, endpoint: Endpoint, exc: BaseException) -> float:
+        """决定是否重试：返回重试前应等待的秒数（换端点时不等待）；非瞬时错误或次数用尽时重新抛出。"""
+        if not is_transient(exc) or attempt >= self.retries:
+            raise exc
+        next_primary, _ = self._pick(attempt + 1)
+        delay = 0.0 if next_primary is not endpoint else self._delay(attempt)
+        self._emit("llm.retry", {
+            "attempt": attempt + 1,
+            "endpoint": endpoint.name,
+            "next_endpoint": next_primary.name,
+            "delay_s": round(delay, 3),
+            "error_type": type(exc).__name__,
+            "error": str(exc),
+        })
+        return delay
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        同步对冲用的线程池（首 token 之前的请求在这里发出），每个 router 一个、按需创建。
+
+        一次请求最多占两个线程（主 + 对冲），落后的一路要等响应到达才释放，
+        所以按每个端点两个线程定容量：并发会话各自的 router 互不挤占。router 被回收时池随之退出。
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(4, 2 * len(self.endpoints)), thread_name_prefix="llm-hedge",
+                )
+            return self._executor
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 同步 client
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Chat:
+    def __init__(self, completions: Any) -> None:
+        self.completions = completions
+
+
+def _close(opened: _Opened) -> None:
+    close = getattr(opened.response, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def _discard(future: Future) -> None:
+    """对冲中落后的一路：拿到响应后立即关闭，不读剩余内容。"""
+    if future.exception() is None:
+        _close(future.result()[0])
+
+
+class _RoutedClient:
+    def __init__(self, router: ProviderRouter) -> None:
+        self.router = router
+        self.chat = _Chat(self)
+
+    def create(self, **kwargs: Any) -> Any:
+        router = self.router
+        attempt = 0
+        while True:
+            primary, hedge = router._pick(attempt)
+            try:
+                opened = self._race(primary, hedge, kwargs)
+                break
+            except Exception as exc:
+                failed = getattr(exc, "_endpoint", primary)
+                router._failed(failed, exc)
+                delay = router._retry(attempt, failed, exc)
+                if delay:
+                    router.sleep(delay)
+                attempt += 1
+        if opened.rest is None:
+            return opened.response
+        return self._resume(opened)
+
+    def _open(self, endpoint: Endpoint, kwargs: dict[str, Any]) -> tuple[_Opened, float]:
+        started = time.monotonic()
+        try:
+            response = endpoint.client.chat.completions.create(**self.router._request(endpoint, kwargs))
+            if not kwargs.get("stream"):
+                return _Opened(endpoint, response), time.monotonic() - started
+            rest = iter(response)
+            first = next(rest, _END)
+            return _Opened(endpoint, response, first, rest), time.monotonic() - started
+        except Exception as exc:
+            exc._endpoint = endpoint          # type: ignore[attr-defined]  # 对冲时标明是哪个端点失败
+            raise
+
+    def _race(self, primary: Endpoint, hedge: Endpoint, kwargs: dict[str, Any]) -> _Opened:
+        router = self.router
+        if router.hedge_after is None:
+            opened, ttft = self._open(primary, kwargs)
+            router._succeeded(primary, ttft)
+            return opened
+
+        # 每次提交复制调用方的 contextvars：llm_priority 等上下文要跟着请求进工作线程
+        first = router.executor.submit(contextvars.copy_context().run, self._open, primary, kwargs)
+        done, _ = wait([first], timeout=router.hedge_after)
+        pending: set[Future] = {first}
+        if not done:
+            router._emit("llm.hedge", {
+                "endpoint": primary.name, "hedge_endpoint": hedge.name, "after_ms": round(router.hedge_after * 1000),
+            })
+            pending.add(router.executor.submit(contextvars.copy_context().run, self._open, hedge, kwargs))
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is not None:
+                    if pending:                 # 另一路还在跑：记下失败，继续等
+                        router._failed(getattr(exc, "_endpoint", primary), exc)
+                    error = exc
+                    continue
+                opened, ttft = future.result()
+                router._succeeded(opened.endpoint, ttft)
+                for loser in pending:
+                    loser.add_done_callback(_discard)
+                return opened
+        assert error is not None
+        raise error
+
+    @staticmethod
+    def _resume(opened: _Opened) -> Iterator[Any]:
+        if opened.first is not _END:
+            yield opened.first
+        yield from opened.rest
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 异步 client
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _aclose(opened: _Opened) -> None:
+    close = getattr(opened.response, "close", None)
+    if callable(close):
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            pass
+
+
+class _AsyncRoutedClient:
+    def __init__(self, router: ProviderRouter) -> None:
+        self.router = router
+        self.chat = _Chat(self)
+
+    async def create(self, **kwargs: Any) -> Any:
+        router = self.router
+        attempt = 0
+        while True:
+            primary, hedge = router._pick(attempt)
+            try:
+                opened = await self._race(primary, hedge, kwargs)
+                break
+            except Exception as exc:
+                failed = getattr(exc, "_endpoint", primary)
+                router._failed(failed, exc)
+                delay = router._retry(attempt, failed, exc)
+                if delay:
+                    await asyncio.sleep(delay)
+                attempt += 1
+        if opened.rest is None:
+            return opened.response
+        return self._resume(opened)
+
+    async def _open(self, endpoint: Endpoint, kwargs: dict[str, Any]) -> tuple[_Opened, float]:
+        started = time.monotonic()
+        try:
+            client = endpoint.async_client
+            if client is None:
+                raise RuntimeError(f"端点 {endpoint.name} 没有配置异步 client")
+            response = await client.chat.completions.create(**self.router._request(endpoint, kwargs))
+            if not kwargs.get("stream"):
+                return _Opened(endpoint, response), time.monotonic() - started
+            rest = response.__aiter__()
+            try:
+                first = await rest.__anext__()
+            except StopAsyncIteration:
+                first = _END
+            return _Opened(endpoint, response, first, rest), time.monotonic() - started
+        except Exception as exc:
+            exc._endpoint = endpoint          # type: ignore[attr-defined]
+            raise
+
+    async def _race(self, primary: Endpoint, hedge: Endpoint, kwargs: dict[str, Any]) -> _Opened:
+        router = self.router
+        if router.hedge_after is None:
+            opened, ttft = await self._open(primary, kwargs)
+            router._succeeded(primary, ttft)
+            return opened
+
+        first = asyncio.ensure_future(self._open(primary, kwargs))
+        pending: set[asyncio.Future] = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=router.hedge_after)
+            if not done:
+                router._emit("llm.hedge", {
+                    "endpoint": primary.name, "hedge_endpoint": hedge.name, "after_ms": round(router.hedge_after * 1000),
+                })
+                pending.add(asyncio.ensure_future(self._open(hedge, kwargs)))
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is not None:
+                        if pending:
+                            router._failed(getattr(exc, "_endpoint", primary), exc)
+                        error = exc
+                        continue
+                    opened, ttft = task.result()
+                    router._succeeded(opened.endpoint, ttft)
+                    return opened
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:                # 落后的一路：取消；已经拿到响应的关闭连接
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    await _aclose(task.result()[0])
+                else:
+                    task.cancel()
+
+    @staticmethod
+    async def _resume(opened: _Opened) -> AsyncIterator[Any]:
+        if opened.first is not _END:
+            yield opened.first
+        async for chunk in opened.rest:
+            yield chunk
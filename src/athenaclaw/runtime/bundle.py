@@ -1,5 +1,5 @@
 """
-[INPUT]: os, pathlib, agent.kernel, agent.tools, agent.session_store, agent.providers, agent.automation, core.subagent（market adapters 仅 lazy import）
+[INPUT]: atexit, os, pathlib, agent.kernel, agent.tools, agent.session_store, agent.providers, agent.automation, core.subagent（market adapters 仅 lazy import）
 [OUTPUT]: AgentConfig, KernelBundle, build_kernel_bundle
 [POS]: 入口无关的 Kernel 组装层：统一 tools/permission/wire/trace/session_store/subagent 路径约定
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
@@ -7,6 +7,7 @@
 
 from __future__ import annotations
 
+import atexit
 import json
 import os
 from dataclasses import dataclass
@@ -14,16 +15,27 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Callable
 
-from athenaclaw.kernel import Kernel, MEMORY_MAX_CHARS, Permission
+from athenaclaw.kernel import AsyncSubscriber, Kernel, MEMORY_MAX_CHARS, Permission
 from athenaclaw.automation.store import AutomationStore
 from athenaclaw.automation import tools as automation_tools
+from athenaclaw.llm.cassette import Cassette, use_cassette
+from athenaclaw.llm.context import tiktoken_counter
+from athenaclaw.llm.images import ImageEncoder
+from athenaclaw.llm.pool import llm_priority, shared_pool
+from athenaclaw.llm.router import Endpoint, ProviderRouter, shared_health
 from athenaclaw.llm.providers import LLMProvider, OpenAIChatProvider
 from athenaclaw.runtime.session_store import JsonSessionStore, SessionStore
-from athenaclaw.tools import bash, compute, edit, market, portfolio, read, trade, watchlist, web, write
+from athenaclaw.tools import bash, compute, edit, market, portfolio, read, results, trade, watchlist, web, write
 from athenaclaw.trading import TradeAuditLog, TradeOrchestrator, TradePlanStore
 from athenaclaw.subagents import SubAgentDef
 
 
+PRECOMPACT_RATIO = 0.6           # history 超过 context_window 的 60% 时，turn 结束后在后台预先生成摘要
+RESULT_INLINE_CHARS = 12_000     # 工具结果序列化后超过该长度即转存为 result_get 句柄
+TRACE_QUEUE_SIZE = 4096          # trace 后台写入队列上限；满了先合并 llm.chunk，再丢最早的 llm.chunk
+TRACE_LOSSY_EVENTS = ("llm.chunk",)  # 积压时允许合并 / 丢弃的高频增量；其余事件一律保留
+
+
 def _detect_repo_root(cwd: Path) -> Path:
     env_root = os.getenv("ATHENACLAW_SOURCE_DIR")
     if env_root:
@@ -68,6 +80,15 @@ class AgentConfig:
     search_provider: str = "tavily"
     tavily_api_key: str | None = None
     image_detail: str = "low"
+    image_max_side: int | None = None       # None → 按 image_detail 取服务端上限；0 → 不缩放
+    cassette_path: Path | None = None       # 设置后 LLM 请求经录制/回放层（离线基准 / 回归）
+    cassette_mode: str = "replay"
+    cassette_latency: float = 0.0           # 回放时按录制延迟 × 该倍数等待；0 → 不等待
+    llm_rpm: int | None = None              # 进程内所有 bundle 共享的请求/分钟上限；None → 不限
+    llm_tpm: int | None = None              # 进程内所有 bundle 共享的 token/分钟上限；None → 不限
+    llm_fallbacks: list[dict] | None = None  # 备用端点 [{"base_url", "model", "api_key" | "api_key_env", "name", "rpm", "tpm"}]
+    llm_retries: int = 2                    # 瞬时错误的重试次数（轮换端点 / 抖动退避）
+    llm_hedge_ms: int = 0                   # 首 token 超过该毫秒数时对冲第二个请求；0 → 不对冲
     subagents: list[SubAgentDef] | None = None
     automation_default_timezone: str = "Asia/Shanghai"
     automation_task_scan_sec: int = 30
@@ -95,6 +116,18 @@ class AgentConfig:
         search_provider = os.getenv("ATHENACLAW_SEARCH_PROVIDER", "tavily")
         tavily_api_key = os.getenv("TAVILY_API_KEY") or None
         image_detail = (os.getenv("ATHENACLAW_IMAGE_DETAIL") or "low").strip().lower() or "low"
+        image_max_side_raw = (os.getenv("ATHENACLAW_IMAGE_MAX_SIDE") or "").strip()
+        image_max_side = int(image_max_side_raw) if image_max_side_raw else None
+        cassette_raw = (os.getenv("ATHENACLAW_CASSETTE") or "").strip()
+        cassette_path = Path(cassette_raw).expanduser() if cassette_raw else None
+        cassette_mode = (os.getenv("ATHENACLAW_CASSETTE_MODE") or "replay").strip().lower()
+        cassette_latency = float(os.getenv("ATHENACLAW_CASSETTE_LATENCY", "0") or 0)
+        llm_rpm = int(os.getenv("ATHENACLAW_LLM_RPM", "0") or 0) or None
+        llm_tpm = int(os.getenv("ATHENACLAW_LLM_TPM", "0") or 0) or None
+        llm_fallbacks_raw = (os.getenv("ATHENACLAW_LLM_FALLBACKS") or "").strip()
+        llm_fallbacks = json.loads(llm_fallbacks_raw) if llm_fallbacks_raw else None
+        llm_retries = int(os.getenv("ATHENACLAW_LLM_RETRIES", "2") or 0)
+        llm_hedge_ms = int(os.getenv("ATHENACLAW_LLM_HEDGE_MS", "0") or 0)
         automation_default_timezone = os.getenv("ATHENACLAW_AUTOMATION_DEFAULT_TIMEZONE", "Asia/Shanghai")
         automation_task_scan_sec = int(os.getenv("ATHENACLAW_AUTOMATION_TASK_SCAN_SEC", "30"))
         trade_broker = os.getenv("ATHENACLAW_TRADE_BROKER") or None
@@ -119,6 +152,15 @@ class AgentConfig:
             search_provider=search_provider,
             tavily_api_key=tavily_api_key,
             image_detail=image_detail,
+            image_max_side=image_max_side,
+            cassette_path=cassette_path,
+            cassette_mode=cassette_mode,
+            cassette_latency=cassette_latency,
+            llm_rpm=llm_rpm,
+            llm_tpm=llm_tpm,
+            llm_fallbacks=llm_fallbacks,
+            llm_retries=llm_retries,
+            llm_hedge_ms=llm_hedge_ms,
             automation_default_timezone=automation_default_timezone,
             automation_task_scan_sec=automation_task_scan_sec,
             trade_broker=trade_broker,
@@ -136,6 +178,17 @@ class KernelBundle:
     session_store: SessionStore
     session_path: Path
     trace_path: Path
+    trace_writer: AsyncSubscriber | None = None
+
+    def close(self) -> None:
+        """
+        释放 bundle 持有的后台资源：停掉 kernel 的预压缩线程，落盘剩余 trace 并停掉写入线程，撤销对应的 atexit 钩子。
+        按次构建 bundle 的调用方（automation 每次 run、IM 每个会话）用完必须调用；可重复调用。
+        """
+        self.kernel.close()
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            atexit.unregister(self.trace_writer.close)
 
 
 class LLMCompressor:
@@ -146,22 +199,70 @@ class LLMCompressor:
         self.model = model
 
     def compress(self, content: str, limit: int) -> str:
-        response = self.provider.complete(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": (
-                    f"你是记忆压缩器。将以下记忆精简到{limit}字以内。"
-                    "保持 newest-first 倒排结构。保留最新和最重要的条目。"
-                    "合并相近主题的旧条目，丢弃过时的细节。保持 markdown 格式。"
-                )},
-                {"role": "user", "content": content},
-            ],
-        )
+        with llm_priority("compaction"):
+            response = self.provider.complete(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": (
+                        f"你是记忆压缩器。将以下记忆精简到{limit}字以内。"
+                        "保持 newest-first 倒排结构。保留最新和最重要的条目。"
+                        "合并相近主题的旧条目，丢弃过时的细节。保持 markdown 格式。"
+                    )},
+                    {"role": "user", "content": content},
+                ],
+            )
         return str(response.assistant_message.get("content") or content[:limit])
 
 
-def _wire_trace(kernel: Kernel, trace_path: Path) -> None:
-    """挂载 JSONL trace — 通过 wire/emit 零侵入记录 turn/tool 等事件。"""
+def _llm_endpoint(
+    name: str,
+    base_url: str | None,
+    api_key: str,
+    model: str | None,
+    *,
+    priority: str,
+    rpm: int | None,
+    tpm: int | None,
+) -> Endpoint:
+    # 进程内共享连接与限流器；automation 任务排在交互会话之后，压缩再往后（见 llm.pool）。
+    # 重试由 router 负责，关掉 SDK 自带的重试，避免两层叠加
+    client, async_client = shared_pool().clients(
+        base_url, api_key, rpm=rpm, tpm=tpm, priority=priority, max_retries=0,
+    )
+    return Endpoint(
+        name=name,
+        client=client,
+        async_client=async_client,
+        model=model,
+        health=shared_health(f"{base_url or 'default'}#{model or '*'}"),
+    )
+
+
+def _llm_router(config: AgentConfig, *, priority: str) -> ProviderRouter:
+    """主端点 + 备用端点（ATHENACLAW_LLM_FALLBACKS）→ 带重试 / 熔断 / 对冲的 router。"""
+    endpoints = [_llm_endpoint(
+        "primary", config.base_url, config.api_key or "dummy", None,
+        priority=priority, rpm=config.llm_rpm, tpm=config.llm_tpm,
+    )]
+    for i, spec in enumerate(config.llm_fallbacks or (), 1):
+        api_key = spec.get("api_key") or os.getenv(str(spec.get("api_key_env") or "")) or config.api_key or "dummy"
+        endpoints.append(_llm_endpoint(
+            str(spec.get("name") or f"fallback{i}"), spec.get("base_url"), api_key, spec.get("model"),
+            priority=priority, rpm=spec.get("rpm"), tpm=spec.get("tpm"),
+        ))
+    return ProviderRouter(
+        endpoints, retries=config.llm_retries, hedge_after=config.llm_hedge_ms / 1000 or None,
+    )
+
+
+def _wire_trace(kernel: Kernel, trace_path: Path) -> AsyncSubscriber:
+    """
+    挂载 JSONL trace — 通过 wire/emit 零侵入记录 turn/tool 等事件。
+
+    落盘在后台线程完成（单线程写入，天然有序），emit 只入队，不拖慢 llm.chunk 流；
+    积压时只合并 / 丢弃 llm.chunk 增量，turn / tool 等生命周期事件总会落盘。
+    进程退出前 flush 剩余记录；bundle.close() 提前关闭并撤销退出钩子。
+    """
     trace_path.parent.mkdir(parents=True, exist_ok=True)
 
     def _append(event: str, data: object) -> None:
@@ -170,16 +271,17 @@ def _wire_trace(kernel: Kernel, trace_path: Path) -> None:
             "event": event,
             "data": data,
         }
+        line = json.dumps(record, default=str, ensure_ascii=False) + "\n"
         with open(trace_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+            f.write(line)
 
-    kernel.wire("turn.*", _append)
-    kernel.wire("tool:*", _append)
-    kernel.wire("llm.*", _append)
-    kernel.wire("tool.*", _append)
-    kernel.wire("subagent.*", _append)
-    kernel.wire("memory.compressed", _append)
-    kernel.wire("context.*", _append)
+    writer = AsyncSubscriber(
+        _append, maxsize=TRACE_QUEUE_SIZE, overflow="coalesce", lossy=TRACE_LOSSY_EVENTS, name="trace",
+    )
+    for pattern in ("turn.*", "tool:*", "llm.*", "tool.*", "subagent.*", "memory.compressed", "context.*", "compute.*"):
+        kernel.wire(pattern, writer)
+    atexit.register(writer.close)
+    return writer
 
 
 def _on_memory_write(kernel: Kernel, workspace: Path, compressor: LLMCompressor) -> None:
@@ -289,17 +391,27 @@ def build_kernel_bundle(
     workspace.mkdir(parents=True, exist_ok=True)
     state.mkdir(parents=True, exist_ok=True)
 
+    router = _llm_router(config, priority="automation" if adapter_name == "automation" else "interactive")
     provider = OpenAIChatProvider(
-        base_url=config.base_url,
-        api_key=config.api_key,
+        client=router.client,
+        async_client=router.async_client,
         image_detail=config.image_detail,
+        images=None if config.image_max_side is None else ImageEncoder(max_side=config.image_max_side or None),
     )
+    if config.cassette_path is not None:
+        use_cassette(provider, Cassette(
+            config.cassette_path, mode=config.cassette_mode, latency_scale=config.cassette_latency,
+        ))
     repo_root = _detect_repo_root(cwd)
     kernel = Kernel(
         model=config.model,
         provider=provider,
         context_window=config.context_window, compact_recent_turns=config.compact_recent_turns,
     )
+    router.listener = kernel.emit
+    kernel.token_counter = tiktoken_counter()
+    kernel.result_inline_chars = RESULT_INLINE_CHARS
+    kernel.precompact_ratio = PRECOMPACT_RATIO
     kernel.data.set(
         "_runtime_paths",
         {
@@ -334,6 +446,7 @@ def build_kernel_bundle(
         from athenaclaw.integrations.web.tavily import TavilyAdapter
         search_adapter = TavilyAdapter(api_key=config.tavily_api_key)
     web.register(kernel, search_adapter=search_adapter)
+    results.register(kernel)
 
     automation_store = AutomationStore(workspace=workspace, state=state)
 
@@ -410,7 +523,7 @@ def build_kernel_bundle(
     session_path = state / "sessions" / adapter_name / f"{safe_conv}.json"
     trace_path = state / "traces" / adapter_name / f"{safe_conv}.jsonl"
 
-    _wire_trace(kernel, trace_path)
+    trace_writer = _wire_trace(kernel, trace_path)
 
     store = JsonSessionStore(session_path)
     return KernelBundle(
@@ -420,4 +533,5 @@ def build_kernel_bundle(
         session_store=store,
         session_path=session_path,
         trace_path=trace_path,
+        trace_writer=trace_writer,
     )
@@ -1,7 +1,7 @@
 """
 [INPUT]: json, pathlib, agent.messages
 [OUTPUT]: SessionStore, JsonSessionStore
-[POS]: 会话持久化基础设施（入口无关）：原子写入 + 兼容旧格式
+[POS]: 会话持久化基础设施（入口无关）：原子写入 + 兼容旧格式 + 大结果句柄目录（<session>.results/）
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
@@ -13,7 +13,9 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Protocol
 
-from athenaclaw.kernel import Session
+from athenaclaw.kernel import ResultStore, Session
+from athenaclaw.kernel.results import referenced_handles
+from athenaclaw.kernel.service import results_dir
 from athenaclaw.llm.messages import normalize_history
 
 
@@ -48,6 +50,7 @@ class JsonSessionStore(SessionStore):
         history = data.get("history", [])
 
         s = Session(session_id=session_id)
+        s.results = ResultStore(root=results_dir(self.path))
         if isinstance(history, list):
             s.history = normalize_history(history)
         s.repair()
@@ -69,3 +72,4 @@ class JsonSessionStore(SessionStore):
             encoding="utf-8",
         )
         tmp.replace(self.path)
+        session.results.persist(results_dir(self.path), keep=referenced_handles(session.history))
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from importlib import import_module
 
-__all__ = ["bash", "compute", "edit", "market", "portfolio", "read", "shell", "trade", "watchlist", "web", "write"]
+__all__ = ["bash", "compute", "edit", "market", "portfolio", "read", "results", "shell", "trade", "watchlist", "web", "write"]
 
 _EXPORTS = {
     "bash": ("athenaclaw.tools.shell.tool", None),
@@ -11,6 +11,7 @@ _EXPORTS = {
     "market": ("athenaclaw.tools.market.tool", None),
     "portfolio": ("athenaclaw.tools.portfolio.tool", None),
     "read": ("athenaclaw.tools.filesystem.read", None),
+    "results": ("athenaclaw.tools.results.tool", None),
     "shell": ("athenaclaw.tools.shell.tool", None),
     "trade": ("athenaclaw.tools.trade.tool", None),
     "watchlist": ("athenaclaw.tools.watchlist.tool", None),
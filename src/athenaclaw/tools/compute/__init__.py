@@ -1,4 +1,29 @@
+from athenaclaw.tools.compute.fanout import run_map
+from athenaclaw.tools.compute.panel import Panel, align_panel
+from athenaclaw.tools.compute.profile import ComputeProfiler, compute_profiler
+from athenaclaw.tools.compute.resample import bootstrap, monte_carlo
+from athenaclaw.tools.compute.robustness import walk_forward
 from athenaclaw.tools.compute.sandbox import HELPERS, exec_compute
+from athenaclaw.tools.compute.scope import ComputeScopes, compute_scopes
+from athenaclaw.tools.compute.streaming import IndicatorEngine, indicator_engine
+from athenaclaw.tools.compute.sweep import run_sweep
 from athenaclaw.tools.compute.tool import register
 
-__all__ = ["HELPERS", "exec_compute", "register"]
+__all__ = [
+    "ComputeProfiler",
+    "ComputeScopes",
+    "HELPERS",
+    "IndicatorEngine",
+    "Panel",
+    "align_panel",
+    "bootstrap",
+    "compute_profiler",
+    "compute_scopes",
+    "exec_compute",
+    "indicator_engine",
+    "monte_carlo",
+    "register",
+    "run_map",
+    "run_sweep",
+    "walk_forward",
+]
@@ -0,0 +1,222 @@
+"""
+[INPUT]: numpy, pandas
+[OUTPUT]: backtest — 向量化单标的信号回测（持仓/成交/权益曲线/回撤/常用指标）；strategy_returns — 逐 bar 策略收益；periods_per_year — 年化周期推断
+[POS]: compute 沙箱 helper 层；全程 NumPy 向量化，分钟级数据也能在 500ms 预算内完成
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+# 输出治理：回测结果直接交给 _serialize，保持小而扁平
+_MAX_TRADES = 20
+_MAX_CURVE_POINTS = 60
+_TRADING_DAYS = 252
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 输入规整
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _positions(signals: Any, n: int, size: float) -> np.ndarray:
+    """信号 → 目标仓位数组：bool 视作 1/0，NaN 视作空仓，结果乘以 size。"""
+    if isinstance(signals, pd.DataFrame):
+        raise TypeError("signals 必须是一维序列（Series/ndarray/list），不能是 DataFrame")
+    arr = np.asarray(signals.to_numpy() if isinstance(signals, pd.Series) else signals)
+    if arr.ndim != 1:
+        raise ValueError(f"signals 必须是一维，收到 shape={arr.shape}")
+    if len(arr) != n:
+        raise ValueError(f"signals 长度({len(arr)})必须与 df 行数({n})一致")
+    pos = arr.astype(float)
+    pos[~np.isfinite(pos)] = 0.0
+    return pos * float(size)
+
+
+def periods_per_year(dates: pd.Series) -> float:
+    """按 bar 间隔推断年化周期数：日线 252，周/月线按日历折算，分钟线按每日 bar 数 × 252。"""
+    ts = pd.to_datetime(dates)
+    if len(ts) < 2:
+        return float(_TRADING_DAYS)
+    step = ts.diff().median()
+    if pd.isna(step) or step < pd.Timedelta(0):
+        return float(_TRADING_DAYS)
+    if step >= pd.Timedelta(days=2):
+        return 365.25 / (step / pd.Timedelta(days=1))
+    if step >= pd.Timedelta(days=1):
+        return float(_TRADING_DAYS)
+    bars_per_day = float(ts.dt.normalize().value_counts().median())
+    return bars_per_day * _TRADING_DAYS
+
+
+infer_ppy = periods_per_year  # backtest 的同名参数会遮蔽函数名
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 回测
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _simulate(
+    signals: Any, df: pd.DataFrame, fees: float, slippage: float, size: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]:
+    """核心向量化模拟：返回 (close, pos, held, turnover, strat_ret, cost)。"""
+    close = df["close"].to_numpy(dtype=float)
+    n = len(close)
+    if n < 2:
+        raise ValueError("backtest 至少需要 2 根 bar")
+    pos = _positions(signals, n, size)
+    cost = float(fees) + float(slippage)
+
+    bar_ret = np.zeros(n)
+    bar_ret[1:] = close[1:] / close[:-1] - 1.0
+    held = np.concatenate(([0.0], pos[:-1]))          # 第 t 根 bar 期间实际持有的仓位
+    turnover = np.abs(np.diff(pos, prepend=0.0))       # 第 t 根收盘的调仓量
+    strat_ret = held * bar_ret - turnover * cost
+    return close, pos, held, turnover, strat_ret, cost
+
+
+def strategy_returns(
+    signals: Any,
+    df: pd.DataFrame,
+    fees: float = 0.0,
+    slippage: float = 0.0,
+    size: float = 1.0,
+) -> pd.Series:
+    """与 backtest 同口径的逐 bar 策略收益序列（RangeIndex，首根为 0），供稳健性分析重采样。"""
+    return pd.Series(_simulate(signals, df, fees, slippage, size)[4], name="strategy_return")
+
+
+def backtest(
+    signals: Any,
+    df: pd.DataFrame,
+    fees: float = 0.0,
+    slippage: float = 0.0,
+    size: float = 1.0,
+    periods_per_year: float | None = None,
+) -> dict[str, Any]:
+    """
+    向量化信号回测。
+
+    signals[t] 为第 t 根 bar 收盘后的目标仓位（1 多 / 0 空仓 / -1 空；bool 视作 1/0），
+    按 close[t] 成交，从 t+1 开始承担收益，不存在未来函数。
+    fees/slippage 为单边比例成本（0.001 = 10bp），按仓位变动量 |Δpos| 扣除；size 为仓位占权益比例。
+    返回 {"metrics", "trades"(最近 20 笔；未平仓的 exit 为 None、按最新收盘估值), "equity_curve"(≤60 点降采样)}，可直接作为 compute 结果。
+    """
+    close, pos, held, turnover, strat_ret, cost = _simulate(signals, df, fees, slippage, size)
+    equity = np.cumprod(1.0 + strat_ret)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+
+    ppy = float(periods_per_year) if periods_per_year else infer_ppy(df["date"])
+    trade_rets, trades = _trades(pos, close, df["date"], cost)
+    metrics = _metrics(strat_ret, equity, drawdown, held, turnover, trade_rets, close, ppy)
+
+    return {
+        "metrics": metrics,
+        "trades": trades,
+        "equity_curve": _curve(df["date"], equity, drawdown),
+    }
+
+
+def _trades(
+    pos: np.ndarray, close: np.ndarray, dates: pd.Series, cost: float,
+) -> tuple[np.ndarray, list[dict[str, Any]]]:
+    """
+    把仓位分段为交易：仓位每次变化即平掉旧段、开新段（反手 = 一平一开）。
+
+    返回 (全部交易净收益数组, 最近 _MAX_TRADES 笔交易明细)。
+    """
+    n = len(pos)
+    change = np.flatnonzero(np.diff(pos, prepend=0.0) != 0)
+    if change.size == 0:
+        return np.empty(0), []
+    ends = np.append(change[1:], n - 1)
+    mask = pos[change] != 0
+    entries, exits = change[mask], ends[mask]
+    sizes = pos[entries]
+    gross = sizes * (close[exits] / close[entries] - 1.0)
+    net = gross - np.abs(sizes) * cost * 2
+    is_open = (entries == change[-1]) & (pos[-1] != 0)
+
+    # 只格式化需要输出的那几笔，避免对整列时间戳做 strftime
+    tail = slice(-_MAX_TRADES, None)
+    entries, exits, sizes, shown, is_open = entries[tail], exits[tail], sizes[tail], net[tail], is_open[tail]
+    ts = pd.to_datetime(dates)
+    entry_stamp = ts.iloc[entries].dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+    exit_stamp = ts.iloc[exits].dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+
+    return net, [
+        {
+            "entry": str(es),
+            "exit": None if o else str(xs),
+            "side": "long" if s > 0 else "short",
+            "size": float(abs(s)),
+            "entry_price": float(close[e]),
+            "exit_price": float(close[x]),
+            "bars": int(x - e),
+            "return": float(r),
+        }
+        for e, x, es, xs, s, r, o in zip(entries, exits, entry_stamp, exit_stamp, sizes, shown, is_open)
+    ]
+
+
+def _metrics(
+    strat_ret: np.ndarray,
+    equity: np.ndarray,
+    drawdown: np.ndarray,
+    held: np.ndarray,
+    turnover: np.ndarray,
+    trade_rets: np.ndarray,
+    close: np.ndarray,
+    ppy: float,
+) -> dict[str, Any]:
+    n = len(equity)
+    total = float(equity[-1] - 1.0)
+    years = (n - 1) / ppy if ppy > 0 else 0.0
+    cagr = float(equity[-1] ** (1.0 / years) - 1.0) if years > 0 and equity[-1] > 0 else None
+    rets = strat_ret[1:]
+    std = float(rets.std(ddof=1)) if rets.size > 1 else 0.0
+    sharpe = float(rets.mean() / std * np.sqrt(ppy)) if std > 0 else None
+    downside = rets[rets < 0]
+    down_std = float(np.sqrt((downside ** 2).sum() / rets.size)) if downside.size else 0.0
+    sortino = float(rets.mean() / down_std * np.sqrt(ppy)) if down_std > 0 else None
+    max_dd = float(drawdown.min())
+
+    wins = trade_rets[trade_rets > 0]
+    losses = trade_rets[trade_rets < 0]
+    return {
+        "total_return": total,
+        "cagr": cagr,
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "max_drawdown": max_dd,
+        "calmar": float(cagr / abs(max_dd)) if cagr is not None and max_dd < 0 else None,
+        "volatility": float(std * np.sqrt(ppy)),
+        "n_trades": int(trade_rets.size),
+        "win_rate": float(wins.size / trade_rets.size) if trade_rets.size else None,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.size else None,
+        "avg_trade_return": float(trade_rets.mean()) if trade_rets.size else None,
+        "exposure": float(np.mean(held[1:] != 0)),
+        "turnover": float(turnover.sum()),
+        "buy_and_hold_return": float(close[-1] / close[0] - 1.0),
+        "final_equity": float(equity[-1]),
+        "bars": n,
+        "periods_per_year": ppy,
+    }
+
+
+def _curve(dates: pd.Series, equity: np.ndarray, drawdown: np.ndarray) -> list[dict[str, Any]]:
+    """等距降采样权益曲线（保留首尾与最大回撤点）。"""
+    n = len(equity)
+    idx = np.unique(np.concatenate((
+        np.linspace(0, n - 1, min(n, _MAX_CURVE_POINTS - 1)).astype(int),
+        [int(np.argmin(drawdown))],
+    )))
+    stamp = pd.to_datetime(dates).iloc[idx].dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+    return [
+        {"date": str(d), "equity": float(equity[i]), "drawdown": float(drawdown[i])}
+        for d, i in zip(stamp, idx)
+    ]
@@ -0,0 +1,70 @@
+"""
+[INPUT]: pandas, polars(可选)
+[OUTPUT]: ENGINES / polars_available — 引擎清单；polars_namespace — 把 OHLCV 转成 polars 注入变量；summarize_polars — polars 结果摘要
+[POS]: compute 列式执行引擎：engine="polars" 时注入 DataFrame/LazyFrame（多线程、列式），pandas 仍是默认
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import pandas as pd
+
+try:
+    import polars as pl
+except ModuleNotFoundError:  # pragma: no cover - polars 是可选依赖
+    pl = None
+
+
+ENGINES = ("pandas", "polars")
+_COLUMNS = ("open", "high", "low", "close", "volume", "date")
+
+
+def polars_available() -> bool:
+    return pl is not None
+
+
+def polars_namespace(df: pd.DataFrame) -> dict[str, Any]:
+    """
+    OHLCV → polars 注入变量：df(DataFrame) / lf(LazyFrame) / 各列 pl.Series / pl 模块。
+
+    polars 对象不可变，无需像 pandas 路径那样先 copy 防回写。
+    """
+    if pl is None:
+        raise ModuleNotFoundError("polars 未安装")
+    frame = pl.from_pandas(df)
+    ns: dict[str, Any] = {"pl": pl, "df": frame, "lf": frame.lazy()}
+    ns.update({col: frame.get_column(col) for col in _COLUMNS if col in frame.columns})
+    return ns
+
+
+def is_polars(value: Any) -> bool:
+    return pl is not None and isinstance(value, (pl.DataFrame, pl.LazyFrame, pl.Series))
+
+
+def summarize_polars(
+    value: Any, serialize: Callable[[Any, int], Any], depth: int, max_rows: int, max_cols: int,
+) -> Any:
+    """
+    与 pandas 输出治理同口径：Series → 末值；DataFrame/LazyFrame → shape + 列名 + 末几行。
+
+    LazyFrame 在这里 collect（结果本身就是用户要的查询）；只把展示的末几行转成 Python 对象。
+    """
+    if isinstance(value, pl.LazyFrame):
+        value = value.collect()
+    if isinstance(value, pl.Series):
+        if value.is_empty():
+            return None
+        return serialize(value[-1], depth + 1)
+
+    rows, cols = value.shape
+    columns = value.columns[:max_cols]
+    tail = value.select(columns).tail(max_rows)
+    return {
+        "_type": "dataframe",
+        "shape": [rows, cols],
+        "columns": [str(c) for c in columns],
+        "tail": [{str(k): serialize(v, depth + 1) for k, v in row.items()} for row in tail.iter_rows(named=True)],
+        "truncated": rows > max_rows or cols > max_cols,
+    }
@@ -0,0 +1,192 @@
+"""
+[INPUT]: athenaclaw.kernel (Kernel), ast, time, typing, pandas, athenaclaw.tools.compute.{parallel,sandbox,source,streaming}, athenaclaw.tools.market.schema
+[OUTPUT]: register() — compute_map 工具；run_map — 同一段代码按标的并行执行并汇总成表
+[POS]: compute 扇出层：一次工具调用替代对 N 个标的逐个 compute，单标的失败不影响整批
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import ast
+import time
+from typing import Any
+
+import pandas as pd
+
+from athenaclaw.tools.compute.parallel import run_chunked
+from athenaclaw.tools.compute.sandbox import exec_compute
+from athenaclaw.tools.compute.source import current_account, resolve_frame, resolve_key
+from athenaclaw.tools.compute.streaming import indicator_engine
+from athenaclaw.tools.market.schema import normalize_interval, normalize_symbol
+
+
+MAX_TARGETS = 200
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 执行（worker 进程内运行，必须是模块级函数）
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _map_chunk(shared: tuple, targets: list[tuple[str, pd.DataFrame, dict]]) -> list[dict[str, Any]]:
+    """逐个标的执行同一段代码；每个标的只随任务序列化自己的 df。"""
+    code, account, timeout_ms = shared
+    rows: list[dict[str, Any]] = []
+    for label, df, live in targets:
+        out = exec_compute(code, df, account, timeout_ms=timeout_ms, extra_ns={"symbol": label, "live": live})
+        if "error" in out:
+            rows.append({"symbol": label, "error": out["error"]})
+        else:
+            rows.append({"symbol": label, "result": out.get("result")})
+    return rows
+
+
+def _as_row(label: str, value: Any) -> dict[str, Any]:
+    """标量结果 → value 列；扁平 dict 结果 → 展开为列。"""
+    if isinstance(value, dict) and not value.get("_type"):
+        return {"symbol": label, **{k: v for k, v in value.items() if k != "symbol"}}
+    return {"symbol": label, "value": value}
+
+
+def _sort_key(value: Any, descending: bool) -> tuple[int, float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return (1, 0.0)
+    return (0, -float(value) if descending else float(value))
+
+
+def run_map(
+    code: str,
+    frames: dict[str, pd.DataFrame],
+    account: dict[str, Any],
+    *,
+    live: dict[str, dict] | None = None,
+    sort_by: str | None = None,
+    descending: bool = True,
+    timeout_ms: int = 500,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """
+    对 frames 中每个标的执行 code，结果汇总为一张表。
+
+    代码先统一做语法校验，语法错误直接整体返回；运行期错误按标的记入 errors，不中断整批。
+    sort_by 指定列时按该列排序（缺失/非数值排在最后）。
+    """
+    try:
+        ast.parse(code.strip(), "<compute_map>", "exec")
+    except SyntaxError as exc:
+        return {"error": f"SyntaxError: {exc}", "remediation": "检查 Python 语法（缩进/冒号/括号）。"}
+
+    live = live or {}
+    targets = [(label, df, live.get(label) or {}) for label, df in frames.items()]
+    started = time.perf_counter()
+    results, info = run_chunked(_map_chunk, (code, account, timeout_ms), targets, workers=workers)
+
+    rows = [_as_row(r["symbol"], r["result"]) for r in results if "error" not in r]
+    errors = [r for r in results if "error" in r]
+    if sort_by:
+        rows.sort(key=lambda r: _sort_key(r.get(sort_by), descending))
+
+    return {
+        "rows": rows,
+        "errors": errors,
+        "succeeded": len(rows),
+        "failed": len(errors),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        **info,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 注册
+# ─────────────────────────────────────────────────────────────────────────────
+
+def register(kernel: object) -> None:
+    """向 Kernel 注册 compute_map 工具"""
+
+    def compute_map(args: dict) -> dict:
+        symbols = [str(s).strip() for s in (args.get("symbols") or []) if str(s).strip()]
+        keys = [str(k).strip() for k in (args.get("keys") or []) if str(k).strip()]
+        if not symbols and not keys:
+            return {"error": "compute_map 需要 symbols 或 keys"}
+        if len(symbols) + len(keys) > MAX_TARGETS:
+            return {"error": f"一次最多 {MAX_TARGETS} 个标的/数据集"}
+
+        interval = args.get("interval")
+        frames: dict[str, pd.DataFrame] = {}
+        missing: list[dict[str, str]] = []
+        resolved: list[dict[str, Any]] = []
+        for sym in symbols:
+            label = normalize_symbol(sym)
+            fetched = len(resolved)
+            df = resolve_frame(kernel, sym, interval, args.get("mode"), args.get("start"), args.get("end"), resolved)
+            if df is not None:
+                frames[label] = df
+            elif len(resolved) > fetched:
+                missing.append({"symbol": label, "error": f"自动取数失败: {resolved[-1]['error']}"})
+            else:
+                missing.append({"symbol": label, "error": "未找到 OHLCV，请先用相同 selector 调用 market_ohlcv"})
+        for key in keys:
+            fetched = len(resolved)
+            df = resolve_key(kernel, key, resolved)
+            if df is not None:
+                frames[key] = df
+            elif len(resolved) > fetched:
+                missing.append({"symbol": key, "error": f"自动取数失败: {resolved[-1]['error']}"})
+            else:
+                missing.append({"symbol": key, "error": "DataStore 中没有该 key 的 DataFrame"})
+
+        engine = indicator_engine(kernel)
+        resolved_interval = normalize_interval(interval)
+        live = {label: engine.snapshot(label, resolved_interval) or {} for label in frames}
+        result = run_map(
+            args["code"],
+            frames,
+            current_account(kernel),
+            live=live,
+            sort_by=args.get("sort_by"),
+            descending=bool(args.get("descending", True)),
+        ) if frames else {"rows": [], "errors": [], "succeeded": 0, "failed": 0}
+        if "error" in result:
+            return result
+        result["errors"] = missing + result["errors"]
+        result["failed"] += len(missing)
+        if resolved:
+            result["_resolved"] = resolved
+        return result
+
+    kernel.tool(
+        name="compute_map",
+        description=(
+            "批量扇出：把同一段 compute 代码分别作用到多个标的（或 DataStore key）上并行执行，结果汇总成一张表，"
+            "替代对每个标的逐个调用 compute（如“自选里哪些 RSI<30”）。"
+            "每个标的的沙箱与 compute 完全相同：df/close 等是该标的的数据，另注入 symbol(当前标的)与 live(该标的增量指标快照)。"
+            "代码返回标量时列名为 value；返回扁平 dict 时各键展开为列（推荐，如 {'rsi': latest(ta.rsi(close,14)), 'close': latest(close)}）。"
+            "代码先统一做语法校验；运行期错误/缺数据按标的记入 errors，不会中断整批。"
+            "sort_by 可按某列排序（默认降序，descending=false 为升序）。"
+            f"symbols 使用与 compute 相同的 interval/mode/start/end selector；keys 直接指定 DataStore key。上限 {MAX_TARGETS} 个。"
+            "尚未加载的 symbol 以及 ohlcv:SYMBOL[:interval:mode] 形式的 key 会自动取数，记录见 _resolved。"
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "code": {"type": "string", "description": "对每个标的执行的 Python 代码"},
+                "symbols": {"type": "array", "items": {"type": "string"}, "description": "标的列表"},
+                "keys": {"type": "array", "items": {"type": "string"}, "description": "可选，直接指定 DataStore key"},
+                "sort_by": {"type": "string", "description": "按结果表中的某列排序"},
+                "descending": {"type": "boolean", "description": "排序方向，默认降序", "default": True},
+                "interval": {
+                    "type": "string",
+                    "enum": ["1d", "1m", "5m", "15m", "30m", "60m"],
+                    "description": "与 market_ohlcv 相同的 bar 粒度 selector",
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["history", "latest"],
+                    "description": "与 market_ohlcv 相同的模式 selector",
+                },
+                "start": {"type": "string", "description": "可选，精确匹配某次 history 查询的起始时间"},
+                "end": {"type": "string", "description": "可选，精确匹配某次 history 查询的截止时间"},
+            },
+            "required": ["code"],
+        },
+        handler=compute_map,
+    )
@@ -0,0 +1,65 @@
+"""
+[INPUT]: pandas
+[OUTPUT]: Panel — 多标的对齐结果；align_panel — 共享日历向量化对齐
+[POS]: compute 多标的注入层：在沙箱外一次性把多份 OHLCV 对齐为 MultiIndex 面板 + 宽收盘矩阵
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+ALIGN_MODES = ("inner", "outer")
+_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+@dataclass(frozen=True)
+class Panel:
+    """对齐后的多标的数据。
+
+    - wide: date 索引、(field, symbol) 两级列的 MultiIndex DataFrame；wide["close"] 即收盘矩阵
+    - closes: date 索引、symbol 列的宽收盘矩阵
+    - frames: symbol → 对齐后的单标的 OHLCV（与单标的 df 同形：date 列 + RangeIndex）
+    """
+
+    symbols: tuple[str, ...]
+    wide: pd.DataFrame
+    closes: pd.DataFrame
+    frames: dict[str, pd.DataFrame]
+
+
+def align_panel(frames: dict[str, pd.DataFrame], how: str = "inner") -> Panel:
+    """
+    把多份 canonical OHLCV 对齐到共享日历。
+
+    inner: 只保留所有标的都有 bar 的时间点（相关性/价差默认口径）
+    outer: 取并集日历，价格前向填充、缺失 bar 成交量记 0（跨市场日历不一致时使用）
+    """
+    if how not in ALIGN_MODES:
+        raise ValueError(f"align 必须是 {' / '.join(ALIGN_MODES)}，收到: {how!r}")
+    if not frames:
+        raise ValueError("align_panel 至少需要一个标的")
+
+    symbols = tuple(frames)
+    indexed = [
+        frames[symbol].drop_duplicates("date", keep="last").set_index("date")[list(_FIELDS)]
+        for symbol in symbols
+    ]
+    # 一次 concat 完成日历合并：join=inner/outer 即交集/并集
+    wide = pd.concat(indexed, axis=1, keys=symbols, join=how).sort_index()
+    wide = wide.swaplevel(0, 1, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+    if how == "outer":
+        volume = wide["volume"].fillna(0).to_numpy()
+        wide = wide.ffill()
+        wide.loc[:, "volume"] = volume
+    wide.index.name = "date"
+
+    closes = wide["close"][list(symbols)]
+    aligned = {
+        symbol: wide.xs(symbol, axis=1, level=1)[list(_FIELDS)].reset_index()
+        for symbol in symbols
+    }
+    return Panel(symbols=symbols, wide=wide, closes=closes, frames=aligned)
@@ -0,0 +1,145 @@
+"""
+[INPUT]: os, atexit, pickle, multiprocessing, concurrent.futures
+[OUTPUT]: run_chunked — 按 CPU 分块并行执行纯函数；max_workers / shutdown_pool
+[POS]: compute 并行执行层；进程池懒加载并跨调用复用，池不可用或无法序列化时降级为进程内串行，worker 异常原样传播
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing as _mp
+import os
+import pickle
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Sequence
+
+
+_MAX_WORKERS_CAP = 8
+_DEFAULT_TIMEOUT_S = 60.0
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def max_workers() -> int:
+    """可用并行度：CPU 数，上限 _MAX_WORKERS_CAP。"""
+    return max(1, min(os.cpu_count() or 1, _MAX_WORKERS_CAP))
+
+
+def _context() -> Any:
+    # forkserver 避免在多线程进程（TUI/IM 驱动）里直接 fork；不支持的平台退回 spawn
+    methods = _mp.get_all_start_methods()
+    return _mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_context())
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """关闭共享进程池（测试 / 退出时调用；下次使用会重新创建）。"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+atexit.register(shutdown_pool)
+
+
+def _chunks(items: Sequence[Any], n: int) -> list[list[Any]]:
+    size, rest = divmod(len(items), n)
+    out: list[list[Any]] = []
+    start = 0
+    for i in range(n):
+        end = start + size + (1 if i < rest else 0)
+        if end > start:
+            out.append(list(items[start:end]))
+        start = end
+    return out
+
+
+class _TransportError(Exception):
+    """参数 / 结果在进程间序列化失败（与 worker 自身抛出的异常区分开）。"""
+
+
+def _run_payload(payload: bytes, chunk: bytes) -> bytes:
+    # 子进程入口：反序列化与结果序列化失败统一转成 _TransportError，worker 的异常原样抛回
+    try:
+        worker, shared = pickle.loads(payload)
+        items = pickle.loads(chunk)
+    except Exception as exc:
+        raise _TransportError(f"{type(exc).__name__}: {exc}") from None
+    result = worker(shared, items)
+    try:
+        return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as exc:
+        raise _TransportError(f"{type(exc).__name__}: {exc}") from None
+
+
+def run_chunked(
+    worker: Callable[[Any, list[Any]], list[Any]],
+    shared: Any,
+    items: Sequence[Any],
+    *,
+    workers: int | None = None,
+    timeout_s: float = _DEFAULT_TIMEOUT_S,
+) -> tuple[list[Any], dict[str, Any]]:
+    """
+    把 items 均分为 ≤workers 块并行执行 worker(shared, chunk)，按原顺序拼接结果。
+
+    shared 是只读共享数据（如 df），在父进程只序列化一次，各块共用同一份字节；
+    worker 必须是模块级函数（可 pickle）。timeout_s 是整批任务的总时限。
+    并行度为 1、进程池损坏或参数 / 结果无法序列化时降级为进程内串行；worker 自身抛出的异常原样传播。
+    返回 (结果列表, {"mode": "process"|"serial", "workers": n})。
+    """
+    n = min(workers or max_workers(), len(items))
+    if n <= 1:
+        return worker(shared, list(items)), {"mode": "serial", "workers": 1}
+
+    try:
+        payload = pickle.dumps((worker, shared), protocol=pickle.HIGHEST_PROTOCOL)
+        chunks = [pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL) for chunk in _chunks(items, n)]
+    except Exception:
+        # 不可序列化（闭包 / 锁 / 句柄等）：进程池帮不上忙，直接串行
+        return worker(shared, list(items)), {"mode": "serial", "workers": 1}
+
+    try:
+        pool = _get_pool(n)
+        futures = [pool.submit(_run_payload, payload, chunk) for chunk in chunks]
+    except (BrokenProcessPool, _mp.ProcessError, OSError):
+        # 进程池不可用（受限环境）：丢弃旧池，串行兜底
+        shutdown_pool()
+        return worker(shared, list(items)), {"mode": "serial", "workers": 1}
+
+    done, pending = wait(futures, timeout=timeout_s, return_when=FIRST_EXCEPTION)
+    failed = next((f for f in futures if f in done and f.exception() is not None), None)
+    if failed is not None:
+        for other in pending:
+            other.cancel()
+        exc = failed.exception()
+        if isinstance(exc, (BrokenProcessPool, _TransportError)):
+            # 子进程崩溃 / 跨进程传输失败：丢弃旧池，串行兜底
+            shutdown_pool()
+            return worker(shared, list(items)), {"mode": "serial", "workers": 1}
+        raise exc  # type: ignore[misc]
+    if pending:
+        shutdown_pool()
+        raise TimeoutError(f"并行计算超过 {timeout_s:.0f}s 未完成")
+    results: list[Any] = []
+    for future in futures:
+        results.extend(pickle.loads(future.result()))
+    return results, {"mode": "process", "workers": n}
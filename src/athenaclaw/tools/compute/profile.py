@@ -0,0 +1,232 @@
+"""
+[INPUT]: athenaclaw.kernel (Kernel), hashlib, sys, threading, time, tracemalloc, collections, resource(可选)
+[OUTPUT]: Stopwatch — 单次沙箱执行的分段计时；memory_probe — 峰值内存采样；code_hash；ComputeProfiler / compute_profiler — 按代码哈希聚合的会话级画像
+[POS]: compute 可观测层：sandbox 打点 → compute 工具 emit compute.profile → trace；turn.done 时汇总为 compute.report
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+try:
+    import resource as _resource
+except ImportError:  # pragma: no cover - Windows
+    _resource = None
+
+
+PHASES = ("inject", "validate", "execute", "serialize")
+MAX_SNIPPETS = 256
+_RECENT = 50
+_DATA_KEY = "_compute_profiler"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 单次执行打点
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Stopwatch:
+    """
+    分段计时：enter(phase) 结束上一段并开始新一段，stop() 结束当前段。
+
+    CPU 时间按线程分段累计（thread_time），因此可以跨线程使用：
+    调用线程打 inject，执行线程（非主线程降级时是 ThreadPool worker）打 validate/execute/serialize。
+    超时/异常时 stop() 把已耗时间记到正在进行的那一段上，便于定位卡在哪一步；
+    由其他线程收尾（执行线程超时仍在跑）时只计墙钟，不计 CPU。
+    """
+
+    __slots__ = ("phases", "cpu_ms", "_phase", "_wall", "_cpu", "_owner")
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.cpu_ms = 0.0
+        self._phase: str | None = None
+        self._wall = 0.0
+        self._cpu = 0.0
+        self._owner = 0
+
+    def enter(self, phase: str) -> None:
+        if self._phase is not None:
+            self._close()
+        else:
+            self._cpu = time.thread_time()
+            self._owner = threading.get_ident()
+        self._phase = phase
+        self._wall = time.perf_counter()
+
+    def stop(self) -> None:
+        if self._phase is None:
+            return
+        self._close()
+        if threading.get_ident() == self._owner:
+            self.cpu_ms += (time.thread_time() - self._cpu) * 1000
+        self._phase = None
+
+    def _close(self) -> None:
+        elapsed = (time.perf_counter() - self._wall) * 1000
+        self.phases[self._phase] = self.phases.get(self._phase, 0.0) + elapsed  # type: ignore[index]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "phases_ms": {k: round(self.phases[k], 3) for k in PHASES if k in self.phases},
+            "cpu_ms": round(self.cpu_ms, 3),
+        }
+
+
+def _rss_peak_mb() -> float | None:
+    """进程生命周期内的 RSS 高水位（ru_maxrss：Linux 为 KB，macOS 为字节）。"""
+    if _resource is None:
+        return None
+    peak = _resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def memory_probe(sink: dict[str, Any], trace: bool) -> Iterator[None]:
+    """
+    采样本次执行的内存：rss_peak_mb 始终记录；trace=True 时用 tracemalloc 记录 Python 堆峰值增量 py_peak_mb。
+
+    tracemalloc 是进程级的：已在追踪时只重置峰值，否则本次临时开启、结束后关闭。
+    并发执行时峰值会互相叠加，只能作为上界参考。
+    """
+    started = False
+    base = 0
+    if trace:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+            started = True
+        base = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            sink["py_peak_mb"] = round(max(0, peak - base) / (1024 * 1024), 3)
+            if started:
+                tracemalloc.stop()
+        rss = _rss_peak_mb()
+        if rss is not None:
+            sink["rss_peak_mb"] = rss
+
+
+def code_hash(code: str) -> str:
+    """代码指纹：忽略首尾空白，相同片段跨调用聚合到一起。"""
+    return hashlib.sha1(code.strip().encode("utf-8")).hexdigest()[:12]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 会话级聚合
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _SnippetStats:
+    __slots__ = ("preview", "calls", "errors", "timeouts", "wall_ms", "cpu_ms", "phases_ms", "py_peak_mb", "recent")
+
+    def __init__(self, preview: str) -> None:
+        self.preview = preview
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.phases_ms: dict[str, float] = {}
+        self.py_peak_mb: float | None = None
+        self.recent: deque[float] = deque(maxlen=_RECENT)
+
+    def add(self, record: dict[str, Any]) -> None:
+        self.calls += 1
+        self.errors += int(bool(record.get("error")))
+        self.timeouts += int(bool(record.get("timed_out")))
+        self.wall_ms += record["wall_ms"]
+        self.cpu_ms += record.get("cpu_ms", 0.0)
+        for phase, ms in record.get("phases_ms", {}).items():
+            self.phases_ms[phase] = self.phases_ms.get(phase, 0.0) + ms
+        peak = record.get("py_peak_mb")
+        if peak is not None:
+            self.py_peak_mb = peak if self.py_peak_mb is None else max(self.py_peak_mb, peak)
+        self.recent.append(record["wall_ms"])
+
+    def summary(self, code_hash: str) -> dict[str, Any]:
+        recent = sorted(self.recent)
+        out: dict[str, Any] = {
+            "code_hash": code_hash,
+            "preview": self.preview,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "total_ms": round(self.wall_ms, 1),
+            "mean_ms": round(self.wall_ms / self.calls, 2),
+            "p95_ms": round(recent[min(len(recent) - 1, int(0.95 * len(recent)))], 2),
+            "max_ms": round(recent[-1], 2),
+            "mean_cpu_ms": round(self.cpu_ms / self.calls, 2),
+            "mean_phases_ms": {k: round(v / self.calls, 3) for k, v in self.phases_ms.items()},
+        }
+        if self.py_peak_mb is not None:
+            out["max_py_peak_mb"] = self.py_peak_mb
+        return out
+
+
+class ComputeProfiler:
+    """
+    按代码哈希聚合 compute 执行画像（调用数 / 错误 / 超时 / 耗时分布 / 分段均值 / 内存峰值）。
+
+    最多保留 MAX_SNIPPETS 个片段，超出时淘汰最久未出现的；p95/max 基于每个片段最近 50 次调用。
+    trace_memory 默认关闭（tracemalloc 会让分配密集的代码慢约 30%~50%），排查内存时再打开。
+    """
+
+    def __init__(self, trace_memory: bool = False, max_snippets: int = MAX_SNIPPETS) -> None:
+        self.trace_memory = trace_memory
+        self.max_snippets = max_snippets
+        self._stats: OrderedDict[str, _SnippetStats] = OrderedDict()
+        self._turn_hashes: set[str] = set()
+
+    def record(self, code: str, record: dict[str, Any]) -> str:
+        digest = code_hash(code)
+        stats = self._stats.get(digest)
+        if stats is None:
+            stats = self._stats[digest] = _SnippetStats(" ".join(code.split())[:80])
+        self._stats.move_to_end(digest)
+        stats.add(record)
+        self._turn_hashes.add(digest)
+        while len(self._stats) > self.max_snippets:
+            self._stats.popitem(last=False)
+        return digest
+
+    def report(self, top: int = 10, sort_by: str = "total_ms", hashes: set[str] | None = None) -> list[dict[str, Any]]:
+        """片段画像列表，默认按累计耗时降序（最值得加 helper / 调超时的排在前面）。"""
+        rows = [s.summary(h) for h, s in self._stats.items() if hashes is None or h in hashes]
+        rows.sort(key=lambda r: r.get(sort_by) or 0, reverse=True)
+        return rows[:top]
+
+    def drain_turn(self) -> list[dict[str, Any]]:
+        """取出本轮出现过的片段画像并清空本轮记录。"""
+        hashes, self._turn_hashes = self._turn_hashes, set()
+        return self.report(top=len(hashes), hashes=hashes) if hashes else []
+
+    def clear(self) -> None:
+        self._stats.clear()
+        self._turn_hashes.clear()
+
+
+def compute_profiler(kernel: object) -> ComputeProfiler:
+    """取会话级 profiler；首次创建时挂上 turn.done → compute.report 汇总。"""
+    profiler = kernel.data.get(_DATA_KEY)  # type: ignore[attr-defined]
+    if profiler is None:
+        profiler = ComputeProfiler()
+        kernel.data.set(_DATA_KEY, profiler)  # type: ignore[attr-defined]
+
+        def _report(_event: str, _data: Any) -> None:
+            snippets = profiler.drain_turn()
+            if snippets:
+                kernel.emit("compute.report", {"snippets": snippets})  # type: ignore[attr-defined]
+
+        kernel.wire("turn.done", _report)  # type: ignore[attr-defined]
+    return profiler
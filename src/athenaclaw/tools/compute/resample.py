@@ -0,0 +1,181 @@
+"""
+[INPUT]: numpy, pandas, athenaclaw.tools.compute.parallel
+[OUTPUT]: bootstrap / monte_carlo — 向量化收益重采样（分位数摘要）；SANDBOX_HELPERS — 沙箱内单进程限量版
+[POS]: compute 稳健性分析的重采样核心；纯 NumPy，按独立种子分批，可交给进程池并行
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from athenaclaw.tools.compute.parallel import run_chunked
+
+
+MAX_RESAMPLES = 20_000
+MAX_HELPER_RESAMPLES = 2_000      # 沙箱 helper 单进程执行，受 500ms 预算约束
+_BATCH = 500                      # 单批重采样路径数，控制内存（路径 × 长度 个 float）
+_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 重采样核心（纯 NumPy，worker 进程内运行）
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _clean_returns(returns: Any) -> np.ndarray:
+    arr = np.asarray(returns.to_numpy() if isinstance(returns, pd.Series) else returns, dtype=float)
+    if arr.ndim != 1:
+        raise ValueError(f"returns 必须是一维收益序列，收到 shape={arr.shape}")
+    arr = arr[np.isfinite(arr)]
+    if arr.size < 2:
+        raise ValueError("returns 有效样本不足 2 个")
+    return arr
+
+
+def _block_paths(rng: np.random.Generator, rets: np.ndarray, count: int, horizon: int, block: int) -> np.ndarray:
+    """循环移动块 bootstrap：每条路径由随机起点的连续块拼接，保留块内自相关；block=1 即 iid 重排。"""
+    n_blocks = -(-horizon // block)
+    starts = rng.integers(0, rets.size, size=(count, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(count, -1)[:, :horizon] % rets.size
+    return rets[idx]
+
+
+def _path_metrics(paths: np.ndarray, ppy: float) -> dict[str, np.ndarray]:
+    equity = np.cumprod(1.0 + paths, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+    std = paths.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, paths.mean(axis=1) / std * np.sqrt(ppy), np.nan)
+    return {
+        "total_return": equity[:, -1] - 1.0,
+        "max_drawdown": drawdown.min(axis=1),
+        "sharpe": sharpe,
+    }
+
+
+def _resample_chunk(shared: tuple, jobs: list[tuple[int, int]]) -> list[dict[str, np.ndarray]]:
+    """jobs = [(seed, count)]；每个 job 独立种子，结果与并行度无关。"""
+    rets, horizon, block, ppy = shared
+    out: list[dict[str, np.ndarray]] = []
+    for seed, count in jobs:
+        rng = np.random.default_rng(seed)
+        parts = [
+            _path_metrics(_block_paths(rng, rets, min(_BATCH, count - done), horizon, block), ppy)
+            for done in range(0, count, _BATCH)
+        ]
+        out.append({k: np.concatenate([p[k] for p in parts]) for k in parts[0]})
+    return out
+
+
+def _resample(
+    returns: Any,
+    n: int,
+    block: int,
+    horizon: int | None,
+    seed: int | None,
+    ppy: float,
+    workers: int | None,
+) -> tuple[np.ndarray, dict[str, np.ndarray], dict[str, Any]]:
+    rets = _clean_returns(returns)
+    n = int(n)
+    if not 1 <= n <= MAX_RESAMPLES:
+        raise ValueError(f"n 必须在 1..{MAX_RESAMPLES} 之间")
+    block = max(1, min(int(block), rets.size))
+    horizon = int(horizon) if horizon else rets.size
+    if horizon < 2:
+        raise ValueError("horizon 至少为 2")
+
+    # 按 _BATCH 切成独立 job，各自派生种子：同一 seed 下串行 / 并行结果一致
+    counts = [min(_BATCH, n - i) for i in range(0, n, _BATCH)]
+    seeds = np.random.SeedSequence(seed).generate_state(len(counts))
+    jobs = list(zip((int(s) for s in seeds), counts))
+    parts, info = run_chunked(_resample_chunk, (rets, horizon, block, ppy), jobs, workers=workers)
+    metrics = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    return rets, metrics, {**info, "resamples": n, "block": block, "horizon": horizon}
+
+
+def percentiles(values: np.ndarray) -> dict[str, float | None]:
+    """p5/p25/p50/p75/p95 + mean；忽略 NaN/inf。"""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {f"p{q}": None for q in _PERCENTILES} | {"mean": None}
+    qs = np.percentile(finite, _PERCENTILES)
+    return {f"p{q}": float(v) for q, v in zip(_PERCENTILES, qs)} | {"mean": float(finite.mean())}
+
+
+def _observed(rets: np.ndarray, ppy: float) -> dict[str, float | None]:
+    m = _path_metrics(rets[None, :], ppy)
+    return {k: (float(v[0]) if np.isfinite(v[0]) else None) for k, v in m.items()}
+
+
+def bootstrap(
+    returns: Any,
+    n: int = 1000,
+    block: int = 20,
+    seed: int | None = None,
+    periods_per_year: float = 252,
+    workers: int | None = 1,
+) -> dict[str, Any]:
+    """
+    块 bootstrap：对收益序列做 n 次同长度重采样，给出 total_return / sharpe / max_drawdown 的分位数。
+
+    用于判断观测到的优势是否稳健：关注 sharpe 的 p5 与 prob_sharpe_le_0。
+    """
+    rets, m, info = _resample(returns, n, block, None, seed, float(periods_per_year), workers)
+    return {
+        "method": "bootstrap",
+        "observed": _observed(rets, float(periods_per_year)),
+        "total_return": percentiles(m["total_return"]),
+        "sharpe": percentiles(m["sharpe"]),
+        "max_drawdown": percentiles(m["max_drawdown"]),
+        "prob_loss": float(np.mean(m["total_return"] < 0)),
+        "prob_sharpe_le_0": float(np.mean(~(m["sharpe"] > 0))),
+        **info,
+    }
+
+
+def monte_carlo(
+    returns: Any,
+    n: int = 1000,
+    horizon: int | None = None,
+    block: int = 1,
+    seed: int | None = None,
+    periods_per_year: float = 252,
+    workers: int | None = 1,
+) -> dict[str, Any]:
+    """
+    Monte Carlo 前瞻路径：按经验收益分布模拟 n 条 horizon 长度的路径，输出回撤 / 终值分布。
+
+    block=1 为 iid 重排；block>1 保留波动聚集。prob_drawdown_worse 对比历史最大回撤。
+    """
+    rets, m, info = _resample(returns, n, block, horizon, seed, float(periods_per_year), workers)
+    observed = _observed(rets, float(periods_per_year))
+    return {
+        "method": "monte_carlo",
+        "observed": observed,
+        "max_drawdown": percentiles(m["max_drawdown"]),
+        "total_return": percentiles(m["total_return"]),
+        "prob_loss": float(np.mean(m["total_return"] < 0)),
+        "prob_drawdown_worse": float(np.mean(m["max_drawdown"] < observed["max_drawdown"])),
+        **info,
+    }
+
+
+def _helper_bootstrap(returns: Any, n: int = 1000, block: int = 20, seed: int | None = None,
+                      periods_per_year: float = 252) -> dict[str, Any]:
+    return bootstrap(returns, min(int(n), MAX_HELPER_RESAMPLES), block, seed, periods_per_year, workers=1)
+
+
+def _helper_monte_carlo(returns: Any, n: int = 1000, horizon: int | None = None, block: int = 1,
+                        seed: int | None = None, periods_per_year: float = 252) -> dict[str, Any]:
+    return monte_carlo(returns, min(int(n), MAX_HELPER_RESAMPLES), horizon, block, seed, periods_per_year, workers=1)
+
+
+# 沙箱内只允许单进程、限量版本（并行与大样本走 compute_robustness 工具）
+SANDBOX_HELPERS: dict[str, Any] = {
+    "bootstrap": _helper_bootstrap,
+    "monte_carlo": _helper_monte_carlo,
+}
@@ -0,0 +1,300 @@
+"""
+[INPUT]: athenaclaw.kernel (Kernel), numpy, pandas, athenaclaw.tools.compute.{backtest,parallel,resample,sandbox,source,sweep}
+[OUTPUT]: walk_forward — 滚动样本内寻优 + 样本外验证；register() — compute_robustness 工具（bootstrap / monte_carlo / walk_forward）
+[POS]: compute 稳健性分析层：把重采样 / 走样本外验证从单次 500ms 沙箱里搬到可并行的工具调用
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from athenaclaw.tools.compute.backtest import periods_per_year
+from athenaclaw.tools.compute.parallel import run_chunked
+from athenaclaw.tools.compute.resample import MAX_RESAMPLES, bootstrap, monte_carlo, percentiles
+from athenaclaw.tools.compute.sandbox import exec_compute
+from athenaclaw.tools.compute.source import current_account, resolve_frame
+from athenaclaw.tools.compute.sweep import expand_grid, rank_rows, score_row, score_snippet, sweep_chunk
+
+
+METHODS = ("bootstrap", "monte_carlo", "walk_forward")
+MAX_WALK_EVALUATIONS = 5_000      # 折数 × 组合数
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Walk-forward
+# ─────────────────────────────────────────────────────────────────────────────
+
+def walk_forward_folds(n_bars: int, train: int, test: int, step: int | None = None) -> list[tuple[int, int, int]]:
+    """滚动窗口切分：[(train_start, test_start, test_end)]，train = [train_start, test_start)。"""
+    train, test = int(train), int(test)
+    step = int(step) if step else test
+    if train < 2 or test < 2 or step < 1:
+        raise ValueError("train/test 至少 2 根 bar，step 至少 1")
+    return [
+        (start, start + train, start + train + test)
+        for start in range(0, n_bars - train - test + 1, step)
+    ]
+
+
+def _trim(value: Any, skip: int, n: int) -> Any:
+    """与预热 + 测试窗等长的序列去掉前 skip 个预热 bar（与打分时的 df 对齐）；其他值原样返回。"""
+    if isinstance(value, (pd.Series, pd.DataFrame)) and len(value) == n:
+        return value.iloc[skip:].reset_index(drop=True)
+    if isinstance(value, np.ndarray) and value.ndim >= 1 and len(value) == n:
+        return value[skip:]
+    return value
+
+
+def _oos_score(
+    code: str,
+    score: str | None,
+    df: pd.DataFrame,
+    account: dict[str, Any],
+    params: dict[str, Any],
+    skip: int,
+    timeout_ms: int,
+) -> dict[str, Any]:
+    """
+    样本外打分：code 在预热 + 测试窗上执行（指标得以预热），score 只在测试窗上求值。
+
+    第二次执行时 df/close 等换成测试窗切片，code 新建的等长序列（signals 等）同样去掉预热段，
+    预热 bar 属于训练窗，不能计入样本外得分。
+    """
+    extra = {**params, "params": dict(params)}
+    if not skip:
+        return score_row(params, exec_compute(score_snippet(code, score), df, account, timeout_ms=timeout_ms, extra_ns=extra))
+    captured: dict[str, Any] = {}
+    warmed = exec_compute(code, df, account, timeout_ms=timeout_ms, extra_ns=extra, capture=captured)
+    if "error" in warmed:
+        return score_row(params, warmed)
+    scope = {name: _trim(value, skip, len(df)) for name, value in captured.items()}
+    test_df = df.iloc[skip:].reset_index(drop=True)
+    return score_row(params, exec_compute(f"result = ({score})", test_df, account, timeout_ms=timeout_ms, extra_ns=extra, scope=scope))
+
+
+def _walk_chunk(shared: tuple, folds: list[tuple[int, int, int]]) -> list[dict[str, Any]]:
+    code, score, df, account, combos, minimize, warmup, timeout_ms = shared
+    snippet = score_snippet(code, score)
+    out: list[dict[str, Any]] = []
+    for train_start, test_start, test_end in folds:
+        train_df = df.iloc[train_start:test_start].reset_index(drop=True)
+        ok, failed = rank_rows(sweep_chunk((snippet, train_df, account, timeout_ms), combos), minimize)
+        fold: dict[str, Any] = {
+            "train": [_stamp(df, train_start), _stamp(df, test_start - 1)],
+            "test": [_stamp(df, test_start), _stamp(df, test_end - 1)],
+        }
+        if not ok:
+            out.append({**fold, "error": failed[0]["error"] if failed else "无可用组合"})
+            continue
+        best = ok[0]
+        window_start = max(0, test_start - warmup)
+        test_df = df.iloc[window_start:test_end].reset_index(drop=True)
+        oos = _oos_score(code, score, test_df, account, best["params"], test_start - window_start, timeout_ms)
+        out.append({
+            **fold,
+            "params": best["params"],
+            "in_sample": best["score"],
+            "out_of_sample": oos.get("score"),
+            **({"error": oos["error"]} if "error" in oos else {}),
+        })
+    return out
+
+
+def _stamp(df: pd.DataFrame, i: int) -> str:
+    return str(pd.Timestamp(df["date"].iloc[i]))
+
+
+def walk_forward(
+    code: str,
+    grid: dict[str, list[Any]],
+    df: pd.DataFrame,
+    account: dict[str, Any],
+    *,
+    train: int,
+    test: int,
+    step: int | None = None,
+    score: str | None = None,
+    minimize: bool = False,
+    warmup: int = 0,
+    timeout_ms: int = 500,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """
+    滚动 walk-forward：每折在训练窗口上对 grid 寻优，再用最优参数在紧随其后的测试窗口上打分。
+
+    折与折之间并行（每折内部串行跑网格）；warmup 为测试窗口前额外携带的历史 bar 数，只供指标预热：
+    code 在预热 + 测试窗上执行，score 只在测试窗上求值，所以 warmup > 0 时必须给 score 表达式。
+    返回逐折明细与样本外得分分位数、样本内外均值比（efficiency）、最常被选中的参数。
+    """
+    warmup = max(0, int(warmup))
+    if warmup and not score:
+        raise ValueError("warmup > 0 时需要 score 表达式：样本外只在测试窗上打分，预热 bar 不计入")
+    combos = expand_grid(grid)
+    folds = walk_forward_folds(len(df), train, test, step)
+    if not folds:
+        raise ValueError(f"数据只有 {len(df)} 根 bar，不足一折 train+test={int(train) + int(test)}")
+    if len(folds) * len(combos) > MAX_WALK_EVALUATIONS:
+        raise ValueError(
+            f"折数×组合数={len(folds) * len(combos)} 超过上限 {MAX_WALK_EVALUATIONS}，请增大 step 或缩小网格"
+        )
+
+    started = time.perf_counter()
+    shared = (code, score, df, account, combos, bool(minimize), warmup, timeout_ms)
+    rows, info = run_chunked(_walk_chunk, shared, folds, workers=workers)
+
+    oos = np.array([r["out_of_sample"] for r in rows if r.get("out_of_sample") is not None], dtype=float)
+    ins = np.array([r["in_sample"] for r in rows if r.get("out_of_sample") is not None], dtype=float)
+    chosen = Counter(tuple(sorted(r["params"].items())) for r in rows if "params" in r)
+    efficiency = None
+    if ins.size and ins.mean() != 0:
+        efficiency = float(oos.mean() / ins.mean())
+    return {
+        "method": "walk_forward",
+        "folds": len(folds),
+        "combinations": len(combos),
+        "objective": "minimize" if minimize else "maximize",
+        "out_of_sample": percentiles(oos) if oos.size else None,
+        "in_sample_mean": float(ins.mean()) if ins.size else None,
+        "efficiency": efficiency,
+        "most_chosen": [{"params": dict(p), "folds": c} for p, c in chosen.most_common(3)],
+        "fold_results": rows[-20:],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        **info,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 注册
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _capture_returns(code: str, returns: str, df: pd.DataFrame, account: dict[str, Any]) -> Any:
+    """在沙箱里执行 code 并取回 returns 表达式的原始序列（不经 _serialize 摘要）。"""
+    sink: list[Any] = []
+    prefix = f"{code.rstrip()}\n" if code.strip() else ""
+    snippet = f"{prefix}_sink.append({returns})\nresult = len(_sink)"
+    out = exec_compute(snippet, df, account, extra_ns={"_sink": sink})
+    if "error" in out:
+        return out
+    return sink[0]
+
+
+def _analyze(args: dict, df: pd.DataFrame, account: dict[str, Any]) -> dict[str, Any]:
+    """按 method 分派到 walk_forward / bootstrap / monte_carlo。"""
+    method = args.get("method")
+    code = args.get("code") or ""
+    try:
+        if method == "walk_forward":
+            if not code or not args.get("grid") or not args.get("train") or not args.get("test"):
+                return {"error": "walk_forward 需要 code/grid/train/test"}
+            return walk_forward(
+                code, args["grid"], df, account,
+                train=args["train"], test=args["test"], step=args.get("step"),
+                score=args.get("score"), minimize=bool(args.get("minimize", False)),
+                warmup=int(args.get("warmup") or 0),
+            )
+
+        captured = _capture_returns(code, args.get("returns") or "close.pct_change()", df, account)
+        if isinstance(captured, dict) and "error" in captured:
+            return captured
+        ppy = float(args.get("periods_per_year") or periods_per_year(df["date"]))
+        common = {
+            "n": int(args.get("n") or 1000),
+            "seed": args.get("seed"),
+            "periods_per_year": ppy,
+            "workers": None,
+        }
+        if method == "bootstrap":
+            return bootstrap(captured, block=int(args.get("block") or 20), **common)
+        return monte_carlo(
+            captured, horizon=args.get("horizon"), block=int(args.get("block") or 1), **common,
+        )
+    except (TypeError, ValueError) as exc:
+        return {"error": str(exc)}
+    except TimeoutError as exc:
+        return {"error": str(exc), "remediation": "减少 n / 缩小网格 / 增大 step。"}
+
+
+def register(kernel: object) -> None:
+    """向 Kernel 注册 compute_robustness 工具"""
+
+    def compute_robustness(args: dict) -> dict:
+        method = args.get("method")
+        if method not in METHODS:
+            return {"error": f"method 必须是 {' / '.join(METHODS)}"}
+        resolved: list[dict] = []
+        df = resolve_frame(
+            kernel, args.get("symbol"), args.get("interval"), args.get("mode"), args.get("start"), args.get("end"), resolved,
+        )
+        if df is None:
+            if resolved:
+                return {"error": f"未找到对应 OHLCV，自动取数失败: {resolved[0]['error']}", "_resolved": resolved}
+            return {"error": "未找到对应 OHLCV，请先用相同的 symbol/interval/mode/start/end 调用 market_ohlcv"}
+        out = _analyze(args, df, current_account(kernel))
+        if resolved:
+            out["_resolved"] = resolved
+        return out
+
+    kernel.tool(
+        name="compute_robustness",
+        description=(
+            "稳健性分析：检验策略优势是否可靠，一次调用完成重采样/走样本外验证，按 CPU 核并行。"
+            "method=bootstrap：对 returns 收益序列做块 bootstrap（block 默认 20），给出 total_return/sharpe/max_drawdown 分位数、"
+            "prob_loss、prob_sharpe_le_0；method=monte_carlo：模拟 horizon 长度的前瞻路径（block 默认 1 即 iid），"
+            "给出回撤/终值分布与 prob_drawdown_worse（比历史最大回撤更差的概率）。"
+            "两者的 returns 是在 code 执行后求值的收益序列表达式，默认 close.pct_change()（买入持有）；"
+            "策略收益用 strategy_returns(signals, df, fees, slippage, size)（与 backtest 同口径）。"
+            f"n 为重采样次数（上限 {MAX_RESAMPLES}），seed 固定可复现。"
+            "method=walk_forward：code/grid/score 语义同 compute_sweep，按 train/test/step（bar 数）滚动切分，"
+            "每折在训练窗寻优、在测试窗验证，返回样本外得分分位数、efficiency(样本外/样本内均值比)、最常选中参数；"
+            "warmup 为测试窗前携带的预热 bar 数，只用于指标预热、不计入样本外得分（需配合 score）。数据 selector 规则与 compute 相同。"
+            "沙箱内也可直接调用 bootstrap(returns, n, block)/monte_carlo(returns, n, horizon) helper（单进程、限量）。"
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "method": {"type": "string", "enum": list(METHODS), "description": "分析方法"},
+                "code": {"type": "string", "description": "准备代码；walk_forward 必填（每个参数组合执行）"},
+                "returns": {
+                    "type": "string",
+                    "description": "bootstrap/monte_carlo：收益序列表达式，默认 close.pct_change()",
+                },
+                "n": {"type": "integer", "description": "重采样次数，默认 1000"},
+                "block": {"type": "integer", "description": "块长度（bar）；bootstrap 默认 20，monte_carlo 默认 1"},
+                "horizon": {"type": "integer", "description": "monte_carlo 路径长度（bar），默认与样本等长"},
+                "seed": {"type": "integer", "description": "随机种子，固定后结果可复现"},
+                "periods_per_year": {"type": "number", "description": "年化周期数，默认按 bar 间隔推断"},
+                "grid": {
+                    "type": "object",
+                    "description": "walk_forward 参数网格：{参数名: [候选值, ...]}",
+                    "additionalProperties": {"type": "array"},
+                },
+                "score": {"type": "string", "description": "walk_forward 数值得分表达式"},
+                "minimize": {"type": "boolean", "description": "walk_forward 得分越小越好", "default": False},
+                "train": {"type": "integer", "description": "walk_forward 训练窗口 bar 数"},
+                "test": {"type": "integer", "description": "walk_forward 测试窗口 bar 数"},
+                "step": {"type": "integer", "description": "walk_forward 滚动步长，默认等于 test"},
+                "warmup": {"type": "integer", "description": "walk_forward 测试窗前携带的预热 bar 数（只预热指标，不参与打分；需给 score），默认 0"},
+                "symbol": {"type": "string", "description": "与 compute 相同的 symbol selector"},
+                "interval": {
+                    "type": "string",
+                    "enum": ["1d", "1m", "5m", "15m", "30m", "60m"],
+                    "description": "与 market_ohlcv 相同的 bar 粒度 selector",
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["history", "latest"],
+                    "description": "与 market_ohlcv 相同的模式 selector",
+                },
+                "start": {"type": "string", "description": "可选，精确匹配某次 history 查询的起始时间"},
+                "end": {"type": "string", "description": "可选，精确匹配某次 history 查询的截止时间"},
+            },
+            "required": ["method"],
+        },
+        handler=compute_robustness,
+    )
@@ -0,0 +1,241 @@
+"""
+[INPUT]: numpy, pandas
+[OUTPUT]: rolling_zscore / rolling_slope / rolling_r2 / rolling_rank / rolling_quantile / rolling_max_drawdown；SANDBOX_HELPERS
+[POS]: compute 向量化滚动窗口原语：替代 rolling().apply(lambda ...) 的逐窗口 Python 调用
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+_CHUNK_ELEMENTS = 1 << 20         # 窗口视图分块处理时单块元素上限（约 8MB float64 临时量）
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 公共工具
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _prepare(x: Any, window: Any) -> tuple[np.ndarray, int, pd.Index | None, str | None]:
+    if isinstance(x, pd.DataFrame):
+        raise ValueError("rolling_* 需要一维序列（如 close），不是 DataFrame")
+    index = x.index if isinstance(x, pd.Series) else None
+    name = x.name if isinstance(x, pd.Series) else None
+    arr = np.asarray(x.to_numpy(dtype=float, na_value=np.nan) if isinstance(x, pd.Series) else x, dtype=float)
+    if arr.ndim != 1:
+        raise ValueError(f"rolling_* 需要一维序列，收到 shape={arr.shape}")
+    w = int(window)
+    if w < 1:
+        raise ValueError("window 必须 ≥ 1")
+    return arr, w, index, name
+
+
+def _wrap(out: np.ndarray, index: pd.Index | None, name: Any) -> Any:
+    return out if index is None else pd.Series(out, index=index, name=name)
+
+
+def _complete(arr: np.ndarray, w: int) -> np.ndarray:
+    """每个窗口是否完整（无 NaN）— 与 pandas rolling 默认 min_periods=window 同语义。"""
+    c = np.concatenate(([0], np.cumsum(np.isnan(arr))))
+    return (c[w:] - c[:-w]) == 0
+
+
+def _constant(arr: np.ndarray, w: int) -> np.ndarray:
+    """窗口内所有值是否完全相等（pandas 对这种窗口直接给方差 0，这里同样特判，避免舍入残差）。"""
+    same = np.concatenate(([0], np.cumsum(arr[1:] != arr[:-1])))
+    return (same[w - 1:] - same[: arr.size - w + 1]) == 0
+
+
+def _emit(n: int, w: int, values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """把 n-w+1 个窗口结果放回长度 n 的输出，前 w-1 个与不完整窗口为 NaN。"""
+    out = np.full(n, np.nan)
+    if n >= w:
+        out[w - 1:] = np.where(valid, values, np.nan)
+    return out
+
+
+def _by_window(arr: np.ndarray, w: int, fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """对 sliding_window_view 分块调用 fn(rows × w) → rows，控制临时数组大小。"""
+    view = sliding_window_view(arr, w)
+    rows = max(1, _CHUNK_ELEMENTS // w)
+    return np.concatenate([fn(view[i:i + rows]) for i in range(0, view.shape[0], rows)])
+
+
+class _WindowStats:
+    """
+    每个完整窗口的一阶/二阶矩与 Σt·y（t = 0..w-1），O(n)。
+
+    序列按 w 切块，每块减去自身锚点（块内有限值均值）后在块内做前缀和；窗口 = 上一块后缀 + 当前块前缀，
+    再把上一块部分平移到当前块锚点。全序列 cumsum 的相消误差随 n 和价格水平增长
+    （长序列尾部可达 1e-2 相对误差），这样只与相邻两块内的波动有关。
+    """
+
+    __slots__ = ("valid", "constant", "s1", "s2", "sty", "last")
+
+    def __init__(self, arr: np.ndarray, w: int) -> None:
+        n = arr.size
+        m = -(-n // w)
+        blocks = np.full(m * w, np.nan)
+        blocks[:n] = arr
+        blocks = blocks.reshape(m, w)
+        finite = np.isfinite(blocks)
+        counts = finite.sum(axis=1)
+        anchor = np.where(counts > 0, np.where(finite, blocks, 0.0).sum(axis=1) / np.maximum(counts, 1), 0.0)
+        dev = np.where(finite, blocks - anchor[:, None], 0.0)
+        offsets = np.arange(w, dtype=float)
+        p1 = np.cumsum(dev, axis=1)
+        p2 = np.cumsum(dev * dev, axis=1)
+        po = np.cumsum(dev * offsets, axis=1)
+
+        # 窗口终点 t（≥ w-1）在块 t//w、偏移 r = t%w；上一块偏移 r 处即 t-w，上一块末尾是其块和。
+        # 全部用 repeat/切片表达，避免整型除法与花式索引；t = w-1 的首个窗口恰为第 0 块，上一块部分为 0。
+        r = np.tile(offsets, m)[w - 1:n]
+        n_prev = w - 1 - r
+        anchors = np.repeat(anchor, w)
+        p1, p2, po = p1.ravel(), p2.ravel(), po.ravel()
+
+        def _tail(prefix: np.ndarray) -> np.ndarray:
+            totals = np.repeat(prefix.reshape(m, w)[:, -1], w)
+            return np.concatenate(([0.0], totals[: n - w] - prefix[: n - w]))
+
+        # 上一块部分：相对 c_{j-1} 的和 → 相对 c_j（δ = c_{j-1} - c_j）
+        delta = np.concatenate(([0.0], anchors[: n - w] - anchors[w:n]))
+        a1, a2, ao = _tail(p1), _tail(p2), _tail(po)
+        b1, b2, bo = p1[w - 1:n], p2[w - 1:n], po[w - 1:n]
+
+        self.s1 = b1 + a1 + n_prev * delta
+        self.s2 = b2 + a2 + 2.0 * delta * a1 + n_prev * delta * delta
+        # 当前块 off∈[0, r] 的 t = off + n_prev；上一块 off∈[r+1, w-1] 的 t = off - (r+1)
+        sty_prev = ao - (r + 1) * a1 + delta * n_prev * (n_prev - 1) / 2.0
+        self.sty = bo + n_prev * b1 + sty_prev
+        self.last = dev.ravel()[w - 1:n]
+        self.valid = _complete(arr, w)
+        self.constant = _constant(arr, w)
+
+    def centered_ss(self, w: int) -> np.ndarray:
+        """窗口离差平方和 Σ(y-ȳ)²；常数窗口精确为 0。"""
+        return np.where(self.constant, 0.0, np.maximum(self.s2 - self.s1 * self.s1 / w, 0.0))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 分块累积和类：O(n)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def rolling_zscore(x: Any, window: int, ddof: int = 1) -> Any:
+    """(x - 窗口均值) / 窗口标准差；等价于 (s - s.rolling(w).mean()) / s.rolling(w).std(ddof)。"""
+    arr, w, index, name = _prepare(x, window)
+    n = arr.size
+    if n < w or w <= ddof:
+        return _wrap(np.full(n, np.nan), index, name)
+    st = _WindowStats(arr, w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(st.constant, np.nan, (st.last - st.s1 / w) / np.sqrt(st.centered_ss(w) / (w - ddof)))
+    return _wrap(_emit(n, w, z, st.valid), index, name)
+
+
+def _regression(arr: np.ndarray, w: int) -> tuple[_WindowStats, np.ndarray, float]:
+    """对每个窗口做 y ~ a + b·t（t = 0..w-1）：返回 (窗口统计, Sxy, Sxx)。"""
+    st = _WindowStats(arr, w)
+    sxy = np.where(st.constant, 0.0, st.sty - (w - 1) / 2.0 * st.s1)
+    return st, sxy, w * (w * w - 1) / 12.0
+
+
+def rolling_slope(y: Any, window: int) -> Any:
+    """窗口内对 bar 序号做 OLS 回归的斜率（每根 bar 的变化量），替代 rolling().apply(np.polyfit)。"""
+    arr, w, index, name = _prepare(y, window)
+    n = arr.size
+    if n < w or w < 2:
+        return _wrap(np.full(n, np.nan), index, name)
+    st, sxy, sxx = _regression(arr, w)
+    return _wrap(_emit(n, w, sxy / sxx, st.valid), index, name)
+
+
+def rolling_r2(y: Any, window: int) -> Any:
+    """窗口内线性趋势的拟合优度 R²（0~1，趋势越“直”越接近 1）；窗口内为常数时为 NaN。"""
+    arr, w, index, name = _prepare(y, window)
+    n = arr.size
+    if n < w or w < 2:
+        return _wrap(np.full(n, np.nan), index, name)
+    st, sxy, sxx = _regression(arr, w)
+    syy = st.centered_ss(w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(syy > 0, np.minimum(sxy * sxy / (sxx * syy), 1.0), np.nan)
+    return _wrap(_emit(n, w, r2, st.valid), index, name)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 窗口视图类：O(n·w)，全部在 NumPy 内完成
+# ─────────────────────────────────────────────────────────────────────────────
+
+def rolling_rank(x: Any, window: int, pct: bool = True) -> Any:
+    """当前值在窗口内的排名（并列取平均），pct=True 时为百分位；等价于 s.rolling(w).rank(pct=pct)。"""
+    arr, w, index, name = _prepare(x, window)
+    n = arr.size
+    if n < w:
+        return _wrap(np.full(n, np.nan), index, name)
+    # 窗口视图的第 k 列就是 arr[k : k+m]，逐列比较不需要 (m, w) 的临时矩阵
+    m = n - w + 1
+    last = arr[w - 1:]
+    less = np.zeros(m)
+    equal = np.zeros(m)
+    for k in range(w):
+        col = arr[k:k + m]
+        less += col < last
+        equal += col == last
+    ranks = less + (equal + 1) / 2.0
+    return _wrap(_emit(n, w, ranks / w if pct else ranks, _complete(arr, w)), index, name)
+
+
+def rolling_quantile(x: Any, window: int, q: float = 0.5) -> Any:
+    """窗口分位数（线性插值）；等价于 s.rolling(w).quantile(q)。"""
+    arr, w, index, name = _prepare(x, window)
+    n = arr.size
+    q = float(q)
+    if not 0.0 <= q <= 1.0:
+        raise ValueError("q 必须在 [0, 1] 内")
+    if n < w:
+        return _wrap(np.full(n, np.nan), index, name)
+    pos = q * (w - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, w - 1)
+    frac = pos - lo
+
+    def _quantile(block: np.ndarray) -> np.ndarray:
+        # 整块排序比 np.quantile(axis=1) 的逐行 partition 快数倍
+        ordered = np.sort(block, axis=1)
+        return ordered[:, lo] + (ordered[:, hi] - ordered[:, lo]) * frac
+
+    values = _by_window(arr, w, _quantile)
+    return _wrap(_emit(n, w, values, _complete(arr, w)), index, name)
+
+
+def rolling_max_drawdown(price: Any, window: int) -> Any:
+    """窗口内价格/净值的最大回撤（≤0，与 backtest 的 max_drawdown 同号）。"""
+    arr, w, index, name = _prepare(price, window)
+    n = arr.size
+    if n < w:
+        return _wrap(np.full(n, np.nan), index, name)
+    m = n - w + 1
+    peak = arr[:m].copy()
+    drawdown = np.zeros(m)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in range(1, w):
+            col = arr[k:k + m]
+            np.maximum(peak, col, out=peak)
+            np.minimum(drawdown, col / peak - 1.0, out=drawdown)
+    return _wrap(_emit(n, w, drawdown, _complete(arr, w)), index, name)
+
+
+SANDBOX_HELPERS: dict[str, Any] = {
+    "rolling_zscore": rolling_zscore,
+    "rolling_slope": rolling_slope,
+    "rolling_r2": rolling_r2,
+    "rolling_rank": rolling_rank,
+    "rolling_quantile": rolling_quantile,
+    "rolling_max_drawdown": rolling_max_drawdown,
+}
@@ -1,6 +1,6 @@
 """
-[INPUT]: pandas, numpy, pandas_ta, math, signal, builtins, io, traceback, ast, threading, concurrent.futures
-[OUTPUT]: exec_compute — 沙箱化 Python 执行器；HELPERS — Trading Coreutils（含 REPL 语义与输出治理）
+[INPUT]: pandas, numpy, pandas_ta, math, signal, builtins, io, time, traceback, ast, threading, concurrent.futures, athenaclaw.tools.compute.{backtest,columnar,profile,resample,rolling}
+[OUTPUT]: exec_compute — 沙箱化 Python 执行器；HELPERS — Trading Coreutils（含向量化 backtest / bootstrap / monte_carlo / rolling_* 滚动原语、REPL 语义与输出治理）
 [POS]: AthenaClaw compute 工具的共享计算沙箱；主线程 signal 超时 / 非主线程 ThreadPoolExecutor 降级
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
@@ -13,6 +13,7 @@ import io
 import math
 import signal as _signal
 import threading as _threading
+import time
 import traceback as _traceback
 from concurrent.futures import ThreadPoolExecutor as _ThreadPool
 from concurrent.futures import TimeoutError as _FuturesTimeout
@@ -23,6 +24,13 @@ from typing import Any
 import numpy as np
 import pandas as pd
 
+from athenaclaw.tools.compute.backtest import backtest as _backtest
+from athenaclaw.tools.compute.backtest import strategy_returns as _strategy_returns
+from athenaclaw.tools.compute.columnar import ENGINES, is_polars, polars_available, polars_namespace, summarize_polars
+from athenaclaw.tools.compute.profile import Stopwatch, memory_probe
+from athenaclaw.tools.compute.resample import SANDBOX_HELPERS as _RESAMPLE_HELPERS
+from athenaclaw.tools.compute.rolling import SANDBOX_HELPERS as _ROLLING_HELPERS
+
 try:
     import pandas_ta as ta
 except ModuleNotFoundError:  # pragma: no cover - fallback is exercised in test env
@@ -91,11 +99,11 @@ except ModuleNotFoundError:  # pragma: no cover - fallback is exercised in test
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 白名单 import — 允许 pandas/numpy/pandas_ta/math，拒绝其他
+# 白名单 import — 允许 pandas/numpy/pandas_ta/math（及可选的 polars），拒绝其他
 # ─────────────────────────────────────────────────────────────────────────────
 
 _ALLOWED_MODULES = frozenset({
-    "pandas", "numpy", "pandas_ta", "math",
+    "pandas", "numpy", "pandas_ta", "math", "polars",
     "time", "datetime",  # pandas Timestamp.strftime() 内部依赖
 })
 
@@ -268,6 +276,10 @@ HELPERS: dict[str, Any] = {
     "macd": _macd,
     "tail": _tail,
     "nz": _nz,
+    "backtest": _backtest,
+    "strategy_returns": _strategy_returns,
+    **_RESAMPLE_HELPERS,
+    **_ROLLING_HELPERS,
 }
 
 
@@ -280,6 +292,12 @@ def exec_compute(
     df: pd.DataFrame,
     account: dict[str, Any],
     timeout_ms: int = 500,
+    extra_ns: dict[str, Any] | None = None,
+    scope: dict[str, Any] | None = None,
+    capture: dict[str, Any] | None = None,
+    profile: dict[str, Any] | None = None,
+    trace_memory: bool = False,
+    engine: str = "pandas",
 ) -> dict[str, Any]:
     """
     沙箱执行 Agent 的 compute 代码。
@@ -287,21 +305,69 @@ def exec_compute(
     eval-first 策略：单表达式 → eval 返回值；多行 → exec。
     REPL 语义：多行代码若最后一行是表达式，会自动返回该表达式的值（类似 Jupyter）。
     print() 输出通过 _stdout 字段返回。
+    extra_ns: 调用方追加注入的只读变量（如增量指标快照 live）。
+    scope: 上一次保留下来的用户变量，注入命名空间（可被本次代码重新绑定）。
+    capture: 执行成功后写入本次新建/重新绑定的用户变量（不含预注入名、下划线名与模块）。
+    profile: 传入时写入本次执行画像（wall/cpu/分段耗时/内存峰值，见 profile.Stopwatch）。
+    trace_memory: profile 模式下是否用 tracemalloc 统计 Python 堆峰值（有额外开销）。
+    engine: "pandas"（默认）或 "polars"（df/列变量换成 polars 对象，另注入 lf=LazyFrame 与 pl）。
     """
+    if profile is None:
+        return _exec_compute(code, df, account, timeout_ms, extra_ns, scope, capture, None, engine)
+
+    watch = Stopwatch()
+    started = time.perf_counter()
+    with memory_probe(profile, trace_memory):
+        out = _exec_compute(code, df, account, timeout_ms, extra_ns, scope, capture, watch, engine)
+    watch.stop()
+    profile.update(watch.snapshot())
+    profile["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    profile["timed_out"] = out.get("error", "").startswith("计算超时")
+    if "error" in out:
+        profile["error"] = out["error"].split(":", 1)[0]
+    return out
+
+
+def _exec_compute(
+    code: str,
+    df: pd.DataFrame,
+    account: dict[str, Any],
+    timeout_ms: int,
+    extra_ns: dict[str, Any] | None,
+    scope: dict[str, Any] | None,
+    capture: dict[str, Any] | None,
+    watch: Stopwatch | None,
+    engine: str = "pandas",
+) -> dict[str, Any]:
+    if engine not in ENGINES:
+        return {"error": f"engine 必须是 {' / '.join(ENGINES)}"}
+    if engine == "polars" and not polars_available():
+        return {
+            "error": "engine=polars 需要安装 polars",
+            "remediation": "pip install 'athenaclaw[polars]'，或去掉 engine 使用默认 pandas。",
+        }
+    if watch is not None:
+        watch.enter("inject")
     # stdout 捕获
     stdout_buf = io.StringIO()
 
-    df_copy = df.copy()
     # 构造命名空间
+    if engine == "polars":
+        data_ns = polars_namespace(df)
+    else:
+        df_copy = df.copy()
+        data_ns = {
+            "df": df_copy,
+            # TradingView 风格别名（单资产）
+            "open": df_copy["open"],
+            "high": df_copy["high"],
+            "low": df_copy["low"],
+            "close": df_copy["close"],
+            "volume": df_copy["volume"],
+            "date": df_copy["date"],
+        }
     local_ns: dict[str, Any] = {
-        "df": df_copy,
-        # TradingView 风格别名（单资产）
-        "open": df_copy["open"],
-        "high": df_copy["high"],
-        "low": df_copy["low"],
-        "close": df_copy["close"],
-        "volume": df_copy["volume"],
-        "date": df_copy["date"],
+        **data_ns,
         "account": account,
         "cash": account.get("cash", 0),
         "equity": account.get("equity", 0),
@@ -309,17 +375,48 @@ def exec_compute(
         "print": lambda *a, **kw: _builtins.print(*a, file=stdout_buf, **kw),
         **HELPERS,
     }
+    if extra_ns:
+        local_ns.update(extra_ns)
+    keep = None
+    if capture is not None:
+        keep = _ScopeCapture(capture, frozenset(local_ns) | frozenset(_SAFE_GLOBALS), dict(scope or {}))
+    if scope:
+        local_ns.update({k: v for k, v in scope.items() if k not in local_ns})
+    if watch is not None:
+        watch.stop()
 
     # ── 超时分派：主线程 signal / 非主线程 futures ──
     in_main = _threading.current_thread() is _threading.main_thread()
 
     if in_main:
-        return _exec_with_signal(code, local_ns, stdout_buf, timeout_ms)
-    return _exec_with_futures(code, local_ns, stdout_buf, timeout_ms)
+        return _exec_with_signal(code, local_ns, stdout_buf, timeout_ms, keep, watch)
+    return _exec_with_futures(code, local_ns, stdout_buf, timeout_ms, keep, watch)
+
+
+class _ScopeCapture:
+    """执行成功后，从命名空间里挑出值得跨调用保留的用户变量。"""
+
+    __slots__ = ("sink", "reserved", "baseline")
+
+    def __init__(self, sink: dict[str, Any], reserved: frozenset[str], baseline: dict[str, Any]) -> None:
+        self.sink = sink
+        self.reserved = reserved
+        self.baseline = baseline
+
+    def collect(self, exec_ns: dict[str, Any]) -> None:
+        for name, value in exec_ns.items():
+            if name.startswith("_") or name == "result" or name in self.reserved:
+                continue
+            if isinstance(value, type(math)):
+                continue
+            if name in self.baseline and self.baseline[name] is value:
+                continue  # 未重新绑定（原地修改的对象本来就在 scope 里）
+            self.sink[name] = value
 
 
 def _exec_with_signal(
     code: str, local_ns: dict, stdout_buf: io.StringIO, timeout_ms: int,
+    keep: _ScopeCapture | None = None, watch: Stopwatch | None = None,
 ) -> dict[str, Any]:
     """主线程：SIGALRM 超时（精准、零开销）。"""
     def _timeout_handler(_signum: int, _frame: Any) -> None:
@@ -328,7 +425,7 @@ def _exec_with_signal(
     old_handler = _signal.signal(_signal.SIGALRM, _timeout_handler)
     _signal.setitimer(_signal.ITIMER_REAL, timeout_ms / 1000)
     try:
-        result = _exec_code(code, local_ns)
+        result = _exec_code(code, local_ns, keep, watch)
         stdout = stdout_buf.getvalue()
         if stdout:
             result["_stdout"] = stdout
@@ -357,10 +454,11 @@ def _exec_with_signal(
 
 def _exec_with_futures(
     code: str, local_ns: dict, stdout_buf: io.StringIO, timeout_ms: int,
+    keep: _ScopeCapture | None = None, watch: Stopwatch | None = None,
 ) -> dict[str, Any]:
     """非主线程：ThreadPoolExecutor 超时降级。"""
     pool = _ThreadPool(max_workers=1)
-    future = pool.submit(_exec_code, code, local_ns)
+    future = pool.submit(_exec_code, code, local_ns, keep, watch)
     try:
         result = future.result(timeout=timeout_ms / 1000)
         stdout = stdout_buf.getvalue()
@@ -390,53 +488,83 @@ def _exec_with_futures(
         }
 
 
-def _exec_code(code: str, local_ns: dict[str, Any]) -> dict[str, Any]:
-    """eval-first + REPL：单表达式直接返回；多行若最后一行是表达式，则返回该表达式。"""
-    stripped = code.strip()
-    if not stripped:
-        return {
-            "error": "未产生输出",
-            "remediation": "写一个表达式（如 ta.rsi(close,14)）或赋值给 result。",
-        }
+_NO_OUTPUT = object()
+_EMPTY_CODE = {
+    "error": "未产生输出",
+    "remediation": "写一个表达式（如 ta.rsi(close,14)）或赋值给 result。",
+}
 
+
+def _exec_code(
+    code: str, local_ns: dict[str, Any], keep: _ScopeCapture | None = None, watch: Stopwatch | None = None,
+) -> dict[str, Any]:
+    """eval-first + REPL：单表达式直接返回；多行若最后一行是表达式，则返回该表达式。"""
     # 合并命名空间：解决 exec(code, globals, locals) 下用户函数互相不可见的 Python 经典坑
     # local_ns 条目覆盖 _SAFE_GLOBALS 同名条目（如 open 别名覆盖 builtins.open），符合预期
     exec_ns = {**_SAFE_GLOBALS, **local_ns}
-
     try:
-        compiled = compile(stripped, "<compute>", "eval")
-        value = eval(compiled, exec_ns)  # noqa: S307
+        if watch is not None:
+            watch.enter("validate")
+        compiled = _compile_code(code)
+        if compiled is None:
+            return dict(_EMPTY_CODE)
+
+        if watch is not None:
+            watch.enter("execute")
+        value = _run_code(*compiled, exec_ns)
+        if keep is not None:
+            keep.collect(exec_ns)
+        if value is _NO_OUTPUT:
+            # scope 模式下只定义变量供后续使用是正常用法，不算“未产生输出”
+            if keep is not None:
+                return {"result": None}
+            return {
+                "error": "未产生输出",
+                "remediation": "设置 result=... 或让最后一行成为表达式。",
+            }
+
+        if watch is not None:
+            watch.enter("serialize")
         return {"result": _serialize(value, depth=0)}
+    finally:
+        if watch is not None:
+            watch.stop()
+
+
+def _compile_code(code: str) -> tuple[Any, Any] | None:
+    """编译为 (语句块, 末尾表达式)，任一可为 None；空代码返回 None，语法错误直接抛出。"""
+    stripped = code.strip()
+    if not stripped:
+        return None
+
+    try:
+        return None, compile(stripped, "<compute>", "eval")
     except SyntaxError:
         pass
 
     # 多行/语句 → exec（REPL：最后表达式自动返回）
     module = ast.parse(stripped, "<compute>", "exec")
     if not module.body:
-        return {
-            "error": "未产生输出",
-            "remediation": "写一个表达式（如 ta.rsi(close,14)）或赋值给 result。",
-        }
+        return None
 
     last = module.body[-1]
-    if isinstance(last, ast.Expr):
-        prefix_body = module.body[:-1]
-        if prefix_body:
-            prefix_mod = ast.Module(body=prefix_body, type_ignores=[])
-            exec(compile(prefix_mod, "<compute>", "exec"), exec_ns)  # noqa: S102
+    if not isinstance(last, ast.Expr):
+        return compile(module, "<compute>", "exec"), None
+    block = None
+    if module.body[:-1]:
+        block = compile(ast.Module(body=module.body[:-1], type_ignores=[]), "<compute>", "exec")
+    return block, compile(ast.Expression(last.value), "<compute>", "eval")
+
+
+def _run_code(block: Any, expr: Any, exec_ns: dict[str, Any]) -> Any:
+    """执行主体；语句块里显式设置了 result 时优先返回它，全部执行完仍无返回值时给 _NO_OUTPUT。"""
+    if block is not None:
+        exec(block, exec_ns)  # noqa: S102
         if "result" in exec_ns:
-            return {"result": _serialize(exec_ns.get("result"), depth=0)}
-        expr = ast.Expression(last.value)
-        value = eval(compile(expr, "<compute>", "eval"), exec_ns)  # noqa: S307
-        return {"result": _serialize(value, depth=0)}
-
-    exec(compile(module, "<compute>", "exec"), exec_ns)  # noqa: S102
-    if "result" in exec_ns:
-        return {"result": _serialize(exec_ns.get("result"), depth=0)}
-    return {
-        "error": "未产生输出",
-        "remediation": "设置 result=... 或让最后一行成为表达式。",
-    }
+            return exec_ns.get("result")
+    if expr is not None:
+        return eval(expr, exec_ns)  # noqa: S307
+    return _NO_OUTPUT
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -484,6 +612,9 @@ def _serialize(value: Any, depth: int = 0) -> Any:
             return None
         return _serialize(value.iloc[-1], depth=depth + 1)
 
+    if is_polars(value):
+        return summarize_polars(value, _serialize, depth, _MAX_DF_PREVIEW_ROWS, _MAX_DF_PREVIEW_COLS)
+
     if isinstance(value, pd.DataFrame):
         rows, cols = value.shape
         col_names = [str(c) for c in list(value.columns)[:_MAX_DF_PREVIEW_COLS]]
@@ -553,13 +684,14 @@ def _remediation_for_exc(exc: Exception) -> str:
     if isinstance(exc, ImportError):
         return (
             "pd/np/ta/math 已预注入，无需 import。"
-            "沙箱仅允许 pandas/numpy/pandas_ta/math/time/datetime。"
+            "沙箱仅允许 pandas/numpy/pandas_ta/math/time/datetime（engine=polars 时另有 polars，已注入为 pl）。"
         )
     if isinstance(exc, NameError):
         return (
             "可用变量: df, open, high, low, close, volume, date, account, cash, equity, positions, pd, np, ta, math。"
-            "helpers: latest, prev, crossover, crossunder, above, below, bbands, macd, tail, nz。"
-            "每次 compute 独立执行，上一轮定义的变量不会保留；缺失变量请在本次代码里重新计算。"
+            "helpers: latest, prev, crossover, crossunder, above, below, bbands, macd, tail, nz, backtest, strategy_returns, bootstrap, monte_carlo, "
+            "rolling_zscore, rolling_slope, rolling_r2, rolling_rank, rolling_quantile, rolling_max_drawdown。"
+            "每次 compute 默认独立执行，上一轮定义的变量不会保留（scope 作用域也会在新一轮/上下文压缩时清空）；缺失变量请在本次代码里重新计算。"
             "提示: 用内联表达式，避免 def 多个函数互相调用。"
         )
     if isinstance(exc, KeyError):
@@ -569,6 +701,8 @@ def _remediation_for_exc(exc: Exception) -> str:
             "取最后一个值请用 latest(close) 或 close.iloc[-1]。"
             "ta.bbands()/ta.macd() 列名因版本而异，请用 bbands()/macd() helper 代替。"
         )
+    if isinstance(exc, ValueError) and "signals" in str(exc):
+        return "backtest(signals, df) 的 signals 需为与 df 等长的一维 Series（如 (fast > slow).astype(int)），不要先 .iloc[-1]。"
     if isinstance(exc, IndexError):
         return "检查数据长度: len(df)。避免固定负索引；可用 min(n, len(df)) 或 tail(close, n)。"
     if isinstance(exc, ZeroDivisionError):
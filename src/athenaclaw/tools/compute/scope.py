@@ -0,0 +1,135 @@
+"""
+[INPUT]: athenaclaw.kernel (Kernel), sys, collections, numpy, pandas
+[OUTPUT]: ComputeScope — 有上限的 LRU 变量表；ComputeScopes — turn/chat 两级作用域；compute_scopes — 会话级单例
+[POS]: compute 跨调用变量保留层：opt-in，turn 作用域在新一轮开始时清空，两级作用域都在上下文压缩时清空
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+SCOPES = ("turn", "chat")
+MAX_ENTRIES = 32
+MAX_BYTES = 256 * 1024 * 1024
+_DATA_KEY = "_compute_scopes"
+
+
+def estimate_nbytes(value: Any) -> int:
+    """粗估对象内存：pandas/numpy 取缓冲区大小，容器递归一层，其余 sys.getsizeof。"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if isinstance(value, (pd.Index, np.ndarray)):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ComputeScope:
+    """按写入/读取顺序淘汰的变量表，条目数与估算内存双上限。"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._values: OrderedDict[str, Any] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def variables(self) -> dict[str, Any]:
+        """当前所有变量（读取即刷新 LRU 顺序）。"""
+        for name in list(self._values):
+            self._values.move_to_end(name)
+        return dict(self._values)
+
+    def describe(self) -> dict[str, str]:
+        """name → 类型摘要，给 LLM 看当前作用域里有什么。"""
+        out: dict[str, str] = {}
+        for name, value in self._values.items():
+            shape = getattr(value, "shape", None)
+            out[name] = f"{type(value).__name__}{list(shape) if shape is not None else ''}"
+        return out
+
+    def store(self, values: dict[str, Any]) -> dict[str, list[str]]:
+        """写入变量并按上限淘汰最久未用的条目；单个超上限的变量直接拒收。"""
+        saved: list[str] = []
+        rejected: list[str] = []
+        for name, value in values.items():
+            size = estimate_nbytes(value)
+            if size > self.max_bytes:
+                rejected.append(name)
+                continue
+            self._values[name] = value
+            self._values.move_to_end(name)
+            self._sizes[name] = size
+            saved.append(name)
+
+        evicted: list[str] = []
+        while self._values and (len(self._values) > self.max_entries or self.nbytes > self.max_bytes):
+            name, _ = self._values.popitem(last=False)
+            self._sizes.pop(name, None)
+            evicted.append(name)
+        return {"saved": [n for n in saved if n not in evicted], "evicted": evicted, "rejected": rejected}
+
+    def discard(self, names: list[str]) -> None:
+        for name in names:
+            self._values.pop(name, None)
+            self._sizes.pop(name, None)
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._sizes.clear()
+
+
+class ComputeScopes:
+    """turn：单轮内有效；chat：跨轮保留直到上下文压缩。读取时 turn 覆盖 chat 同名变量。"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES) -> None:
+        self.turn = ComputeScope(max_entries, max_bytes)
+        self.chat = ComputeScope(max_entries, max_bytes)
+
+    def get(self, name: str) -> ComputeScope:
+        if name not in SCOPES:
+            raise ValueError(f"scope 必须是 {' / '.join(SCOPES)}")
+        return self.turn if name == "turn" else self.chat
+
+    def store(self, name: str, values: dict[str, Any]) -> dict[str, list[str]]:
+        """写入指定作用域；同名变量从另一作用域移除，避免被旧值遮蔽。"""
+        target = self.get(name)
+        other = self.chat if target is self.turn else self.turn
+        other.discard(list(values))
+        return target.store(values)
+
+    def visible(self) -> dict[str, Any]:
+        return {**self.chat.variables(), **self.turn.variables()}
+
+    def clear(self) -> None:
+        self.turn.clear()
+        self.chat.clear()
+
+
+def compute_scopes(kernel: object) -> ComputeScopes:
+    """取会话级作用域；首次创建时挂上清理管道（新一轮清 turn，上下文压缩清全部）。"""
+    scopes = kernel.data.get(_DATA_KEY)  # type: ignore[attr-defined]
+    if scopes is None:
+        scopes = ComputeScopes()
+        kernel.data.set(_DATA_KEY, scopes)  # type: ignore[attr-defined]
+        kernel.wire("turn.start", lambda _event, _data: scopes.turn.clear())  # type: ignore[attr-defined]
+        kernel.wire("context.compacted", lambda _event, _data: scopes.clear())  # type: ignore[attr-defined]
+    return scopes
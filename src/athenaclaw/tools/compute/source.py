@@ -0,0 +1,130 @@
+"""
+[INPUT]: pandas, athenaclaw.tools.market.schema
+[OUTPUT]: lookup_keys / find_frame — selector → DataStore OHLCV；resolve_frame / resolve_key — 未命中时经 market loader 自动取数；current_account — 活动账户快照
+[POS]: compute 系列工具共享的取数层（compute / compute_map / compute_sweep / compute_robustness 复用同一套 selector 语义）
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+
+from athenaclaw.tools.market.schema import (
+    LOADER_KEY,
+    build_market_query,
+    default_selector_key,
+    normalize_interval,
+    normalize_mode,
+    normalize_symbol,
+    parse_data_key,
+)
+
+
+def lookup_keys(
+    symbol: str | None,
+    interval: str | None,
+    mode: str | None,
+    start: str | None,
+    end: str | None,
+) -> list[str]:
+    """selector → DataStore 候选 key（按优先级）。"""
+    keys: list[str] = []
+    if start is not None or end is not None:
+        if not symbol:
+            raise ValueError("compute 的 start/end 需要配合 symbol 使用")
+        query = build_market_query(
+            symbol=symbol,
+            interval=interval,
+            mode=mode,
+            start=start,
+            end=end,
+        )
+        keys.extend([query.exact_key, query.selector_key, query.symbol_key])
+    elif symbol and (interval is not None or mode is not None):
+        query = build_market_query(symbol=symbol, interval=interval, mode=mode)
+        keys.extend([query.selector_key, query.symbol_key])
+    elif symbol:
+        keys.append(f"ohlcv:{normalize_symbol(symbol)}")
+    elif interval is not None or mode is not None:
+        keys.append(default_selector_key(normalize_interval(interval), normalize_mode(mode)))
+
+    if not symbol:
+        keys.append("_default_ohlcv")
+    return keys
+
+
+def find_frame(kernel: object, keys: list[str]) -> pd.DataFrame | None:
+    """按优先级返回第一个命中的 OHLCV。"""
+    for key in keys:
+        df = kernel.data.get(key)  # type: ignore[attr-defined]
+        if df is not None:
+            return df
+    return None
+
+
+def resolve_frame(
+    kernel: object,
+    symbol: str | None,
+    interval: str | None,
+    mode: str | None,
+    start: str | None,
+    end: str | None,
+    resolved: list[dict[str, Any]],
+) -> pd.DataFrame | None:
+    """
+    find_frame + 自动取数：DataStore 未命中且给了 symbol 时，按同一 selector 经 market loader 拉取
+    （未给 start/end 即 market_ohlcv 的默认窗口），并写回 DataStore 供后续调用复用。
+
+    每次自动取数（成功或失败）都追加到 resolved，调用方把它放进结果的 _resolved 字段。
+    """
+    df = find_frame(kernel, lookup_keys(symbol, interval, mode, start, end))
+    if df is not None or not symbol:
+        return df
+    loader = kernel.data.get(LOADER_KEY)  # type: ignore[attr-defined]
+    if loader is None:
+        return None
+
+    query = build_market_query(symbol=symbol, interval=interval, mode=mode, start=start, end=end)
+    record: dict[str, Any] = {
+        "symbol": query.normalized_symbol,
+        "interval": query.interval,
+        "mode": query.mode,
+        "key": query.exact_key,
+    }
+    try:
+        result = loader(query)
+    except Exception as exc:  # noqa: BLE001 - 数据源错误原样带回给 LLM
+        resolved.append({**record, "error": f"{type(exc).__name__}: {exc}"})
+        return None
+    if result.df.empty:
+        resolved.append({**record, "source": result.source, "error": "数据源返回空数据"})
+        return None
+    resolved.append({
+        **record,
+        "source": result.source,
+        "rows": len(result.df),
+        "effective_start": result.effective_start,
+        "effective_end": result.effective_end,
+        **({"warning": result.warning} if result.warning else {}),
+    })
+    return result.df
+
+
+def resolve_key(kernel: object, key: str, resolved: list[dict[str, Any]]) -> pd.DataFrame | None:
+    """DataStore key → DataFrame；ohlcv:SYMBOL[:interval:mode[:start:end]] 形式的 key 未命中时自动取数。"""
+    df = kernel.data.get(key)  # type: ignore[attr-defined]
+    if isinstance(df, pd.DataFrame):
+        return df
+    selector = parse_data_key(key)
+    if selector is None:
+        return None
+    return resolve_frame(kernel, resolved=resolved, **selector)
+
+
+def current_account(kernel: object) -> dict:
+    """当前活动账户快照；未读取过账户时给空账户。"""
+    return kernel.data.get("account") or {  # type: ignore[attr-defined]
+        "cash": 0, "equity": 0, "positions": {},
+    }
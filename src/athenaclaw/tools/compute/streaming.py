@@ -0,0 +1,365 @@
+"""
+[INPUT]: collections, copy, math, pandas
+[OUTPUT]: StreamingEMA/StreamingMACD/StreamingRSI/StreamingATR/StreamingBollinger/StreamingVWAP/RollingExtremes — O(1) 增量指标；IndicatorState；IndicatorEngine；indicator_engine
+[POS]: 实时 bar 的增量指标引擎：由 market 层喂入新 bar，供 compute（live 变量）与自动化价格触发读取
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+from collections import deque
+from typing import Any
+
+import pandas as pd
+
+
+# 首次喂入长历史时最多回放的 bar 数；EMA/RMA 类指标在此窗口内早已收敛
+MAX_WARMUP_BARS = 5000
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 单指标增量状态 — 每次 update 均为 O(1)（滚动极值为均摊 O(1)）
+# ─────────────────────────────────────────────────────────────────────────────
+
+class StreamingEMA:
+    """EMA(adjust=False)：首值播种，与 pandas ewm(span, adjust=False) 逐点一致。"""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, length: int) -> None:
+        self.alpha = 2.0 / (length + 1)
+        self.value: float | None = None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class StreamingMACD:
+    """MACD：fast/slow EMA 差值 + signal EMA。"""
+
+    __slots__ = ("fast", "slow", "signal", "macd", "hist")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.macd: float | None = None
+        self.hist: float | None = None
+
+    def update(self, close: float) -> None:
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        self.hist = self.macd - self.signal.update(self.macd)
+
+
+class StreamingRSI:
+    """Wilder RSI：gain/loss 用 alpha=1/length 的 EMA 平滑，前 length 个涨跌幅为预热期。"""
+
+    __slots__ = ("length", "alpha", "prev", "avg_gain", "avg_loss", "count")
+
+    def __init__(self, length: int = 14) -> None:
+        self.length = length
+        self.alpha = 1.0 / length
+        self.prev: float | None = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+
+    def update(self, close: float) -> None:
+        if self.prev is None:
+            self.prev = close
+            return
+        delta = close - self.prev
+        self.prev = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if self.count == 0:
+            self.avg_gain, self.avg_loss = gain, loss
+        else:
+            self.avg_gain += self.alpha * (gain - self.avg_gain)
+            self.avg_loss += self.alpha * (loss - self.avg_loss)
+        self.count += 1
+
+    @property
+    def value(self) -> float | None:
+        if self.count < self.length:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class StreamingATR:
+    """Wilder ATR：前 length 个 TR 取均值播种，此后 RMA 递推。"""
+
+    __slots__ = ("length", "prev_close", "seed_sum", "count", "value")
+
+    def __init__(self, length: int = 14) -> None:
+        self.length = length
+        self.prev_close: float | None = None
+        self.seed_sum = 0.0
+        self.count = 0
+        self.value: float | None = None
+
+    def update(self, high: float, low: float, close: float) -> None:
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.count < self.length:
+            self.seed_sum += tr
+        elif self.count == self.length:
+            self.value = (self.seed_sum + tr) / self.length
+        else:
+            self.value += (tr - self.value) / self.length  # type: ignore[operator]
+
+
+class StreamingBollinger:
+    """布林带：定长窗口 + 累计和/平方和，总体标准差(ddof=0)，与 fallback ta.bbands 一致。"""
+
+    __slots__ = ("length", "std", "window", "total", "total_sq")
+
+    def __init__(self, length: int = 20, std: float = 2.0) -> None:
+        self.length = length
+        self.std = std
+        self.window: deque[float] = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, close: float) -> None:
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+        if len(self.window) > self.length:
+            old = self.window.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+
+    @property
+    def bands(self) -> tuple[float | None, float | None, float | None]:
+        if len(self.window) < self.length:
+            return (None, None, None)
+        mean = self.total / self.length
+        var = max(self.total_sq / self.length - mean * mean, 0.0)
+        dev = math.sqrt(var) * self.std
+        return (mean + dev, mean, mean - dev)
+
+
+class StreamingVWAP:
+    """按交易日锚定的 VWAP：typical price 加权，跨日自动重置。"""
+
+    __slots__ = ("session", "pv", "vol", "value")
+
+    def __init__(self) -> None:
+        self.session: Any = None
+        self.pv = 0.0
+        self.vol = 0.0
+        self.value: float | None = None
+
+    def update(self, ts: pd.Timestamp, high: float, low: float, close: float, volume: float) -> None:
+        session = ts.date()
+        if session != self.session:
+            self.session = session
+            self.pv = 0.0
+            self.vol = 0.0
+        typical = (high + low + close) / 3.0
+        self.pv += typical * volume
+        self.vol += volume
+        self.value = self.pv / self.vol if self.vol > 0 else typical
+
+
+class RollingExtremes:
+    """滚动最高/最低：单调队列，均摊 O(1)。"""
+
+    __slots__ = ("length", "index", "maxq", "minq")
+
+    def __init__(self, length: int = 20) -> None:
+        self.length = length
+        self.index = 0
+        self.maxq: deque[tuple[int, float]] = deque()
+        self.minq: deque[tuple[int, float]] = deque()
+
+    def update(self, high: float, low: float) -> None:
+        i = self.index
+        self.index += 1
+        while self.maxq and self.maxq[-1][1] <= high:
+            self.maxq.pop()
+        self.maxq.append((i, high))
+        while self.minq and self.minq[-1][1] >= low:
+            self.minq.pop()
+        self.minq.append((i, low))
+        floor = i - self.length
+        while self.maxq[0][0] <= floor:
+            self.maxq.popleft()
+        while self.minq[0][0] <= floor:
+            self.minq.popleft()
+
+    @property
+    def high(self) -> float | None:
+        return self.maxq[0][1] if self.index >= self.length else None
+
+    @property
+    def low(self) -> float | None:
+        return self.minq[0][1] if self.index >= self.length else None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 单标的状态 — 默认指标集 + 未收盘 bar 的修订
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Indicators:
+    __slots__ = ("ema", "macd", "rsi", "atr", "bbands", "vwap", "extremes", "close")
+
+    def __init__(self) -> None:
+        self.ema = StreamingEMA(20)
+        self.macd = StreamingMACD(12, 26, 9)
+        self.rsi = StreamingRSI(14)
+        self.atr = StreamingATR(14)
+        self.bbands = StreamingBollinger(20, 2.0)
+        self.vwap = StreamingVWAP()
+        self.extremes = RollingExtremes(20)
+        self.close: float | None = None
+
+    def update(self, ts: pd.Timestamp, o: float, h: float, l: float, c: float, v: float) -> None:
+        self.close = c
+        self.ema.update(c)
+        self.macd.update(c)
+        self.rsi.update(c)
+        self.atr.update(h, l, c)
+        self.bbands.update(c)
+        self.vwap.update(ts, h, l, c, v)
+        self.extremes.update(h, l)
+
+
+class IndicatorState:
+    """
+    单个 (symbol, interval) 的增量指标状态。
+
+    同一时间戳的 bar 重复到达（盘中未收盘 bar 被修订）时，
+    从上一根已确认 bar 的检查点恢复后重算，避免重复累计。
+    检查点只为可能被修订的 bar（一批里的最后一根）保存，批量回放不再逐 bar 深拷贝。
+    """
+
+    def __init__(self, symbol: str, interval: str) -> None:
+        self.symbol = symbol
+        self.interval = interval
+        self.last_ts: pd.Timestamp | None = None
+        self.bars = 0
+        self._current = _Indicators()
+        self._checkpoint: _Indicators | None = None
+
+    def update(
+        self, ts: Any, o: float, h: float, l: float, c: float, v: float, *, checkpoint: bool = True,
+    ) -> bool:
+        """
+        喂入一根 bar；早于 last_ts 的 bar 被忽略，返回是否生效。
+        checkpoint=False 表示调用方已知后面还有更新的 bar（该 bar 已收盘、不会再被修订），跳过检查点。
+        """
+        stamp = pd.Timestamp(ts)
+        if self.last_ts is not None and stamp < self.last_ts:
+            return False
+        if self.last_ts is not None and stamp == self.last_ts:
+            if self._checkpoint is None:
+                return False
+            self._current = copy.deepcopy(self._checkpoint)
+        else:
+            self._checkpoint = copy.deepcopy(self._current) if checkpoint else None
+            self.bars += 1
+        volume = 0.0 if v is None or v != v else float(v)
+        self._current.update(stamp, float(o), float(h), float(l), float(c), volume)
+        self.last_ts = stamp
+        return True
+
+    def snapshot(self) -> dict[str, Any]:
+        ind = self._current
+        upper, middle, lower = ind.bbands.bands
+        return {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "as_of": self.last_ts.isoformat() if self.last_ts is not None else None,
+            "bars": self.bars,
+            "close": ind.close,
+            "ema_20": ind.ema.value,
+            "macd": ind.macd.macd,
+            "macd_signal": ind.macd.signal.value,
+            "macd_hist": ind.macd.hist,
+            "rsi_14": ind.rsi.value,
+            "atr_14": ind.atr.value,
+            "bb_upper": upper,
+            "bb_middle": middle,
+            "bb_lower": lower,
+            "vwap": ind.vwap.value,
+            "high_20": ind.extremes.high,
+            "low_20": ind.extremes.low,
+        }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 引擎 — 按 (symbol, interval) 维护状态
+# ─────────────────────────────────────────────────────────────────────────────
+
+class IndicatorEngine:
+    """增量指标注册表：ingest 只处理 last_ts 之后（含修订中的最后一根）的 bar。"""
+
+    def __init__(self, max_warmup_bars: int = MAX_WARMUP_BARS) -> None:
+        self._states: dict[tuple[str, str], IndicatorState] = {}
+        self._max_warmup_bars = max(1, int(max_warmup_bars))
+        self.latest_key: tuple[str, str] | None = None
+
+    def has(self, symbol: str, interval: str) -> bool:
+        return (symbol, interval) in self._states
+
+    def state(self, symbol: str, interval: str) -> IndicatorState | None:
+        return self._states.get((symbol, interval))
+
+    def ingest(self, symbol: str, interval: str, df: pd.DataFrame) -> dict[str, Any] | None:
+        """喂入 canonical OHLCV（按 date 升序），返回最新快照；空帧返回现有快照。"""
+        key = (symbol, interval)
+        state = self._states.get(key)
+        if df is None or df.empty:
+            return state.snapshot() if state else None
+        if state is None:
+            state = IndicatorState(symbol, interval)
+            self._states[key] = state
+            start = max(0, len(df) - self._max_warmup_bars)
+        elif state.last_ts is None:
+            start = 0
+        else:
+            # 二分定位：只回放 last_ts 及之后的 bar，与历史长度无关
+            start = int(df["date"].searchsorted(state.last_ts, side="left"))
+        if start < len(df):
+            tail = df.iloc[start:]
+            last = len(tail) - 1
+            for i, (ts, o, h, l, c, v) in enumerate(zip(
+                tail["date"], tail["open"], tail["high"], tail["low"], tail["close"], tail["volume"],
+            )):
+                # 只有最后一根可能是未收盘 bar，需要检查点
+                state.update(ts, o, h, l, c, v, checkpoint=i == last)
+        self.latest_key = key
+        return state.snapshot()
+
+    def snapshot(self, symbol: str | None = None, interval: str | None = None) -> dict[str, Any] | None:
+        """读取快照；不指定 symbol 时返回最近一次 ingest 的标的。"""
+        if symbol is None:
+            if self.latest_key is None:
+                return None
+            symbol, latest_interval = self.latest_key
+            interval = interval or latest_interval
+        state = self._states.get((symbol, interval or "1d"))
+        return state.snapshot() if state else None
+
+
+def indicator_engine(kernel: object) -> IndicatorEngine:
+    """从 Kernel.data 取（或创建）会话级增量指标引擎。"""
+    engine = kernel.data.get("_indicators")  # type: ignore[attr-defined]
+    if engine is None:
+        engine = IndicatorEngine()
+        kernel.data.set("_indicators", engine)  # type: ignore[attr-defined]
+    return engine
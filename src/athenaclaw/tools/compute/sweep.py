@@ -0,0 +1,208 @@
+"""
+[INPUT]: athenaclaw.kernel (Kernel), itertools, keyword, math, time, athenaclaw.tools.compute.{sandbox,source,parallel}
+[OUTPUT]: register() — compute_sweep 工具；expand_grid / run_sweep — 参数网格展开与并行评分；sweep_chunk / score_row / rank_rows / score_snippet — 供 walk-forward 复用
+[POS]: compute 参数寻优层：一次工具调用跑完整个网格，每个组合仍在沙箱内执行
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import itertools
+import keyword
+import math
+import time
+from typing import Any
+
+import pandas as pd
+
+from athenaclaw.tools.compute.parallel import run_chunked
+from athenaclaw.tools.compute.sandbox import HELPERS, exec_compute
+from athenaclaw.tools.compute.source import current_account, resolve_frame
+
+
+MAX_COMBINATIONS = 1000
+_TOP_N = 20
+_MAX_ERRORS = 5
+
+# 参数名不能遮蔽沙箱预注入变量
+_RESERVED = frozenset({
+    "df", "open", "high", "low", "close", "volume", "date",
+    "account", "cash", "equity", "positions", "pd", "np", "ta", "math",
+    "result", "params", "live", *HELPERS,
+})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 网格
+# ─────────────────────────────────────────────────────────────────────────────
+
+def expand_grid(grid: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    """{name: [values]} → 笛卡尔积组合列表（按参数声明顺序）。"""
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError("grid 必须是非空对象，如 {\"fast\": [5, 10], \"slow\": [20, 50]}")
+    names = list(grid)
+    for name in names:
+        if not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+            raise ValueError(f"参数名必须是合法 Python 标识符且不以下划线开头: {name!r}")
+        if name in _RESERVED:
+            raise ValueError(f"参数名 {name!r} 会遮蔽沙箱预注入变量，请换一个名字")
+        values = grid[name]
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"参数 {name!r} 的取值必须是非空数组")
+    total = math.prod(len(grid[name]) for name in names)
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"组合数 {total} 超过上限 {MAX_COMBINATIONS}，请缩小网格")
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 执行（worker 进程内运行，必须是模块级函数）
+# ─────────────────────────────────────────────────────────────────────────────
+
+def sweep_chunk(shared: tuple, combos: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """在单个 worker 内串行评估一块参数组合；单个组合失败只记录错误，不中断整块。"""
+    code, df, account, timeout_ms = shared
+    rows: list[dict[str, Any]] = []
+    for params in combos:
+        out = exec_compute(code, df, account, timeout_ms=timeout_ms, extra_ns={**params, "params": dict(params)})
+        rows.append(score_row(params, out))
+    return rows
+
+
+def score_row(params: dict[str, Any], out: dict[str, Any]) -> dict[str, Any]:
+    """一次沙箱执行的结果 → {"params", "score"} 或 {"params", "error"}。"""
+    if "error" in out:
+        return {"params": params, "error": out["error"]}
+    score = out.get("result")
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        return {"params": params, "error": f"score 必须是数值，收到: {type(score).__name__}"}
+    return {"params": params, "score": float(score)}
+
+
+def score_snippet(code: str, score: str | None) -> str:
+    """把 score 表达式拼到 code 之后；省略时直接用 code 的返回值。"""
+    return code if not score else f"{code.rstrip()}\nresult = ({score})"
+
+
+def rank_rows(rows: list[dict[str, Any]], minimize: bool) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """拆分成功/失败组合，成功组合按得分排序（默认降序）。"""
+    ok = [r for r in rows if "score" in r]
+    failed = [r for r in rows if "score" not in r]
+    ok.sort(key=lambda r: r["score"], reverse=not minimize)
+    return ok, failed
+
+
+def run_sweep(
+    code: str,
+    grid: dict[str, list[Any]],
+    df: pd.DataFrame,
+    account: dict[str, Any],
+    *,
+    score: str | None = None,
+    minimize: bool = False,
+    timeout_ms: int = 500,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """
+    对网格里每个组合执行 code，再求 score 表达式并排名。
+
+    参数以同名变量（及 params dict）注入沙箱；每个组合仍受单次 timeout_ms 限制。
+    score 省略时用 code 自身的返回值作为得分；NaN/inf 视为失败。
+    """
+    combos = expand_grid(grid)
+    snippet = score_snippet(code, score)
+    started = time.perf_counter()
+    rows, info = run_chunked(sweep_chunk, (snippet, df, account, timeout_ms), combos, workers=workers)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    ok, failed = rank_rows(rows, minimize)
+    top = [{**r["params"], "score": r["score"]} for r in ok[:_TOP_N]]
+
+    return {
+        "combinations": len(combos),
+        "succeeded": len(ok),
+        "failed": len(failed),
+        "objective": "minimize" if minimize else "maximize",
+        "best": {"params": ok[0]["params"], "score": ok[0]["score"]} if ok else None,
+        "top": top,
+        "errors": [{"params": r["params"], "error": r["error"]} for r in failed[:_MAX_ERRORS]],
+        "elapsed_ms": elapsed_ms,
+        **info,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 注册
+# ─────────────────────────────────────────────────────────────────────────────
+
+def register(kernel: object) -> None:
+    """向 Kernel 注册 compute_sweep 工具"""
+
+    def compute_sweep(args: dict) -> dict:
+        symbol = args.get("symbol")
+        resolved: list[dict] = []
+        df = resolve_frame(
+            kernel, symbol, args.get("interval"), args.get("mode"), args.get("start"), args.get("end"), resolved,
+        )
+        if df is None:
+            if resolved:
+                return {"error": f"未找到对应 OHLCV，自动取数失败: {resolved[0]['error']}", "_resolved": resolved}
+            return {"error": "未找到对应 OHLCV，请先用相同的 symbol/interval/mode/start/end 调用 market_ohlcv"}
+        try:
+            out = run_sweep(
+                args["code"],
+                args.get("grid") or {},
+                df,
+                current_account(kernel),
+                score=args.get("score"),
+                minimize=bool(args.get("minimize", False)),
+            )
+        except ValueError as exc:
+            return {"error": str(exc)}
+        except TimeoutError as exc:
+            return {"error": str(exc), "remediation": "缩小网格或简化每个组合的代码。"}
+        if resolved:
+            out["_resolved"] = resolved
+        return out
+
+    kernel.tool(
+        name="compute_sweep",
+        description=(
+            "参数寻优：一次调用对整个参数网格并行执行同一段 compute 代码并按得分排名，"
+            "替代逐个组合反复调用 compute。grid 的每个参数名会作为同名变量注入沙箱（也可用 params dict），"
+            "其余预加载变量/helper 与 compute 相同（df/close/backtest 等），数据 selector 规则也与 compute 相同。"
+            "score 是在 code 执行后求值的数值表达式（如 bt['metrics']['sharpe']）；省略时用 code 的返回值。"
+            f"默认越大越好，minimize=true 则越小越好；组合数上限 {MAX_COMBINATIONS}，每个组合单独受沙箱超时限制。"
+            "返回 best、前 20 名 top 表、失败组合示例与耗时。"
+            "示例: code=\"bt = backtest((close.rolling(fast).mean() > close.rolling(slow).mean()).astype(int), df)\", "
+            "grid={\"fast\": [5, 10, 20], \"slow\": [50, 100]}, score=\"bt['metrics']['sharpe']\"。"
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "code": {"type": "string", "description": "每个参数组合执行的 Python 代码"},
+                "grid": {
+                    "type": "object",
+                    "description": "参数网格：{参数名: [候选值, ...]}，取笛卡尔积",
+                    "additionalProperties": {"type": "array"},
+                },
+                "score": {"type": "string", "description": "数值得分表达式，在 code 之后求值；省略则用 code 的返回值"},
+                "minimize": {"type": "boolean", "description": "true 时得分越小越好", "default": False},
+                "symbol": {"type": "string", "description": "与 compute 相同的 symbol selector"},
+                "interval": {
+                    "type": "string",
+                    "enum": ["1d", "1m", "5m", "15m", "30m", "60m"],
+                    "description": "与 market_ohlcv 相同的 bar 粒度 selector",
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["history", "latest"],
+                    "description": "与 market_ohlcv 相同的模式 selector",
+                },
+                "start": {"type": "string", "description": "可选，精确匹配某次 history 查询的起始时间"},
+                "end": {"type": "string", "description": "可选，精确匹配某次 history 查询的截止时间"},
+            },
+            "required": ["code", "grid"],
+        },
+        handler=compute_sweep,
+    )
@@ -1,117 +1,222 @@
 """
-[INPUT]: athenaclaw.kernel (Kernel), athenaclaw.tools.compute.sandbox, athenaclaw.tools.market.schema
-[OUTPUT]: register()
-[POS]: 领域增强工具，沙箱化 Python 计算；自动从 DataStore 注入 OHLCV
+[INPUT]: athenaclaw.kernel (Kernel), pandas, athenaclaw.tools.compute.{columnar,fanout,panel,profile,robustness,sandbox,scope,source,streaming,sweep}, athenaclaw.tools.market.schema
+[OUTPUT]: register() — 注册 compute（并挂载 compute_map / compute_sweep / compute_robustness）
+[POS]: 领域增强工具，沙箱化 Python 计算；自动从 DataStore 注入 OHLCV（单标的 df 或多标的对齐面板，缺失时经 market loader 自动取数）与增量指标快照 live
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from __future__ import annotations
 
-from athenaclaw.tools.market.schema import (
-    build_market_query,
-    default_selector_key,
-    normalize_interval,
-    normalize_mode,
-    normalize_symbol,
-)
+import pandas as pd
+
+from athenaclaw.tools.market.schema import normalize_interval, normalize_symbol
+from athenaclaw.tools.compute.columnar import ENGINES, polars_available
+from athenaclaw.tools.compute.fanout import register as register_map
+from athenaclaw.tools.compute.panel import ALIGN_MODES, align_panel
+from athenaclaw.tools.compute.profile import compute_profiler
+from athenaclaw.tools.compute.robustness import register as register_robustness
 from athenaclaw.tools.compute.sandbox import exec_compute
+from athenaclaw.tools.compute.scope import SCOPES, compute_scopes
+from athenaclaw.tools.compute.source import current_account, resolve_frame
+from athenaclaw.tools.compute.streaming import indicator_engine
+from athenaclaw.tools.compute.sweep import register as register_sweep
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 注册
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _with_resolved(out: dict, resolved: list[dict]) -> dict:
+    """本次调用触发了自动取数时，把取数记录放进结果，LLM 能看到用的是哪段数据。"""
+    if resolved:
+        out["_resolved"] = resolved
+    return out
+
+
 def register(kernel: object) -> None:
     """向 Kernel 注册 compute 工具"""
 
+    scopes = compute_scopes(kernel)
+    profiler = compute_profiler(kernel)
+
+    def _profiled(code: str, df: pd.DataFrame, scope_name: str | None, **kwargs: object) -> dict:
+        """执行并记录画像：逐次 emit compute.profile，同时按代码哈希累计到会话 profiler。"""
+        record: dict = {}
+        out = exec_compute(
+            code, df, current_account(kernel),
+            profile=record, trace_memory=profiler.trace_memory, **kwargs,
+        )
+        record["code_hash"] = profiler.record(code, record)
+        record["bars"] = len(df)
+        if scope_name:
+            record["scope"] = scope_name
+        kernel.emit("compute.profile", record)  # type: ignore[attr-defined]
+        return out
+
+    def _execute(code: str, df: pd.DataFrame, extra_ns: dict, scope: str | None, backend: str = "pandas") -> dict:
+        """普通调用走全新命名空间；带 scope 时注入已保留变量，并把本次新变量写回对应作用域。"""
+        if not scope:
+            return _profiled(code, df, None, extra_ns=extra_ns, engine=backend)
+        captured: dict = {}
+        out = _profiled(
+            code, df, scope, extra_ns=extra_ns, engine=backend, scope=scopes.visible(), capture=captured,
+        )
+        report = scopes.store(scope, captured) if "error" not in out else {"saved": [], "evicted": [], "rejected": []}
+        out["_scope"] = {
+            "scope": scope,
+            **{k: v for k, v in report.items() if v},
+            "variables": {**scopes.chat.describe(), **scopes.turn.describe()},
+        }
+        return out
+
     def compute_handler(args: dict) -> dict:
         code = args["code"]
         symbol = args.get("symbol")
+        symbols = [str(s).strip() for s in (args.get("symbols") or []) if str(s).strip()]
         interval = args.get("interval")
         mode = args.get("mode")
         start = args.get("start")
         end = args.get("end")
 
-        # 从 DataStore 查找 OHLCV
-        keys: list[str] = []
-        if start is not None or end is not None:
-            if not symbol:
-                raise ValueError("compute 的 start/end 需要配合 symbol 使用")
-            query = build_market_query(
-                symbol=symbol,
-                interval=interval,
-                mode=mode,
-                start=start,
-                end=end,
-            )
-            keys.extend([query.exact_key, query.selector_key, query.symbol_key])
-        elif symbol and (interval is not None or mode is not None):
-            query = build_market_query(symbol=symbol, interval=interval, mode=mode)
-            keys.extend([query.selector_key, query.symbol_key])
-        elif symbol:
-            keys.append(f"ohlcv:{normalize_symbol(symbol)}")
-        elif interval is not None or mode is not None:
-            keys.append(default_selector_key(normalize_interval(interval), normalize_mode(mode)))
-
-        if not symbol:
-            keys.append("_default_ohlcv")
-
-        df = None
-        for key in keys:
-            df = kernel.data.get(key)
-            if df is not None:
-                break
+        scope = args.get("scope")
+        if scope is not None and scope not in SCOPES:
+            return {"error": f"scope 必须是 {' / '.join(SCOPES)}"}
+        backend = args.get("engine") or "pandas"
+        if backend not in ENGINES:
+            return {"error": f"engine 必须是 {' / '.join(ENGINES)}"}
+
+        if symbols:
+            if backend != "pandas":
+                return {"error": "多标的 symbols 面板只支持 pandas 引擎，请去掉 engine 或改为逐个标的计算"}
+            return _compute_panel(code, symbols, args)
+
+        # 从 DataStore 查找 OHLCV；给了 symbol 但未命中时按同一 selector 自动取数
+        resolved: list[dict] = []
+        df = resolve_frame(kernel, symbol, interval, mode, start, end, resolved)
         if df is None:
+            if resolved:
+                failed = resolved[0]
+                return {"error": f"未找到对应 OHLCV，自动获取 {failed['symbol']} 行情失败: {failed['error']}", "_resolved": resolved}
             if symbol or interval or mode or start or end:
                 return {"error": "未找到对应 OHLCV，请先用相同的 symbol/interval/mode/start/end 调用 market_ohlcv"}
             return {"error": "无 OHLCV 数据，请先调用 market_ohlcv"}
 
-        account = kernel.data.get("account") or {
-            "cash": 0, "equity": 0, "positions": {},
+        engine = indicator_engine(kernel)
+        if symbol:
+            live = engine.snapshot(normalize_symbol(symbol), normalize_interval(interval))
+        else:
+            live = engine.snapshot(interval=normalize_interval(interval) if interval else None)
+        return _with_resolved(_execute(code, df, {"live": live or {}}, scope, backend), resolved)
+
+    def _compute_panel(code: str, symbols: list[str], args: dict) -> dict:
+        """多标的：逐个按 selector 取数，沙箱外一次性对齐后注入 panel/closes/frames。"""
+        interval = args.get("interval")
+        mode = args.get("mode")
+        found: dict[str, pd.DataFrame] = {}
+        missing: list[str] = []
+        resolved: list[dict] = []
+        for sym in symbols:
+            df = resolve_frame(kernel, sym, interval, mode, args.get("start"), args.get("end"), resolved)
+            if df is None:
+                missing.append(sym)
+            else:
+                found[normalize_symbol(sym)] = df
+        if missing:
+            return _with_resolved({
+                "error": f"未找到对应 OHLCV: {', '.join(missing)}",
+                "remediation": "先对每个 symbol 用相同的 interval/mode/start/end 调用 market_ohlcv。",
+            }, resolved)
+
+        panel = align_panel(found, how=str(args.get("align") or "inner"))
+        engine = indicator_engine(kernel)
+        resolved_interval = normalize_interval(interval)
+        extra_ns = {
+            "symbols": list(panel.symbols),
+            "panel": panel.wide,
+            "closes": panel.closes,
+            "frames": panel.frames,
+            "live": {
+                sym: engine.snapshot(sym, resolved_interval) or {}
+                for sym in panel.symbols
+            },
         }
-        return exec_compute(code, df, account)
+        return _with_resolved(_execute(code, panel.frames[panel.symbols[0]], extra_ns, args.get("scope")), resolved)
+
+    properties: dict = {
+        "code": {"type": "string", "description": "Python 代码"},
+        "symbol": {"type": "string", "description": "标的代码；多数据集并存时建议显式提供"},
+        "symbols": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "多标的模式：按共享日历对齐后注入 closes/panel/frames；每个 symbol 都需先用相同 selector 调过 market_ohlcv",
+        },
+        "scope": {
+            "type": "string",
+            "enum": list(SCOPES),
+            "description": "可选，保留命名空间：turn=本轮内有效，chat=跨轮直到上下文压缩；不填则每次独立",
+        },
+        "align": {
+            "type": "string",
+            "enum": list(ALIGN_MODES),
+            "description": "多标的日历对齐方式：inner=交集(默认)，outer=并集+前向填充",
+        },
+        "interval": {
+            "type": "string",
+            "enum": ["1d", "1m", "5m", "15m", "30m", "60m"],
+            "description": "与 market_ohlcv 相同的 bar 粒度 selector",
+        },
+        "mode": {
+            "type": "string",
+            "enum": ["history", "latest"],
+            "description": "与 market_ohlcv 相同的模式 selector",
+        },
+        "start": {"type": "string", "description": "可选，精确匹配某次 history 查询的起始时间"},
+        "end": {"type": "string", "description": "可选，精确匹配某次 history 查询的截止时间"},
+    }
+    engine_hint = ""
+    if polars_available():
+        # 仅在安装了 polars 时暴露 engine，避免 LLM 选到不可用的引擎
+        properties["engine"] = {
+            "type": "string",
+            "enum": list(ENGINES),
+            "description": "执行引擎：pandas(默认) / polars(多年分钟级数据的重聚合、滚动窗口)",
+        }
+        engine_hint = "engine=polars 时 df 为 polars DataFrame、lf 为 LazyFrame，适合多年分钟级数据的重聚合。"
 
     kernel.tool(
         name="compute",
         description=(
             "Python 计算沙箱（通用分析终端，不是指标菜单）。"
-            "每次调用独立命名空间，上一轮 compute 中定义的变量不会保留到下一轮。"
+            "默认每次调用独立命名空间，上一轮 compute 中定义的变量不会保留到下一轮（scope=turn/chat 可保留）。"
             "预加载: df(OHLCV DataFrame), open/high/low/close/volume/date(均为 pandas Series), "
-            "account/cash/equity/positions, pd, np, ta(=pandas_ta), math。"
+            "account/cash/equity/positions, pd, np, ta(=pandas_ta), math；live 为增量指标快照(如 live['rsi_14'])。"
             "Helpers: latest, prev, crossover, crossunder, above, below, "
-            "bbands(close,length,std)→(upper,mid,lower), macd(close)→(macd,signal,hist), tail, nz。"
+            "bbands(close,length,std)→(upper,mid,lower), macd(close)→(macd,signal,hist), tail, nz, "
+            "backtest, strategy_returns, bootstrap, monte_carlo, rolling_zscore/slope/r2/rank/quantile/max_drawdown。"
             "返回: 单表达式自动返回；多行代码最后一行若为表达式也会返回；也可显式设置 result。"
             "重要语义: market_ohlcv 只是在后台注入 df，不会把其返回 JSON 中的 data 变量带进来；"
             "即使 market_ohlcv 用 include_data_in_result=false 隐藏了 data，"
-            "只要 selector 对得上，compute 仍然能拿到对应 df。"
+            "只要 selector 对得上，compute 仍然能拿到对应 df；给了 symbol 但未取过数时会按 selector 自动取数。"
             "如果已经抓过多个 symbol/interval/mode/start/end 组合，compute 必须复用同一组 selector 才能取到正确的 df。"
             "一旦显式提供 symbol，compute 只会在该 symbol 的数据范围内查找，不会回退到别的 symbol。"
             "若需价格序列请直接使用 df/close/date。date 在分钟数据中会包含时分秒。Series 使用 pandas 语义且默认 RangeIndex，"
             "取最后一个值请用 latest(close) 或 close.iloc[-1]，不要写 close[-1]/date[-1]。"
             "若后续公式依赖 max_price/min_price/latest_close 等中间量，必须在同一次 compute 中重新计算。"
             "bbands()/macd() helper 返回的是最新标量三元组，不要再对返回值写 [-1]。"
+            "跨标的分析用 symbols=[...]（注入对齐后的 closes/panel/frames）；逐标的同一计算用 compute_map。"
             "注意: 不要写 import(已预注入)；不要 def 函数(用内联表达式)；不要文件 I/O；"
             "代码保持 5-20 行 REPL 风格。用 bbands()/macd() helper 而非 ta.bbands()/ta.macd()。"
+            "回测、滚动窗口、多标的面板、scope 与引擎的详细用法见 compute skill。"
+            + engine_hint
         ),
         parameters={
             "type": "object",
-            "properties": {
-                "code": {"type": "string", "description": "Python 代码"},
-                "symbol": {"type": "string", "description": "标的代码；多数据集并存时建议显式提供"},
-                "interval": {
-                    "type": "string",
-                    "enum": ["1d", "1m", "5m", "15m", "30m", "60m"],
-                    "description": "与 market_ohlcv 相同的 bar 粒度 selector",
-                },
-                "mode": {
-                    "type": "string",
-                    "enum": ["history", "latest"],
-                    "description": "与 market_ohlcv 相同的模式 selector",
-                },
-                "start": {"type": "string", "description": "可选，精确匹配某次 history 查询的起始时间"},
-                "end": {"type": "string", "description": "可选，精确匹配某次 history 查询的截止时间"},
-            },
+            "properties": properties,
             "required": ["code"],
         },
         handler=compute_handler,
     )
+
+    register_map(kernel)
+    register_sweep(kernel)
+    register_robustness(kernel)
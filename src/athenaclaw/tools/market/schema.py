@@ -1,6 +1,6 @@
 """
 [INPUT]: dataclasses, datetime, pandas
-[OUTPUT]: MarketQuery/MarketFetchResult + query validation/storage helpers
+[OUTPUT]: MarketQuery/MarketFetchResult + query validation/storage helpers；parse_data_key — DataStore key → selector；LOADER_KEY
 [POS]: market 适配器共享协议层，统一 interval/mode/start/end 语义、symbol 归一化与 DataStore key
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
@@ -20,6 +20,7 @@ MINUTE_INTERVALS = VALID_INTERVALS[1:]
 DEFAULT_CN_TIMEZONE = "Asia/Shanghai"
 DEFAULT_HK_TIMEZONE = "Asia/Hong_Kong"
 DEFAULT_US_TIMEZONE = "America/New_York"
+LOADER_KEY = "_market_loader"     # DataStore 中 market 层发布的 load(query) → MarketFetchResult
 
 
 @dataclass(frozen=True)
@@ -215,6 +216,25 @@ def meta_key(data_key: str) -> str:
     return f"meta:{data_key}"
 
 
+def parse_data_key(data_key: str) -> dict[str, str | None] | None:
+    """
+    MarketQuery 生成的 key → selector（symbol/interval/mode/start/end）；非 ohlcv key 返回 None。
+
+    支持 symbol_key / selector_key / exact_key 三种粒度，省略的部分按 market_ohlcv 默认值处理。
+    """
+    parts = data_key.strip().split(":")
+    if len(parts) not in (2, 4, 6) or parts[0] != "ohlcv" or not parts[1]:
+        return None
+    selector: dict[str, str | None] = {"symbol": parts[1], "interval": None, "mode": None, "start": None, "end": None}
+    if len(parts) >= 4:
+        selector["interval"], selector["mode"] = parts[2], parts[3]
+    if len(parts) == 6:
+        interval = normalize_interval(parts[2])
+        selector["start"] = _parse_window_token(parts[4], interval)
+        selector["end"] = _parse_window_token(parts[5], interval)
+    return selector
+
+
 def yfinance_symbol(symbol: str) -> str:
     normalized = normalize_symbol(symbol)
     if normalized.endswith(".SH"):
@@ -267,3 +287,14 @@ def _window_token(value: str | None, *, default: str) -> str:
     if value is None:
         return f"__{default}__"
     return value.replace("-", "").replace(" ", "T").replace(":", "")
+
+
+def _parse_window_token(token: str, interval: str) -> str | None:
+    """_window_token 的逆变换；__default__/__open__ 占位符还原为 None。"""
+    if token.startswith("__"):
+        return None
+    try:
+        dt = datetime.strptime(token, "%Y%m%d" if "T" not in token else "%Y%m%dT%H%M%S")
+    except ValueError as exc:
+        raise ValueError(f"无法解析 key 中的时间窗口: {token!r}") from exc
+    return format_boundary(dt, interval)
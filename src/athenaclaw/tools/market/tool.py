@@ -1,17 +1,20 @@
 """
-[INPUT]: athenaclaw.kernel (Kernel), pandas, athenaclaw.tools.market.schema
-[OUTPUT]: MarketAdapter Protocol + register()
-[POS]: 领域核心工具，获取 OHLCV 并注入 DataStore；返回原始数据供 LLM 直接推理；adapter pattern 解耦数据源
+[INPUT]: athenaclaw.kernel (Kernel), threading, pandas, athenaclaw.tools.market.schema, athenaclaw.tools.compute.streaming
+[OUTPUT]: MarketAdapter Protocol + register()（同时在 DataStore 发布 LOADER_KEY 取数函数）
+[POS]: 领域核心工具，获取 OHLCV 并注入 DataStore + 增量指标引擎；返回原始数据供 LLM 直接推理；adapter pattern 解耦数据源；compute 缺数据时经同一 loader 自动取数
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from __future__ import annotations
 
+import threading
 from typing import Protocol
 
 import pandas as pd
 
+from athenaclaw.tools.compute.streaming import indicator_engine
 from athenaclaw.tools.market.schema import (
+    LOADER_KEY,
     MarketFetchResult,
     MarketQuery,
     build_market_query,
@@ -39,6 +42,42 @@ class MarketAdapter(Protocol):
 def register(kernel: object, adapter: MarketAdapter) -> None:
     """向 Kernel 注册 market_ohlcv 工具"""
 
+    # 同轮并发的 market_ohlcv 只并行网络取数；写 DataStore / 增量指标 / 事件串行化
+    publish_lock = threading.Lock()
+
+    def load(query: MarketQuery) -> MarketFetchResult:
+        """取数 → 写 DataStore → 增量指标 → 事件；market_ohlcv 与 compute 自动取数共用。"""
+        result = adapter.fetch(query)
+        df = result.df
+
+        with publish_lock:
+            # 存入 DataStore（compute 可消费）
+            for key in (
+                query.exact_key,
+                query.selector_key,
+                query.symbol_key,
+                query.default_selector_key,
+                "_default_ohlcv",
+            ):
+                kernel.data.set(key, df)
+                kernel.data.set(meta_key(key), result.meta())
+
+            # 增量指标：只回放上次之后的新 bar
+            indicator_engine(kernel).ingest(query.normalized_symbol, query.interval, df)
+
+            kernel.emit(
+                f"market.ohlcv.done:{query.normalized_symbol}",
+                {
+                    "symbol": query.normalized_symbol,
+                    "interval": query.interval,
+                    "mode": query.mode,
+                    "source": result.source,
+                },
+            )
+        return result
+
+    kernel.data.set(LOADER_KEY, load)
+
     def market_ohlcv(args: dict) -> dict:
         include_data_in_result = args.get("include_data_in_result", True)
         query = build_market_query(
@@ -48,30 +87,9 @@ def register(kernel: object, adapter: MarketAdapter) -> None:
             start=args.get("start"),
             end=args.get("end"),
         )
-        result = adapter.fetch(query)
+        result = load(query)
         df = result.df
 
-        # 存入 DataStore（compute 可消费）
-        for key in (
-            query.exact_key,
-            query.selector_key,
-            query.symbol_key,
-            query.default_selector_key,
-            "_default_ohlcv",
-        ):
-            kernel.data.set(key, df)
-            kernel.data.set(meta_key(key), result.meta())
-
-        kernel.emit(
-            f"market.ohlcv.done:{query.normalized_symbol}",
-            {
-                "symbol": query.normalized_symbol,
-                "interval": query.interval,
-                "mode": query.mode,
-                "source": result.source,
-            },
-        )
-
         total_rows = len(df)
         records: list[dict] = []
         if include_data_in_result:
@@ -155,4 +173,5 @@ def register(kernel: object, adapter: MarketAdapter) -> None:
             "required": ["symbol"],
         },
         handler=market_ohlcv,
+        parallel_safe=True,
     )
@@ -0,0 +1,3 @@
+from athenaclaw.tools.results.tool import register
+
+__all__ = ["register"]
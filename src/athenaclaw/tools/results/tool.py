@@ -0,0 +1,57 @@
+"""
+[INPUT]: athenaclaw.kernel (ExecutionContext.results / ResultStore)
+[OUTPUT]: register() — 注册 result_get 工具
+[POS]: 大结果句柄的读取端：Kernel 把超限工具结果转存为 res_xxx 句柄后，模型用它按区间 / 按正则取回细节
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+# 一页序列化后（JSON 转义 + handle/offset 等外层字段）要低于 bundle 的 RESULT_INLINE_CHARS（12000），
+# 页面本身才不会超出单条工具消息的内联预算
+DEFAULT_LIMIT = 6000
+MAX_LIMIT = 8000
+
+
+def register(kernel: Any) -> None:
+    """向 Kernel 注册 result_get 工具"""
+
+    def result_get_handler(args: dict) -> dict:
+        store = kernel.execution_context().results
+        if store is None:
+            return {"error": "当前没有可用的结果存储"}
+        handle = str(args.get("handle") or "").strip()
+        if not handle:
+            return {"error": "缺少 handle"}
+        pattern = args.get("pattern")
+        if pattern:
+            return store.search(handle, str(pattern))
+        limit = min(int(args.get("limit") or DEFAULT_LIMIT), MAX_LIMIT)
+        return store.page(handle, offset=int(args.get("offset") or 0), limit=limit)
+
+    kernel.tool(
+        name="result_get",
+        description=(
+            "读取被转存的大工具结果。工具返回 {_offloaded: true, handle: \"res_...\", preview, total_chars} 时，"
+            "完整内容不在上下文里，用本工具按需取回。\n\n"
+            "- 分页：offset（字符偏移，默认 0）+ limit（默认 6000，最大 8000），返回 next_offset 直到读完\n"
+            "- 检索：传 pattern（正则）返回匹配行及行号，适合在长日志 / 大表里定位\n\n"
+            "只取回回答需要的部分，不要整份逐页读完。"
+        ),
+        parameters={
+            "type": "object",
+            "properties": {
+                "handle": {"type": "string", "description": "结果句柄，如 res_0123456789ab"},
+                "offset": {"type": "integer", "description": "起始字符偏移，默认 0"},
+                "limit": {"type": "integer", "description": "读取字符数，默认 6000，最大 8000"},
+                "pattern": {"type": "string", "description": "可选：按正则检索行（传了则忽略 offset/limit）"},
+            },
+            "required": ["handle"],
+        },
+        handler=result_get_handler,
+        parallel_safe=True,
+        offloadable=False,
+    )
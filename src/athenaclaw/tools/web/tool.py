@@ -166,6 +166,7 @@ def register(kernel: object, search_adapter: SearchAdapter | None = None) -> Non
             "required": ["url"],
         },
         handler=web_fetch_handler,
+        parallel_safe=True,
     )
 
     # ── web_search（条件注册）───────────────────────────────────────────
@@ -226,4 +227,5 @@ def register(kernel: object, search_adapter: SearchAdapter | None = None) -> Non
             "required": ["query"],
         },
         handler=web_search_handler,
+        parallel_safe=True,
     )
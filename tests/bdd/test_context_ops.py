@@ -1,12 +1,13 @@
 """
-[INPUT]: pytest-bdd, agent.context_ops, types.SimpleNamespace
-[OUTPUT]: context_ops.feature step definitions（fixture: coctx）
-[POS]: tests/ BDD 测试层，验证上下文管理纯函数：token 估算/上下文统计/对话压缩
+[INPUT]: sys, pytest-bdd, agent.context_ops, types.SimpleNamespace
+[OUTPUT]: context_ops.feature step definitions（fixture: coctx）+ TokenLedger / tiktoken_counter 单测
+[POS]: tests/ BDD 测试层，验证上下文管理纯函数：token 估算/增量账本/上下文统计/对话压缩
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from __future__ import annotations
 
+import sys
 from types import SimpleNamespace
 
 from pytest_bdd import given, parsers, scenario, then, when
@@ -14,9 +15,12 @@ from pytest_bdd import given, parsers, scenario, then, when
 from athenaclaw.llm.context import (
     CompactResult,
     ContextInfo,
+    TokenLedger,
     compact_history,
     context_info,
     estimate_tokens,
+    message_tokens,
+    tiktoken_counter,
 )
 
 
@@ -208,3 +212,82 @@ def then_retained_unchanged(coctx, n):
     result: CompactResult = coctx["compact_result"]
     original = coctx["original_retained"]
     assert result.retained == original
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TokenLedger
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _history(n: int) -> list[dict]:
+    out: list[dict] = []
+    for i in range(n):
+        out.extend(_make_turn(f"用户消息{i}", f"助手回复{i}" * (i + 1)))
+    return out
+
+
+def test_ledger_matches_per_message_estimates_and_tracks_estimate_tokens():
+    history = _history(6)
+    ledger = TokenLedger()
+
+    total = ledger.sync(history)
+
+    assert total == sum(message_tokens(m) for m in history)
+    # 与整段序列化只差列表分隔符
+    assert abs(total - estimate_tokens(history)) <= len(history)
+
+
+def test_ledger_counts_only_appended_messages(monkeypatch):
+    import athenaclaw.llm.context as ctx
+
+    history = _history(3)
+    ledger = TokenLedger()
+    ledger.sync(history)
+    counted: list[dict] = []
+    real = ctx.message_tokens
+    monkeypatch.setattr(ctx, "message_tokens", lambda m, c=None: counted.append(m) or real(m, c))
+
+    history.append({"role": "user", "content": "新问题"})
+    history.append({"role": "assistant", "content": "新回答"})
+    total = ledger.sync(history)
+
+    assert counted == history[-2:]
+    assert total == sum(real(m) for m in history)
+
+    history.pop()
+    counted.clear()
+    assert ledger.sync(history) == sum(real(m) for m in history)
+    assert counted == []
+
+
+def test_ledger_recounts_when_history_is_replaced():
+    history = _history(5)
+    ledger = TokenLedger()
+    ledger.sync(history)
+
+    retained = history[4:]
+    assert ledger.sync(retained) == sum(message_tokens(m) for m in retained)
+    assert ledger.sync([]) == 0
+
+
+def test_ledger_uses_custom_counter():
+    history = _history(2)
+    ledger = TokenLedger()
+    ledger.sync(history)
+
+    assert ledger.sync(history, counter=lambda text: 1) == len(history)
+
+
+def test_tiktoken_counter_falls_back_to_bytes_when_encoding_cannot_load(monkeypatch):
+    calls = []
+
+    def get_encoding(name):
+        calls.append(name)
+        raise OSError("offline: cannot download BPE file")
+
+    monkeypatch.setitem(sys.modules, "tiktoken", SimpleNamespace(get_encoding=get_encoding))
+
+    counter = tiktoken_counter()               # 构造时不加载编码，启动不受网络影响
+    assert counter is not None and calls == []
+    assert counter("x" * 40) == 10
+    assert counter("y" * 8) == 2
+    assert calls == ["cl100k_base"]           # 失败只尝试一次
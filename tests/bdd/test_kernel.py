@@ -219,6 +219,571 @@ def test_stream_complete_preserves_reasoning_content_on_tool_call():
     assert result.assistant_message["tool_calls"][0]["function"]["name"] == "portfolio"
 
 
+def _scripted_provider(*results):
+    provider = MagicMock()
+    provider.complete.side_effect = list(results)
+    return provider
+
+
+def _tool_round(*calls):
+    from athenaclaw.llm.providers import LLMResult, LLMToolCall
+
+    tool_calls = [LLMToolCall(id=f"c{i}", name=name, arguments=json.dumps(args)) for i, (name, args) in enumerate(calls)]
+    message = {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {"id": tc.id, "type": "function", "function": {"name": tc.name, "arguments": tc.arguments}}
+            for tc in tool_calls
+        ],
+    }
+    return LLMResult(assistant_message=message, finish_reason="tool_calls", tool_calls=tool_calls)
+
+
+def _final(text):
+    from athenaclaw.llm.providers import LLMResult
+
+    return LLMResult(assistant_message={"role": "assistant", "content": text}, finish_reason="stop")
+
+
+def test_parallel_safe_tools_run_concurrently_with_ordered_results_and_events():
+    import threading
+    import time
+
+    kernel = Kernel()
+    session = Session()
+    barrier = threading.Barrier(3, timeout=5)
+    threads: set[str] = set()
+
+    def slow(args):
+        threads.add(threading.current_thread().name)
+        barrier.wait()          # 三个调用必须同时在跑，否则超时报错
+        time.sleep(0.01 * (3 - args["i"]))  # 倒序完成，验证结果仍按原顺序
+        return {"i": args["i"]}
+
+    kernel.tool("fetch", "并发安全", {"type": "object", "properties": {}}, slow, parallel_safe=True)
+    events: list[tuple[str, object]] = []
+    kernel.wire("tool.call.*", lambda e, d: events.append((e, d["name"], (d.get("args") or d.get("result"))["i"])))
+    kernel.provider = _scripted_provider(
+        _tool_round(("fetch", {"i": 0}), ("fetch", {"i": 1}), ("fetch", {"i": 2})),
+        _final("ok"),
+    )
+
+    assert kernel.turn("go", session) == "ok"
+
+    tool_msgs = [m for m in session.history if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_msgs] == ["c0", "c1", "c2"]
+    assert [json.loads(m["content"])["i"] for m in tool_msgs] == [0, 1, 2]
+    assert events == [
+        ("tool.call.start", "fetch", 0), ("tool.call.start", "fetch", 1), ("tool.call.start", "fetch", 2),
+        ("tool.call.done", "fetch", 0), ("tool.call.done", "fetch", 1), ("tool.call.done", "fetch", 2),
+    ]
+    assert len(threads) == 3
+
+
+def test_unsafe_tool_is_a_barrier_between_parallel_batches():
+    import threading
+
+    kernel = Kernel()
+    session = Session()
+    log: list[str] = []
+    lock = threading.Lock()
+
+    def safe(args):
+        with lock:
+            log.append(f"safe{args['i']}")
+        return {"ok": True}
+
+    def unsafe(args):
+        with lock:
+            log.append("unsafe")
+        return {"ok": True}
+
+    kernel.tool("safe", "并发安全", {"type": "object", "properties": {}}, safe, parallel_safe=True)
+    kernel.tool("unsafe", "串行", {"type": "object", "properties": {}}, unsafe)
+    started: list[str] = []
+    kernel.wire("tool.call.start", lambda _e, d: started.append(d["name"]))
+    kernel.provider = _scripted_provider(
+        _tool_round(("safe", {"i": 0}), ("safe", {"i": 1}), ("unsafe", {}), ("safe", {"i": 2}), ("missing", {})),
+        _final("ok"),
+    )
+
+    kernel.turn("go", session)
+
+    assert sorted(log[:2]) == ["safe0", "safe1"]
+    assert log[2:] == ["unsafe", "safe2"]
+    assert started == ["safe", "safe", "unsafe", "safe", "missing"]
+    last = json.loads(session.history[-2]["content"])
+    assert last == {"error": "未知工具: missing"}
+
+
+def _tool_delta(index, call_id=None, name=None, arguments=None, finish_reason=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    call = SimpleNamespace(index=index, id=call_id, function=function)
+    delta = SimpleNamespace(content=None, tool_calls=[call])
+    return SimpleNamespace(choices=[SimpleNamespace(finish_reason=finish_reason, delta=delta)])
+
+
+def test_streaming_starts_parallel_safe_tools_before_the_message_finishes():
+    import threading
+
+    kernel = Kernel()
+    session = Session()
+    started = threading.Event()
+    order: list[str] = []
+
+    def fetch(args):
+        order.append(f"fetch{args['i']}")
+        started.set()
+        return {"i": args["i"]}
+
+    def unsafe(_args):
+        order.append("unsafe")
+        return {"ok": True}
+
+    kernel.tool("fetch", "并发安全", {"type": "object", "properties": {}}, fetch, parallel_safe=True)
+    kernel.tool("unsafe", "串行", {"type": "object", "properties": {}}, unsafe)
+    seen_early: list[bool] = []
+    events: list[tuple[str, str]] = []
+    kernel.wire("tool.call.*", lambda e, d: events.append((e, d["name"])))
+
+    def first_stream():
+        yield _tool_delta(0, "c0", "fetch", '{"i": ')
+        yield _tool_delta(0, arguments="0}")
+        seen_early.append(started.wait(5))           # 第一个调用在后续 chunk 之前就已经在跑
+        yield _tool_delta(1, "c1", "unsafe", "{}")
+        yield _tool_delta(2, "c2", "fetch", '{"i": 2}', finish_reason="tool_calls")
+
+    class _Client:
+        def __init__(self) -> None:
+            self.chat = self
+            self.completions = self
+            self.streams = iter([first_stream(), iter([SimpleNamespace(choices=[SimpleNamespace(
+                finish_reason="stop", delta=SimpleNamespace(content="ok", tool_calls=None),
+            )])])])
+
+        def create(self, **_kwargs):
+            return next(self.streams)
+
+    kernel.client = _Client()
+    kernel.stream = True
+
+    assert kernel.turn("go", session) == "ok"
+
+    assert seen_early == [True]
+    assert order == ["fetch0", "unsafe", "fetch2"]      # 屏障之后的 safe 调用不会被提前启动
+    assert [json.loads(m["content"]) for m in session.history if m["role"] == "tool"] == [
+        {"i": 0}, {"ok": True}, {"i": 2},
+    ]
+    assert events == [
+        ("tool.call.start", "fetch"),
+        ("tool.call.done", "fetch"),
+        ("tool.call.start", "unsafe"), ("tool.call.done", "unsafe"),
+        ("tool.call.start", "fetch"), ("tool.call.done", "fetch"),
+    ]
+
+
+class _AsyncScriptedProvider:
+    """只有 acomplete 的 provider：同步 complete 被调用即视为走错路径。"""
+
+    def __init__(self, *results, gate=None):
+        self.results = list(results)
+        self.gate = gate
+        self.calls = 0
+
+    def complete(self, **_kwargs):
+        raise AssertionError("aturn 不应走同步 complete")
+
+    async def acomplete(self, **_kwargs):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return self.results.pop(0)
+
+
+def test_aturn_runs_async_and_sync_tools_on_one_event_loop():
+    import asyncio
+    import threading
+
+    kernel = Kernel()
+    loop_threads: list[bool] = []
+
+    async def quote(args):
+        loop_threads.append(threading.current_thread() is threading.main_thread())
+        await asyncio.sleep(0)
+        return {"px": args["i"]}
+
+    def note(_args):
+        loop_threads.append(threading.current_thread() is threading.main_thread())
+        return {"ok": True}
+
+    kernel.tool("quote", "异步工具", {"type": "object", "properties": {}}, quote, parallel_safe=True)
+    kernel.tool("note", "同步工具", {"type": "object", "properties": {}}, note)
+    kernel.provider = _AsyncScriptedProvider(
+        _tool_round(("quote", {"i": 1}), ("quote", {"i": 2}), ("note", {})),
+        _final("done"),
+    )
+
+    async def main():
+        sessions = [Session(), Session()]
+        kernels = [kernel, Kernel()]
+        kernels[1].provider = _AsyncScriptedProvider(_final("other"))
+        return await asyncio.gather(*(k.aturn("go", s) for k, s in zip(kernels, sessions))), sessions
+
+    replies, sessions = asyncio.run(main())
+
+    assert replies == ["done", "other"]
+    assert [json.loads(m["content"]) for m in sessions[0].history if m["role"] == "tool"] == [
+        {"px": 1}, {"px": 2}, {"ok": True},
+    ]
+    assert loop_threads == [True, True, False]      # async handler 在循环线程，同步 handler 在工作线程
+
+
+def test_aturn_cancellation_rolls_back_the_partial_turn():
+    import asyncio
+
+    kernel = Kernel()
+    session = Session()
+    session.history = [{"role": "user", "content": "old"}, {"role": "assistant", "content": "ok"}]
+    cancelled: list[dict] = []
+    kernel.wire("turn.cancelled", lambda _e, d: cancelled.append(d))
+
+    async def main():
+        kernel.provider = _AsyncScriptedProvider(_final("never"), gate=asyncio.Event())
+        task = asyncio.create_task(kernel.aturn("slow", session))
+        while kernel.provider.calls == 0:
+            await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main()) is True
+    assert session.history == [{"role": "user", "content": "old"}, {"role": "assistant", "content": "ok"}]
+    assert cancelled == [{"input": "slow"}]
+
+
+def test_aturn_cancellation_after_compaction_restores_history_and_summary():
+    import asyncio
+
+    class _Provider(_AsyncScriptedProvider):
+        def complete(self, **_kwargs):              # compact_history 的摘要请求（工作线程）
+            return _final("压缩摘要")
+
+    kernel = Kernel(context_window=200, compact_recent_turns=1)
+    session = Session()
+    for i in range(10):
+        session.history += [{"role": "user", "content": f"msg{i} " * 50}, {"role": "assistant", "content": f"r{i}"}]
+    original, before = session.history, list(session.history)
+    events: list[str] = []
+    kernel.wire("context.compacted", lambda e, _d: events.append(e))
+
+    async def main():
+        kernel.provider = _Provider(_final("never"), gate=asyncio.Event())
+        task = asyncio.create_task(kernel.aturn("slow", session))
+        while kernel.provider.calls == 0:
+            await asyncio.sleep(0)
+        assert session.summary == "压缩摘要" and len(session.history) < len(before)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main()) is True
+    assert events == ["context.compacted"]
+    assert session.history is original and session.history == before
+    assert session.summary is None
+
+
+def test_openai_provider_acomplete_uses_async_client_and_drops_it_when_client_is_replaced():
+    import asyncio
+
+    from athenaclaw.llm.providers import OpenAIChatProvider
+
+    class _AsyncClient:
+        def __init__(self) -> None:
+            self.chat = self
+            self.completions = self
+
+        async def create(self, **kwargs):
+            message = SimpleNamespace(role="assistant", content=f"hi {kwargs['model']}", tool_calls=None)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=message, finish_reason="stop")],
+                usage=SimpleNamespace(total_tokens=3, prompt_tokens=2, prompt_tokens_details=None),
+            )
+
+    provider = OpenAIChatProvider(client=MagicMock(), async_client=_AsyncClient())
+    result = asyncio.run(provider.acomplete(model="m", messages=[{"role": "user", "content": "x"}]))
+    assert result.assistant_message["content"] == "hi m" and result.usage_total_tokens == 3
+
+    provider.client = MagicMock()
+    assert provider.async_client is None
+
+
+def test_background_precompaction_is_swapped_in_at_the_next_turn_without_blocking():
+    import threading
+
+    from athenaclaw.llm.context import _COMPRESS_PROMPT
+    from athenaclaw.llm.providers import LLMResult
+
+    gate = threading.Event()
+    requests: list[list[dict]] = []
+
+    class _Provider:
+        def complete(self, *, model, messages, tools=None, temperature=None):
+            if messages[0]["content"] == _COMPRESS_PROMPT:
+                gate.wait(5)
+                return LLMResult(assistant_message={"role": "assistant", "content": "早前聊过 BTC"}, finish_reason="stop")
+            requests.append(messages)
+            return LLMResult(assistant_message={"role": "assistant", "content": f"r{len(requests)}"}, finish_reason="stop")
+
+    kernel = Kernel(provider=_Provider(), compact_recent_turns=1)
+    kernel.precompact_ratio = 0.0001
+    events: list[tuple[str, dict]] = []
+    kernel.wire("context.*", lambda e, d: events.append((e, d)))
+    session = Session()
+    session.history = [{"role": "user", "content": "零"}, {"role": "assistant", "content": "r0"}]
+
+    assert kernel.turn("一", session) == "r1"
+    assert session.pending_compaction is not None
+    assert kernel.turn("二", session) == "r2"          # 摘要还卡在后台，本轮不等它
+    assert session.summary is None
+
+    gate.set()
+    session.pending_compaction[0].result(timeout=5)
+    assert kernel.turn("三", session) == "r3"
+
+    compacted = [d for e, d in events if e == "context.compacted"]
+    assert [d["trigger"] for d in compacted] == ["background"]
+    # 快照 = 前两轮 4 条消息；第二轮的 2 条在快照之后追加，不算进 before/retained
+    assert compacted[0]["messages_before"] == compacted[0]["messages_compressed"] + compacted[0]["messages_retained"]
+    assert compacted[0]["messages_after"] == compacted[0]["messages_retained"]
+    assert compacted[0]["messages_appended"] == 2
+    assert session.summary == "早前聊过 BTC"
+    assert requests[-1][0]["content"].endswith("早前聊过 BTC")
+    users = [str(m["content"]) for m in session.history if m["role"] == "user"]
+    assert len(users) == 3 and "一" in users[0] and "二" in users[1] and "三" in users[2]
+
+    workers = [t for t in threading.enumerate() if t.name.startswith("precompact")]
+    assert workers
+    kernel.close()
+    for thread in workers:
+        thread.join(5)
+    assert not any(t.is_alive() for t in workers)        # 预压缩线程随 kernel.close 退出，不随 bundle 累积
+
+
+def test_compaction_threshold_counts_prefix_with_the_kernel_token_counter():
+    counted: list[str] = []
+
+    def counter(text: str) -> int:
+        counted.append(text)
+        return len(text) // 100
+
+    kernel = Kernel(context_window=1000)
+    kernel._system_prompt = "系统" * 2000               # 字节 // 4 ≈ 3000 token，远超窗口；按 counter 只有 40
+    kernel.token_counter = counter
+    kernel.provider = SimpleNamespace(complete=lambda **_kw: _final("ok"))
+    events: list[str] = []
+    kernel.wire("context.*", lambda e, _d: events.append(e))
+    session = Session()
+
+    assert kernel.turn("hi", session) == "ok"
+
+    assert events == []                                 # 前缀与 history 同口径：不会被字节估算误触发压缩
+    assert sum(kernel._system_prompt in text for text in counted) == 1   # 前缀计数按内容缓存，本轮只数一次
+
+
+def test_request_prefix_is_byte_stable_across_summary_and_tool_registration_order():
+    from athenaclaw.llm.providers import LLMResult
+
+    def _noop(_args):
+        return {}
+
+    kernel = Kernel()
+    kernel._system_prompt = "SOUL"
+    kernel.tool("zeta", "z", {"type": "object", "properties": {}}, _noop)
+    kernel.tool("alpha", "a", {"type": "object", "properties": {}}, _noop)
+    kernel.provider = MagicMock()
+    kernel.provider.complete.return_value = LLMResult(
+        assistant_message={"role": "assistant", "content": "ok"},
+        finish_reason="stop",
+        usage_total_tokens=120,
+        usage_prompt_tokens=100,
+        usage_cached_tokens=64,
+    )
+    done: list[dict] = []
+    kernel.wire("llm.call.done", lambda _e, d: done.append(d))
+
+    session = Session()
+    kernel.turn("一", session)
+    session.summary = "之前聊过 BTC"
+    kernel.turn("二", session)
+
+    first, second = (c.kwargs for c in kernel.provider.complete.call_args_list)
+    assert [t["function"]["name"] for t in first["tools"]] == ["alpha", "zeta"]
+    assert json.dumps(first["tools"]) == json.dumps(second["tools"])
+    assert first["messages"][0] == second["messages"][0] == {"role": "system", "content": "SOUL"}
+    assert second["messages"][1]["role"] == "system"
+    assert second["messages"][1]["content"].endswith("之前聊过 BTC")
+    assert done[-1]["cached_tokens"] == 64 and done[-1]["prompt_tokens"] == 100
+
+
+def test_large_tool_results_are_offloaded_to_handles_and_paged_back():
+    from athenaclaw.tools import results
+
+    kernel = Kernel()
+    kernel.result_inline_chars = 500
+    results.register(kernel)
+    rows = [{"i": i, "close": 100.0 + i} for i in range(400)]
+    kernel.tool("table", "大表", {"type": "object", "properties": {}}, lambda _args: {"rows": rows})
+    kernel.tool("small", "小结果", {"type": "object", "properties": {}}, lambda _args: {"ok": True})
+    offloaded: list[dict] = []
+    kernel.wire("context.offloaded", lambda _e, d: offloaded.append(d))
+
+    session = Session()
+    kernel.provider = _scripted_provider(_tool_round(("table", {}), ("small", {})), _final("done"))
+    kernel.turn("拉数据", session)
+
+    big, small = [m for m in session.history if m["role"] == "tool"]
+    stub = json.loads(big["content"])
+    assert stub["_offloaded"] is True and stub["source"] == "table" and stub["keys"] == ["rows"]
+    assert len(big["content"]) < 2000 < stub["total_chars"]
+    assert json.loads(small["content"]) == {"ok": True}
+    assert offloaded[0]["handle"] == stub["handle"]
+
+    handle = stub["handle"]
+    kernel.provider = _scripted_provider(
+        _tool_round(("result_get", {"handle": handle, "offset": 0, "limit": 300})),
+        _tool_round(("result_get", {"handle": handle, "pattern": '"i": 399'})),
+        _final("ok"),
+    )
+    kernel.turn("看细节", session)
+
+    page, found = [json.loads(m["content"]) for m in session.history[-4:] if m["role"] == "tool"]
+    assert page["content"].startswith('{\n "rows"') and page["next_offset"] == 300
+    assert found["match_count"] == 1 and found["matches"][0].endswith('"i": 399,')
+
+
+def test_offloaded_non_ascii_result_can_be_paged_back_in_full():
+    from athenaclaw.runtime.bundle import RESULT_INLINE_CHARS
+    from athenaclaw.tools import results
+    from athenaclaw.tools.results.tool import MAX_LIMIT
+
+    kernel = Kernel()
+    kernel.result_inline_chars = RESULT_INLINE_CHARS
+    results.register(kernel)
+    report = "\n".join(f"第{i}行：贵州茅台 收盘价 “{1500 + i}” 元，成交量放大" for i in range(2000))
+    kernel.tool("report", "长文本", {"type": "object", "properties": {}}, lambda _args: report)
+
+    session = Session()
+    kernel.provider = _scripted_provider(_tool_round(("report", {})), _final("done"))
+    kernel.turn("拉研报", session)
+    stub = json.loads(session.history[-2]["content"])
+    assert stub["_offloaded"] is True
+
+    pages: list[str] = []
+    offset = 0
+    while offset is not None:
+        kernel.provider = _scripted_provider(
+            _tool_round(("result_get", {"handle": stub["handle"], "offset": offset, "limit": MAX_LIMIT})),
+            _final("ok"),
+        )
+        kernel.turn("继续读", session)
+        content = session.history[-2]["content"]
+        assert len(content) <= RESULT_INLINE_CHARS        # 整页内联，不会被再次转存成新句柄
+        page = json.loads(content)
+        pages.append(page["content"])
+        offset = page.get("next_offset")
+
+    assert "".join(pages) == report
+
+
+def test_offloaded_results_survive_session_reload_and_are_pruned_with_history(tmp_path):
+    from athenaclaw.runtime.session_store import JsonSessionStore
+
+    store = JsonSessionStore(tmp_path / "s.json")
+    session = Session()
+    kept, _ = session.results.put({"rows": list(range(50))})
+    dropped, _ = session.results.put("old log")
+    session.history = [
+        {"role": "user", "content": "x"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "c0", "type": "function", "function": {"name": "t", "arguments": "{}"}},
+        ]},
+        {"role": "tool", "tool_call_id": "c0", "content": json.dumps({"_offloaded": True, "handle": kept})},
+    ]
+    store.save(session)
+
+    loaded = store.load()
+    assert kept in loaded.results and dropped not in loaded.results
+    assert json.loads(loaded.results.get(kept)) == {"rows": list(range(50))}
+
+
+def test_usage_fields_reads_openai_and_deepseek_cache_hits():
+    from types import SimpleNamespace
+
+    from athenaclaw.llm.providers import usage_fields
+
+    openai_usage = SimpleNamespace(
+        total_tokens=10, prompt_tokens=8, prompt_tokens_details=SimpleNamespace(cached_tokens=6),
+    )
+    deepseek_usage = SimpleNamespace(
+        total_tokens=10, prompt_tokens=8, prompt_tokens_details=None, model_extra={"prompt_cache_hit_tokens": 5},
+    )
+
+    assert usage_fields(openai_usage)["usage_cached_tokens"] == 6
+    assert usage_fields(deepseek_usage)["usage_cached_tokens"] == 5
+    assert usage_fields(None) == {"usage_total_tokens": 0, "usage_prompt_tokens": 0, "usage_cached_tokens": 0}
+
+
+def test_streaming_requests_usage_chunk_and_records_cached_tokens():
+    from types import SimpleNamespace
+
+    usage = SimpleNamespace(total_tokens=120, prompt_tokens=100, prompt_tokens_details=SimpleNamespace(cached_tokens=64))
+
+    class _Rejected(Exception):
+        status_code = 400
+
+    class _Client:
+        def __init__(self, reject: bool) -> None:
+            self.chat = self
+            self.completions = self
+            self.reject = reject
+            self.calls: list[dict] = []
+
+        def create(self, **kwargs):
+            self.calls.append(kwargs)
+            if self.reject and "stream_options" in kwargs:
+                raise _Rejected("unknown field: stream_options")
+            return iter([
+                SimpleNamespace(usage=None, choices=[SimpleNamespace(
+                    finish_reason="stop", delta=SimpleNamespace(content="ok", tool_calls=None),
+                )]),
+                SimpleNamespace(usage=usage, choices=[]),       # include_usage 时末尾 chunk 只带 usage
+            ])
+
+    kernel = Kernel()
+    kernel.client = _Client(reject=False)
+    kernel.stream = True
+    done: list[dict] = []
+    kernel.wire("llm.call.done", lambda _e, d: done.append(d))
+
+    assert kernel.turn("hi", Session()) == "ok"
+    assert kernel.client.calls[0]["stream_options"] == {"include_usage": True}
+    assert done[-1]["cached_tokens"] == 64 and done[-1]["prompt_tokens"] == 100
+
+    # provider 不认 stream_options：去掉参数重发，之后的请求不再带
+    kernel.client = _Client(reject=True)
+    assert kernel.turn("hi", Session()) == "ok"
+    assert kernel.turn("hi", Session()) == "ok"
+    assert ["stream_options" in c for c in kernel.client.calls] == [True, False, False]
+    assert kernel.stream_usage is False
+
+
 @given("一个注册了 echo 工具的 Kernel", target_fixture="kctx")
 def given_kernel_with_echo(kctx):
     kernel = Kernel()
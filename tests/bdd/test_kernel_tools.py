@@ -1,5 +1,5 @@
 """
-[INPUT]: pytest-bdd, athenaclaw.kernel, athenaclaw.tools, athenaclaw.integrations.market.csv
+[INPUT]: pathlib, pytest-bdd, athenaclaw.kernel, athenaclaw.tools, athenaclaw.skills.discovery, athenaclaw.integrations.market.csv
 [OUTPUT]: kernel_tools.feature step definitions（直接调用工具 handler）
 [POS]: tests/ BDD 测试层，验证 Kernel 工具/权限/Session/自举
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
@@ -7,11 +7,15 @@
 
 from __future__ import annotations
 
+from pathlib import Path
+
 import pandas as pd
+import pytest
 from pytest_bdd import given, parsers, scenario, then, when
 
 from athenaclaw.integrations.market.csv import CsvAdapter
 from athenaclaw.kernel import Kernel, Permission, Session
+from athenaclaw.skills.discovery import load_skills
 from athenaclaw.tools import compute, edit, market, portfolio, read, watchlist, write
 
 
@@ -149,6 +153,235 @@ def test_compute_schema_explains_series_and_market_handoff():
     assert "不要写 close[-1]/date[-1]" in desc
     assert "多个 symbol/interval/mode/start/end 组合" in desc
     assert "date 在分钟数据中会包含时分秒" in desc
+    # 详细用法放在按需加载的 compute skill，工具描述保持短小、每轮请求都便宜
+    assert "compute skill" in desc and len(desc) < 2000
+    skills, _ = load_skills([(Path(__file__).resolve().parents[2] / ".agents" / "skills", "project")])
+    assert "rolling_zscore" in skills["compute"].file_path.read_text(encoding="utf-8")
+
+
+def test_compute_reads_incremental_indicator_snapshot():
+    kernel = given_kernel_with_market()["kernel"]
+    kernel._tools["market_ohlcv"].handler({"symbol": "TEST", "interval": "1d", "mode": "history"})
+
+    result = kernel._tools["compute"].handler({
+        "code": "{'close': live['close'], 'bars': live['bars'], 'ema': live['ema_20']}",
+        "symbol": "TEST",
+        "interval": "1d",
+        "mode": "history",
+    })
+
+    assert result["result"]["close"] == 13.0
+    assert result["result"]["bars"] == 5
+    assert result["result"]["ema"] == pytest.approx(
+        _sample_daily_df()["close"].ewm(span=20, adjust=False).mean().iloc[-1]
+    )
+
+
+def test_compute_symbols_injects_aligned_panel():
+    kernel = Kernel(api_key="test")
+    other = _sample_daily_df().iloc[1:].reset_index(drop=True)
+    other["close"] = other["close"] * 2
+    adapter = CsvAdapter({
+        "TEST": {("1d", "history"): _sample_daily_df()},
+        "PEER": {("1d", "history"): other},
+    })
+    market.register(kernel, adapter)
+    compute.register(kernel)
+    for sym in ("TEST", "PEER"):
+        kernel._tools["market_ohlcv"].handler({"symbol": sym, "interval": "1d", "include_data_in_result": False})
+
+    result = kernel._tools["compute"].handler({
+        "code": "{'cols': list(closes.columns), 'rows': len(closes), 'df_rows': len(df), "
+                "'ratio': float((closes['PEER'] / closes['TEST']).iloc[-1]), 'peer_live': live['PEER']['close']}",
+        "symbols": ["TEST", "PEER"],
+        "interval": "1d",
+    })
+
+    assert result["result"] == {"cols": ["TEST", "PEER"], "rows": 4, "df_rows": 4, "ratio": 2.0, "peer_live": 26.0}
+
+    outer = kernel._tools["compute"].handler({
+        "code": "len(closes)", "symbols": ["TEST", "PEER"], "interval": "1d", "align": "outer",
+    })
+    assert outer["result"] == 5
+
+    missing = kernel._tools["compute"].handler({"code": "1", "symbols": ["TEST", "NOPE"], "interval": "1d"})
+    assert "NOPE" in missing["error"]
+
+
+def test_compute_sweep_ranks_parameter_grid():
+    kernel = given_kernel_with_market()["kernel"]
+    kernel._tools["market_ohlcv"].handler({"symbol": "TEST", "interval": "1d", "include_data_in_result": False})
+
+    result = kernel._tools["compute_sweep"].handler({
+        "code": "m = close.rolling(n).mean()",
+        "grid": {"n": [1, 2, 3]},
+        "score": "latest(m)",
+        "symbol": "TEST",
+        "interval": "1d",
+    })
+
+    assert result["best"] == {"params": {"n": 1}, "score": 13.0}
+    assert [row["n"] for row in result["top"]] == [1, 2, 3]
+
+    missing = kernel._tools["compute_sweep"].handler({"code": "1", "grid": {"n": [1]}, "symbol": "NOPE"})
+    assert "error" in missing
+
+
+def test_compute_robustness_bootstraps_captured_returns():
+    kernel = given_kernel_with_market()["kernel"]
+    kernel._tools["market_ohlcv"].handler({"symbol": "TEST", "interval": "1d", "include_data_in_result": False})
+
+    result = kernel._tools["compute_robustness"].handler({
+        "method": "bootstrap",
+        "returns": "close.pct_change()",
+        "n": 200,
+        "block": 2,
+        "seed": 7,
+        "symbol": "TEST",
+        "interval": "1d",
+    })
+
+    assert result["method"] == "bootstrap"
+    assert result["resamples"] == 200
+    assert result["observed"]["total_return"] == pytest.approx(13.0 / 10.5 - 1)
+
+    bad = kernel._tools["compute_robustness"].handler({"method": "walk_forward", "symbol": "TEST"})
+    assert "error" in bad
+
+
+def test_compute_map_fans_out_across_symbols():
+    kernel = Kernel(api_key="test")
+    peer = _sample_daily_df()
+    peer["close"] = peer["close"] * 2
+    adapter = CsvAdapter({
+        "TEST": {("1d", "history"): _sample_daily_df()},
+        "PEER": {("1d", "history"): peer},
+    })
+    market.register(kernel, adapter)
+    compute.register(kernel)
+    for sym in ("TEST", "PEER"):
+        kernel._tools["market_ohlcv"].handler({"symbol": sym, "interval": "1d", "include_data_in_result": False})
+
+    result = kernel._tools["compute_map"].handler({
+        "code": "{'close': latest(close), 'live_close': live['close']}",
+        "symbols": ["TEST", "PEER", "NOPE"],
+        "interval": "1d",
+        "sort_by": "close",
+    })
+
+    assert [row["symbol"] for row in result["rows"]] == ["PEER", "TEST"]
+    assert result["rows"][0] == {"symbol": "PEER", "close": 26.0, "live_close": 26.0}
+    assert result["failed"] == 1
+    assert result["errors"][0]["symbol"] == "NOPE"
+
+
+def test_compute_scope_keeps_variables_until_cleared():
+    kernel = Kernel(api_key="test")
+    adapter = CsvAdapter({"TEST": {("1d", "history"): _sample_daily_df()}})
+    market.register(kernel, adapter)
+    compute.register(kernel)
+    kernel._tools["market_ohlcv"].handler({"symbol": "TEST", "interval": "1d", "include_data_in_result": False})
+    handler = kernel._tools["compute"].handler
+    selector = {"symbol": "TEST", "interval": "1d"}
+
+    first = handler({**selector, "code": "base = latest(close)", "scope": "chat"})
+    handler({**selector, "code": "step = 2", "scope": "turn"})
+    reused = handler({**selector, "code": "base + step", "scope": "turn"})
+
+    assert first["_scope"]["saved"] == ["base"]
+    assert reused["result"] == 15.0
+    assert "error" in handler({**selector, "code": "base"})
+
+    kernel.emit("turn.start", {})
+    assert "error" in handler({**selector, "code": "step", "scope": "turn"})
+    assert handler({**selector, "code": "base", "scope": "chat"})["result"] == 13.0
+
+    kernel.emit("context.compacted", {})
+    assert "error" in handler({**selector, "code": "base", "scope": "chat"})
+
+
+def test_compute_emits_profile_and_turn_report():
+    kernel = Kernel(api_key="test")
+    adapter = CsvAdapter({"TEST": {("1d", "history"): _sample_daily_df()}})
+    market.register(kernel, adapter)
+    compute.register(kernel)
+    kernel._tools["market_ohlcv"].handler({"symbol": "TEST", "interval": "1d", "include_data_in_result": False})
+    events: list[tuple[str, dict]] = []
+    kernel.wire("compute.*", lambda e, d: events.append((e, d)))
+
+    for _ in range(2):
+        kernel._tools["compute"].handler({"code": "latest(close)", "symbol": "TEST", "interval": "1d"})
+    kernel.emit("turn.done", {})
+
+    profiles = [d for e, d in events if e == "compute.profile"]
+    assert len(profiles) == 2
+    assert profiles[0]["bars"] == len(_sample_daily_df())
+    assert set(profiles[0]["phases_ms"]) == {"inject", "validate", "execute", "serialize"}
+    report = [d for e, d in events if e == "compute.report"]
+    assert report[0]["snippets"][0]["calls"] == 2
+    assert report[0]["snippets"][0]["code_hash"] == profiles[0]["code_hash"]
+
+
+def test_compute_auto_fetches_missing_symbol():
+    kernel = given_kernel_with_spy_market()
+    call_log = kernel["call_log"]
+    kernel = kernel["kernel"]
+    compute.register(kernel)
+
+    result = kernel._tools["compute"].handler({"code": "latest(close)", "symbol": "TEST", "interval": "1d"})
+
+    assert result["result"] == 13.0
+    assert call_log == [{"symbol": "TEST", "interval": "1d", "mode": "history", "start": None, "end": None}]
+    assert result["_resolved"][0]["source"] == "spy"
+    assert result["_resolved"][0]["rows"] == 5
+    assert kernel.data.get("ohlcv:TEST:1d:history") is not None
+
+    again = kernel._tools["compute"].handler({"code": "latest(close)", "symbol": "TEST", "interval": "1d"})
+    assert again["result"] == 13.0
+    assert "_resolved" not in again
+    assert len(call_log) == 1
+
+
+def test_compute_map_resolves_symbols_and_data_keys():
+    ctx = given_kernel_with_spy_market()
+    kernel, call_log = ctx["kernel"], ctx["call_log"]
+    compute.register(kernel)
+
+    result = kernel._tools["compute_map"].handler({
+        "code": "latest(close)",
+        "symbols": ["AAA"],
+        "keys": ["ohlcv:BBB:1d:history:20240101:20240105", "not-a-market-key"],
+    })
+
+    assert {row["symbol"] for row in result["rows"]} == {"AAA", "ohlcv:BBB:1d:history:20240101:20240105"}
+    assert [c["symbol"] for c in call_log] == ["AAA", "BBB"]
+    assert call_log[1]["start"] == "2024-01-01" and call_log[1]["end"] == "2024-01-05"
+    assert [r["symbol"] for r in result["_resolved"]] == ["AAA", "BBB"]
+    assert result["errors"] == [{"symbol": "not-a-market-key", "error": "DataStore 中没有该 key 的 DataFrame"}]
+
+
+def test_compute_auto_fetch_failure_is_reported():
+    kernel = given_kernel_with_cross_symbol_market()["kernel"]
+
+    result = kernel._tools["compute"].handler({"code": "len(df)", "symbol": "MISSING"})
+
+    assert "未找到对应 OHLCV" in result["error"]
+    assert "数据中无 symbol" in result["_resolved"][0]["error"]
+
+
+def test_parse_data_key_round_trips_market_query_keys():
+    from athenaclaw.tools.market.schema import build_market_query, parse_data_key
+
+    query = build_market_query(symbol="600519.SS", interval="5m", start="2024-01-02 09:30:00", end="2024-01-02 15:00:00")
+    assert parse_data_key(query.exact_key) == {
+        "symbol": "600519.SH", "interval": "5m", "mode": "history",
+        "start": "2024-01-02 09:30:00", "end": "2024-01-02 15:00:00",
+    }
+    open_ended = build_market_query(symbol="AAPL", start="2024-01-02")
+    assert parse_data_key(open_ended.exact_key)["end"] is None
+    assert parse_data_key("ohlcv:AAPL")["interval"] is None
+    assert parse_data_key("_default_ohlcv") is None
+    assert parse_data_key("meta:ohlcv:AAPL") is None
 
 
 def test_market_schema_explains_compute_handoff():
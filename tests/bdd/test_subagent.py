@@ -730,6 +730,7 @@ def test_wire_trace_captures_subagent_events(tmp_path):
 
     _wire_trace(kernel, trace_path)
     kernel.emit("subagent.start", {"name": "helper", "run_id": "run-1"})
+    assert kernel.flush_events()
 
     content = trace_path.read_text(encoding="utf-8")
     assert '"event": "subagent.start"' in content
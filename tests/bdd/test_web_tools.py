@@ -55,7 +55,7 @@ class _MockKernel:
     def __init__(self):
         self._tools: dict = {}
 
-    def tool(self, name: str, description: str, parameters: dict, handler) -> None:
+    def tool(self, name: str, description: str, parameters: dict, handler, **_options) -> None:
         self._tools[name] = handler
 
     def call(self, name: str, args: dict) -> dict:
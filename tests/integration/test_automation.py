@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 
 import pandas as pd
+import pytest
 
 from athenaclaw.automation import delivery as delivery_module
 from athenaclaw.tools.market.schema import build_market_query, make_fetch_result
@@ -14,6 +16,7 @@ from athenaclaw.automation.models import (
     TriggerEvent,
     TaskDefinition,
     parse_task_definition,
+    parse_trigger,
     utc_now_iso,
 )
 from athenaclaw.automation.policy import AutomationToolPolicy
@@ -847,6 +850,72 @@ def test_price_threshold_worker_crosses_once_per_rearm_cycle(tmp_path):
     assert runtime.last_side == "above"
 
 
+class _WarmupMarketAdapter:
+    name = "warm"
+
+    def __init__(self, history: pd.DataFrame, latest: list[tuple[float, datetime]]) -> None:
+        self._history = history
+        self._latest = list(latest)
+        self.modes: list[str] = []
+
+    def fetch(self, query):
+        self.modes.append(query.mode)
+        if query.mode == "history":
+            return make_fetch_result(df=self._history, query=query, source=self.name, timezone=query.timezone)
+        price, as_of = self._latest.pop(0)
+        return _SequenceMarketAdapter([(price, as_of)]).fetch(query)
+
+
+def test_price_threshold_worker_fires_on_streaming_indicator_field(tmp_path):
+    store = AutomationStore(workspace=tmp_path / "workspace", state=tmp_path / "state")
+    task = _price_task(threshold=100.5)
+    task = replace(task, trigger=replace(task.trigger, field="ema_20"))
+    store.save_task(task)
+
+    base = datetime(2026, 3, 12, 1, 0, tzinfo=timezone.utc)
+    history = pd.DataFrame({
+        "date": pd.date_range(base.replace(tzinfo=None) - timedelta(minutes=30), periods=30, freq="1min"),
+        "open": [100.0] * 30,
+        "high": [100.0] * 30,
+        "low": [100.0] * 30,
+        "close": [100.0] * 30,
+        "volume": [100] * 30,
+    })
+    adapter = _WarmupMarketAdapter(history, [(100.0, base), (110.0, base + timedelta(seconds=61))])
+    executor = _RecordingExecutor()
+    worker = AutomationWorker(
+        config=None,  # type: ignore[arg-type]
+        store=store,
+        market_adapter=adapter,
+        executor=executor,
+    )
+
+    for offset in (0, 61):
+        asyncio.run(worker.tick(base + timedelta(seconds=offset)))
+
+    # 只预热一次 history，之后只取 latest
+    assert adapter.modes == ["history", "latest", "latest"]
+    assert len(executor.events) == 1
+    payload = executor.events[0].payload
+    assert payload["field"] == "ema_20"
+    assert payload["current_price"] == 110.0
+    assert payload["current_value"] == pytest.approx(100.0 + 10.0 * 2 / 21)
+    assert payload["indicators"]["bars"] == 32
+
+
+def test_price_threshold_trigger_rejects_unknown_field():
+    with pytest.raises(ValueError, match="field"):
+        parse_trigger({
+            "type": "price_threshold",
+            "symbol": "AAPL",
+            "interval": "1m",
+            "condition": "cross_above",
+            "threshold": 70,
+            "poll_sec": 60,
+            "field": "rsi_99",
+        })
+
+
 def test_worker_skips_cron_misfire_beyond_grace(tmp_path):
     workspace = tmp_path / "workspace"
     state = tmp_path / "state"
@@ -892,3 +961,48 @@ def test_worker_skips_cron_misfire_beyond_grace(tmp_path):
     updated = store.load_runtime_state(task.id)
     assert updated.next_fire_at is not None
     assert updated.next_fire_at > "2026-03-12T00:05:00+00:00"
+
+
+def test_price_threshold_worker_backfills_bars_missed_between_polls(tmp_path):
+    store = AutomationStore(workspace=tmp_path / "workspace", state=tmp_path / "state")
+    task = _price_task(threshold=1000.0)
+    task = replace(task, trigger=replace(task.trigger, field="ema_20"))
+    store.save_task(task)
+
+    base = datetime(2026, 3, 12, 1, 0, tzinfo=timezone.utc)
+    naive = base.replace(tzinfo=None)
+    bars = pd.DataFrame({
+        "date": pd.date_range(naive - timedelta(minutes=30), periods=34, freq="1min"),
+        "open": [100.0] * 34,
+        "high": [100.0] * 34,
+        "low": [100.0] * 34,
+        "close": [100.0] * 30 + [101.0, 102.0, 103.0, 104.0],
+        "volume": [100] * 34,
+    })
+
+    class _GapAdapter(_WarmupMarketAdapter):
+        def fetch(self, query):
+            # 第二次 history 请求时，上游已经有了两次 poll 之间的 bar
+            if query.mode == "history" and "history" in self.modes:
+                self._history = bars
+            return super().fetch(query)
+
+    adapter = _GapAdapter(bars.iloc[:30], [(101.0, base), (104.0, base + timedelta(minutes=3))])
+    worker = AutomationWorker(
+        config=None,  # type: ignore[arg-type]
+        store=store,
+        market_adapter=adapter,
+        executor=_RecordingExecutor(),
+    )
+
+    asyncio.run(worker.tick(base))
+    asyncio.run(worker.tick(base + timedelta(minutes=3)))
+
+    assert adapter.modes == ["history", "latest", "latest", "history"]
+    snap = worker._indicators.snapshot("AAPL", "1m")
+    assert snap["bars"] == 34
+    alpha = 2 / 21
+    expected = 100.0
+    for close in (101.0, 102.0, 103.0, 104.0):
+        expected += alpha * (close - expected)
+    assert snap["ema_20"] == pytest.approx(expected)
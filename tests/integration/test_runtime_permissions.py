@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import importlib
 import sys
-from types import ModuleType
+from types import ModuleType, SimpleNamespace
 
 
 def test_build_kernel_bundle_allows_soul_growth_edits(tmp_path, monkeypatch):
@@ -160,3 +160,39 @@ def test_build_kernel_bundle_registers_trade_tools_and_trade_guide(tmp_path, mon
     assert "trade_plan" in bundle.kernel._tools
     assert "trade_apply" in bundle.kernel._tools
     assert "<trade_tools>" in (bundle.kernel._system_prompt or "")
+
+
+def test_bundle_close_flushes_trace_and_releases_writer(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pandas_ta", ModuleType("pandas_ta"))
+
+    runtime_mod = importlib.import_module("athenaclaw.runtime")
+    bundle_mod = importlib.import_module("athenaclaw.runtime.bundle")
+    hooks: list = []
+    monkeypatch.setattr(bundle_mod, "atexit", SimpleNamespace(register=hooks.append, unregister=hooks.remove))
+    monkeypatch.setattr(runtime_mod, "_build_market_adapter", lambda _config: object())
+
+    config = runtime_mod.AgentConfig(
+        model="test",
+        base_url=None,
+        api_key="test",
+        tushare_token=None,
+        finnhub_api_key=None,
+        market_cn="yfinance",
+        market_us="yfinance",
+        workspace_dir=tmp_path / "workspace",
+        state_dir=tmp_path / "state",
+        enable_bash=False,
+    )
+    bundle = runtime_mod.build_kernel_bundle(config=config, adapter_name="automation", conversation_id="run", cwd=tmp_path)
+    assert hooks == [bundle.trace_writer.close]
+
+    bundle.kernel.emit("turn.done", {"reply": "ok"})
+    bundle.close()
+
+    assert hooks == []
+    assert '"turn.done"' in bundle.trace_path.read_text(encoding="utf-8")
+    thread = bundle.trace_writer._thread
+    thread.join(5)
+    assert not thread.is_alive()                          # 写入线程随 close 退出，不随 run 累积
+    bundle.kernel.emit("turn.done", {"reply": "late"})     # 关闭后到达的事件被忽略
+    assert "late" not in bundle.trace_path.read_text(encoding="utf-8")
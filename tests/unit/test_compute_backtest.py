@@ -0,0 +1,82 @@
+"""
+[INPUT]: pytest, numpy, pandas, athenaclaw.tools.compute.backtest, athenaclaw.tools.compute.sandbox
+[OUTPUT]: 向量化回测 helper 单测（无未来函数 / 成本扣除 / 交易分段 / 沙箱内一次调用）
+[POS]: tests/ 单测层，验证 backtest 的收益口径与输出治理
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.backtest import backtest
+from athenaclaw.tools.compute.sandbox import exec_compute
+
+
+def _daily(closes: list[float]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=len(closes)),
+        "open": closes,
+        "high": closes,
+        "low": closes,
+        "close": closes,
+        "volume": [1000.0] * len(closes),
+    })
+
+
+def test_backtest_trades_on_signal_close_without_lookahead():
+    df = _daily([10.0, 11.0, 12.0, 11.0, 13.0])
+    result = backtest([0, 1, 1, 0, -1], df)
+
+    # 第 1 根收盘买入 11，第 3 根收盘卖出 11：收益只来自持有期间
+    assert result["metrics"]["total_return"] == pytest.approx(0.0)
+    assert result["metrics"]["n_trades"] == 2
+    first, last = result["trades"]
+    assert (first["side"], first["entry_price"], first["exit_price"], first["bars"]) == ("long", 11.0, 11.0, 2)
+    assert last["side"] == "short" and last["exit"] is None
+    assert result["metrics"]["buy_and_hold_return"] == pytest.approx(0.3)
+
+
+def test_backtest_charges_fees_and_slippage_per_unit_turnover():
+    df = _daily([10.0, 10.0, 10.0, 10.0])
+    result = backtest(pd.Series([True, True, False, False]), df, fees=0.001, slippage=0.001)
+
+    assert result["metrics"]["turnover"] == pytest.approx(2.0)
+    assert result["metrics"]["final_equity"] == pytest.approx((1 - 0.002) ** 2)
+    assert result["trades"][0]["return"] == pytest.approx(-0.004)
+
+
+def test_backtest_metrics_match_reference_and_output_is_bounded():
+    rng = np.random.default_rng(3)
+    closes = list(100 + np.cumsum(rng.normal(0, 1, 400)))
+    df = _daily(closes)
+    signal = (df["close"].rolling(5).mean() > df["close"].rolling(20).mean()).astype(int)
+    result = backtest(signal, df, size=0.5)
+
+    held = signal.shift(1).fillna(0) * 0.5
+    equity = (1 + held * df["close"].pct_change().fillna(0)).cumprod()
+    assert result["metrics"]["final_equity"] == pytest.approx(equity.iloc[-1])
+    assert result["metrics"]["max_drawdown"] == pytest.approx((equity / equity.cummax() - 1).min())
+    assert len(result["trades"]) <= 20
+    assert len(result["equity_curve"]) <= 60
+    assert result["equity_curve"][-1]["equity"] == pytest.approx(equity.iloc[-1])
+
+
+def test_backtest_rejects_misaligned_signals():
+    with pytest.raises(ValueError):
+        backtest([1, 0], _daily([1.0, 2.0, 3.0]))
+
+
+def test_backtest_helper_runs_inside_sandbox():
+    df = _daily(list(np.linspace(10, 20, 50)))
+    out = exec_compute(
+        "backtest((close > close.rolling(5).mean()).astype(int), df, fees=0.0005)['metrics']",
+        df,
+        {"cash": 0, "equity": 0, "positions": {}},
+    )
+
+    assert "error" not in out
+    assert out["result"]["n_trades"] == 1
+    assert out["result"]["total_return"] > 0
@@ -0,0 +1,61 @@
+"""
+[INPUT]: importlib, pytest, scripts/bench_compute.py
+[OUTPUT]: 基准语料单测（1k 规模全部用例可执行 / 回归对比判定）
+[POS]: tests/ 单测层，防止 helper 或沙箱改动后基准语料悄悄失效
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "bench_compute.py"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench_compute", _SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module          # dataclass 解析注解时需要从 sys.modules 找到模块
+    try:
+        spec.loader.exec_module(module)
+        yield module
+    finally:
+        sys.modules.pop(spec.name, None)
+
+
+def test_corpus_runs_on_small_frame(bench):
+    results = bench.run_corpus(["1k"], repeat=1)["1k"]
+    assert set(results) == {case.name for case in bench.CORPUS}
+    for name, row in results.items():
+        assert "error" not in row, (name, row)
+        assert row["p95_ms"] >= row["p50_ms"] > 0
+
+
+def test_synthetic_frame_is_deterministic(bench):
+    a = bench.synthetic_ohlcv(500)
+    b = bench.synthetic_ohlcv(500)
+    assert a.equals(b)
+    assert (a["high"] >= a[["open", "close"]].max(axis=1)).all()
+    assert (a["low"] <= a[["open", "close"]].min(axis=1)).all()
+
+
+def test_compare_flags_only_meaningful_slowdowns(bench):
+    baseline = {"1k": {"fast": {"p50_ms": 1.0}, "slow": {"p50_ms": 50.0}, "ok": {"p50_ms": 50.0}}}
+    results = {"1k": {
+        "fast": {"p50_ms": 2.5},        # 比例超了，但绝对差 < MIN_DELTA_MS
+        "slow": {"p50_ms": 80.0},
+        "ok": {"p50_ms": 55.0},
+        "new": {"p50_ms": 9.0},         # 基线里没有
+    }}
+    regressions = bench.compare(results, baseline, tolerance=0.25)
+    assert [r["case"] for r in regressions] == ["slow"]
+    assert regressions[0]["ratio"] == 1.6
+
+    broken = bench.compare({"1k": {"ok": {"error": "boom"}}}, baseline)
+    assert broken == [{"size": "1k", "case": "ok", "error": "boom"}]
@@ -0,0 +1,67 @@
+"""
+[INPUT]: pytest, numpy, pandas, athenaclaw.tools.compute.{fanout,parallel}
+[OUTPUT]: 扇出执行单测（结果成表 / 单标的失败隔离 / 语法预检 / 排序 / 进程池与串行一致）
+[POS]: tests/ 单测层，验证 compute_map 的批量执行语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from athenaclaw.tools.compute.fanout import run_map
+from athenaclaw.tools.compute.parallel import shutdown_pool
+
+
+def _frame(last: float, n: int = 30) -> pd.DataFrame:
+    close = np.linspace(10, last, n)
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=n),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1000.0,
+    })
+
+
+def _frames() -> dict[str, pd.DataFrame]:
+    return {"AAA": _frame(12.0), "BBB": _frame(30.0), "CCC": _frame(8.0, n=1)}
+
+
+def test_run_map_builds_table_and_isolates_errors():
+    result = run_map(
+        "{'last': latest(close), 'chg': latest(close) / prev(close, 5) - 1, 'sym': symbol}",
+        _frames(),
+        {},
+        sort_by="chg",
+        workers=1,
+    )
+
+    assert [row["symbol"] for row in result["rows"]] == ["BBB", "AAA"]
+    assert result["rows"][0]["last"] == 30.0
+    assert result["rows"][0]["sym"] == "BBB"
+    assert result["failed"] == 1
+    assert result["errors"][0]["symbol"] == "CCC"
+    assert "IndexError" in result["errors"][0]["error"]
+
+
+def test_run_map_scalar_results_and_syntax_precheck():
+    scalar = run_map("latest(close) > 11", _frames(), {}, workers=1)
+    assert {row["symbol"]: row["value"] for row in scalar["rows"]} == {"AAA": True, "BBB": True, "CCC": False}
+
+    bad = run_map("latest(close", _frames(), {}, workers=1)
+    assert bad["error"].startswith("SyntaxError")
+
+
+def test_run_map_process_pool_matches_serial():
+    code = "{'mean': float(close.mean())}"
+    try:
+        parallel = run_map(code, _frames(), {}, sort_by="mean", workers=2)
+    finally:
+        shutdown_pool()
+    serial = run_map(code, _frames(), {}, sort_by="mean", workers=1)
+
+    assert parallel["rows"] == serial["rows"]
+    assert parallel["mode"] in {"process", "serial"}
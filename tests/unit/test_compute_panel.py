@@ -0,0 +1,57 @@
+"""
+[INPUT]: pytest, pandas, athenaclaw.tools.compute.panel
+[OUTPUT]: 多标的面板对齐单测（inner 交集 / outer 并集前向填充 / 参数校验）
+[POS]: tests/ 单测层，验证 align_panel 的日历对齐语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.panel import align_panel
+
+
+def _frame(dates: list[str], closes: list[float]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.to_datetime(dates),
+        "open": closes,
+        "high": closes,
+        "low": closes,
+        "close": closes,
+        "volume": [100.0] * len(closes),
+    })
+
+
+def _pair() -> dict[str, pd.DataFrame]:
+    return {
+        "A": _frame(["2024-01-01", "2024-01-02", "2024-01-03"], [1.0, 2.0, 3.0]),
+        "B": _frame(["2024-01-02", "2024-01-03", "2024-01-04"], [20.0, 30.0, 40.0]),
+    }
+
+
+def test_align_panel_inner_keeps_shared_calendar():
+    panel = align_panel(_pair())
+
+    assert panel.symbols == ("A", "B")
+    assert list(panel.closes.columns) == ["A", "B"]
+    assert panel.closes.to_numpy().tolist() == [[2.0, 20.0], [3.0, 30.0]]
+    assert panel.wide["close"].equals(panel.closes)
+    assert list(panel.frames["B"].columns) == ["date", "open", "high", "low", "close", "volume"]
+    assert panel.frames["B"]["close"].tolist() == [20.0, 30.0]
+
+
+def test_align_panel_outer_forward_fills_prices_and_zeroes_volume():
+    panel = align_panel(_pair(), how="outer")
+
+    assert len(panel.closes) == 4
+    assert panel.frames["A"]["close"].tolist() == [1.0, 2.0, 3.0, 3.0]
+    assert panel.frames["A"]["volume"].tolist() == [100.0, 100.0, 100.0, 0.0]
+    # 首个标的上市前的缺口不做后向填充
+    assert pd.isna(panel.frames["B"]["close"].iloc[0])
+
+
+def test_align_panel_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        align_panel(_pair(), how="left")
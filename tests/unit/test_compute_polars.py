@@ -0,0 +1,59 @@
+"""
+[INPUT]: pytest, numpy, pandas, polars(可选), athenaclaw.tools.compute.{columnar,sandbox}
+[OUTPUT]: compute polars 引擎单测（注入 DataFrame/LazyFrame/Series / 结果摘要 / 未安装时的报错）
+[POS]: tests/ 单测层，验证 engine="polars" 的执行与输出治理；未安装 polars 时跳过对应用例
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.columnar import polars_available
+from athenaclaw.tools.compute.sandbox import exec_compute
+
+
+def _frame(n: int = 72) -> pd.DataFrame:
+    close = np.linspace(10, 20, n)
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-02", periods=n, freq="h"),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1.0,
+    })
+
+
+def test_default_engine_is_pandas():
+    assert exec_compute("type(df).__module__.split('.')[0]", _frame(), {}) == {"result": "pandas"}
+
+
+@pytest.mark.skipif(polars_available(), reason="polars 已安装")
+def test_polars_engine_reports_missing_dependency():
+    out = exec_compute("len(df)", _frame(), {}, engine="polars")
+    assert "polars" in out["error"]
+    assert "pip install" in out["remediation"]
+
+
+def test_unknown_engine_is_rejected():
+    assert "engine" in exec_compute("1", _frame(), {}, engine="duckdb")["error"]
+
+
+def test_polars_engine_injects_columnar_objects():
+    pytest.importorskip("polars")
+    df = _frame()
+
+    assert exec_compute("close[-1]", df, {}, engine="polars") == {"result": 20.0}
+    assert exec_compute("close.rolling_mean(2)", df, {}, engine="polars")["result"] == pytest.approx(20.0 - 10 / (len(df) - 1) / 2)
+
+    out = exec_compute(
+        "lf.group_by_dynamic('date', every='1d').agg(pl.col('volume').sum())",
+        df, {}, engine="polars",
+    )["result"]
+    assert out["_type"] == "dataframe"
+    assert out["shape"] == [3, 2]
+    assert [row["volume"] for row in out["tail"]] == [24.0, 24.0, 24.0]
+    assert out["tail"][0]["date"] == "2024-01-02T00:00:00"
@@ -0,0 +1,84 @@
+"""
+[INPUT]: numpy, pandas, athenaclaw.tools.compute.{profile,sandbox}
+[OUTPUT]: compute 执行画像单测（分段计时 / 超时落在 execute / 内存采样 / 按代码哈希聚合）
+[POS]: tests/ 单测层，验证 compute.profile 记录与 ComputeProfiler 聚合语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from athenaclaw.tools.compute.profile import ComputeProfiler, Stopwatch, code_hash
+from athenaclaw.tools.compute.sandbox import exec_compute
+
+
+def _frame(n: int = 200) -> pd.DataFrame:
+    close = np.linspace(1, 2, n)
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=n),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1.0,
+    })
+
+
+def test_stopwatch_accumulates_phases_and_attributes_inflight_time():
+    watch = Stopwatch()
+    watch.enter("inject")
+    watch.enter("execute")
+    watch.stop()
+    watch.enter("execute")
+    watch.stop()
+
+    snap = watch.snapshot()
+    assert list(snap["phases_ms"]) == ["inject", "execute"]
+    assert snap["cpu_ms"] >= 0
+
+
+def test_exec_compute_profile_records_all_phases():
+    profile: dict = {}
+    out = exec_compute("x = close.rolling(5).mean()\nlatest(x)", _frame(), {}, profile=profile, trace_memory=True)
+
+    assert "result" in out
+    assert set(profile["phases_ms"]) == {"inject", "validate", "execute", "serialize"}
+    assert profile["wall_ms"] >= sum(profile["phases_ms"].values()) * 0.99
+    assert profile["timed_out"] is False
+    assert profile["py_peak_mb"] >= 0
+    assert "error" not in profile
+
+
+def test_exec_compute_profile_marks_timeout_in_execute_phase():
+    profile: dict = {}
+    out = exec_compute("while True:\n    pass", _frame(), {}, timeout_ms=50, profile=profile)
+
+    assert "error" in out
+    assert profile["timed_out"] is True
+    assert profile["phases_ms"]["execute"] >= 40
+    assert "serialize" not in profile["phases_ms"]
+    assert "py_peak_mb" not in profile
+
+
+def test_exec_compute_without_profile_is_unchanged():
+    assert exec_compute("1 + 1", _frame(), {}) == {"result": 2}
+
+
+def test_profiler_aggregates_by_code_hash_and_drains_per_turn():
+    profiler = ComputeProfiler()
+    for wall in (10.0, 30.0):
+        profiler.record("latest(close)", {"wall_ms": wall, "cpu_ms": 5.0, "phases_ms": {"execute": wall}})
+    profiler.record("  latest(close)\n", {"wall_ms": 20.0, "error": "KeyError"})
+    profiler.record("slow()", {"wall_ms": 500.0, "timed_out": True, "error": "计算超时"})
+
+    slow, fast = profiler.report()
+    assert slow["preview"] == "slow()" and slow["timeouts"] == 1
+    assert fast["code_hash"] == code_hash("latest(close)")
+    assert (fast["calls"], fast["errors"], fast["total_ms"], fast["max_ms"]) == (3, 1, 60.0, 30.0)
+    assert fast["mean_phases_ms"] == {"execute": round(40.0 / 3, 3)}
+
+    assert len(profiler.drain_turn()) == 2
+    assert profiler.drain_turn() == []
+    assert len(profiler.report()) == 2
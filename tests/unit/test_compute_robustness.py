@@ -0,0 +1,96 @@
+"""
+[INPUT]: pytest, numpy, pandas, athenaclaw.tools.compute.{resample,robustness,sandbox,parallel}
+[OUTPUT]: 稳健性分析单测（重采样可复现且与并行度无关 / walk-forward 切分与样本外评估 / 沙箱 helper）
+[POS]: tests/ 单测层，验证 bootstrap / monte_carlo / walk_forward 语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.parallel import shutdown_pool
+from athenaclaw.tools.compute.resample import bootstrap, monte_carlo
+from athenaclaw.tools.compute.robustness import walk_forward, walk_forward_folds
+from athenaclaw.tools.compute.sandbox import exec_compute
+
+
+def _returns(n: int = 500) -> np.ndarray:
+    return np.random.default_rng(11).normal(0.001, 0.01, n)
+
+
+def _frame(n: int = 400) -> pd.DataFrame:
+    close = 100 * np.cumprod(1 + _returns(n))
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=n),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1000.0,
+    })
+
+
+def test_bootstrap_is_reproducible_and_independent_of_workers():
+    serial = bootstrap(_returns(), n=1200, seed=3, workers=1)
+    try:
+        parallel = bootstrap(_returns(), n=1200, seed=3, workers=2)
+    finally:
+        shutdown_pool()
+
+    assert serial["sharpe"] == parallel["sharpe"]
+    assert serial["resamples"] == 1200
+    p = serial["total_return"]
+    assert p["p5"] <= p["p25"] <= p["p50"] <= p["p75"] <= p["p95"]
+    assert 0.0 <= serial["prob_loss"] <= 1.0
+
+
+def test_monte_carlo_drawdowns_are_non_positive_and_scale_with_horizon():
+    short = monte_carlo(_returns(), n=500, horizon=20, seed=1)
+    long = monte_carlo(_returns(), n=500, horizon=400, seed=1)
+
+    assert short["max_drawdown"]["p95"] <= 0
+    assert long["max_drawdown"]["p50"] < short["max_drawdown"]["p50"]
+    assert short["horizon"] == 20 and short["block"] == 1
+
+
+def test_walk_forward_folds_and_out_of_sample_scores():
+    assert walk_forward_folds(10, train=4, test=3) == [(0, 4, 7), (3, 7, 10)]
+    with pytest.raises(ValueError):
+        walk_forward_folds(10, train=1, test=3)
+
+    result = walk_forward(
+        "x = close.rolling(n).mean()",
+        {"n": [2, 5]},
+        _frame(),
+        {},
+        train=100,
+        test=50,
+        score="float(len(df) + len(x) + x.isna().sum())",
+        warmup=10,
+        workers=1,
+    )
+
+    assert result["folds"] == 6
+    # 样本内：训练窗 100 根，n=5 多出 4 个 NaN 而胜出；样本外：只数测试窗 50 根，预热后 x 无 NaN
+    assert result["in_sample_mean"] == 204.0
+    assert result["out_of_sample"]["p50"] == 100.0
+    assert result["efficiency"] == pytest.approx(100 / 204)
+    assert {r["params"]["n"] for r in result["fold_results"]} == {5}
+
+    with pytest.raises(ValueError):
+        walk_forward("x = 1", {"n": [2]}, _frame(), {}, train=100, test=50, warmup=10, workers=1)
+
+
+def test_resampling_helpers_run_inside_sandbox():
+    out = exec_compute(
+        "r = strategy_returns((close > close.rolling(5).mean()).astype(int), df)\n"
+        "bootstrap(r, n=300, seed=0)['sharpe']['p50']",
+        _frame(),
+        {"cash": 0, "equity": 0, "positions": {}},
+    )
+
+    assert "error" not in out
+    assert isinstance(out["result"], float)
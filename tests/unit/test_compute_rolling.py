@@ -0,0 +1,99 @@
+"""
+[INPUT]: numpy, pandas, pytest, athenaclaw.tools.compute.{rolling,sandbox}
+[OUTPUT]: 滚动窗口原语单测（与 pandas rolling 数值一致 / NaN 语义一致 / 常数窗口 / 沙箱 helper 可用）
+[POS]: tests/ 单测层，验证 rolling_* 向量化实现与 pandas 参考实现等价
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.rolling import (
+    rolling_max_drawdown,
+    rolling_quantile,
+    rolling_r2,
+    rolling_rank,
+    rolling_slope,
+    rolling_zscore,
+)
+from athenaclaw.tools.compute.sandbox import exec_compute
+
+
+def _prices(n: int = 1500) -> pd.Series:
+    rng = np.random.default_rng(7)
+    s = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))))
+    s.iloc[[3, 400, 401]] = np.nan
+    s.iloc[900:930] = 101.0        # 常数段
+    return s
+
+
+def _assert_same(got: pd.Series, ref: pd.Series, rtol: float = 1e-7) -> None:
+    assert got.isna().equals(ref.isna())
+    mask = ref.notna()
+    np.testing.assert_allclose(got[mask], ref[mask], rtol=rtol, atol=1e-9)
+
+
+def _slope(a: np.ndarray) -> float:
+    return np.polyfit(np.arange(a.size), a, 1)[0]
+
+
+def _r2(a: np.ndarray) -> float:
+    return np.corrcoef(np.arange(a.size), a)[0, 1] ** 2
+
+
+def _mdd(a: np.ndarray) -> float:
+    return (a / np.maximum.accumulate(a) - 1).min()
+
+
+@pytest.mark.parametrize("window", [5, 30, 252])
+def test_rolling_primitives_match_pandas(window):
+    s = _prices()
+    roll = s.rolling(window)
+
+    _assert_same(rolling_zscore(s, window), (s - roll.mean()) / roll.std())
+    _assert_same(rolling_rank(s, window), roll.rank(pct=True))
+    _assert_same(rolling_rank(s, window, pct=False), roll.rank())
+    _assert_same(rolling_quantile(s, window, 0.1), roll.quantile(0.1))
+    _assert_same(rolling_max_drawdown(s, window), roll.apply(_mdd, raw=True))
+    slope_ref = roll.apply(_slope, raw=True)
+    _assert_same(rolling_slope(s, window), slope_ref.where(roll.std() > 0, 0.0).where(slope_ref.notna()))
+    _assert_same(rolling_r2(s, window), roll.apply(_r2, raw=True), rtol=1e-6)
+
+
+def test_constant_window_semantics():
+    s = pd.Series([1.0, 1.0, 1.0, 2.0, 2.0, 2.0])
+    assert rolling_zscore(s, 3).isna().tolist() == [True, True, True, False, False, True]
+    assert rolling_slope(s, 3).tolist()[2] == 0.0
+    assert np.isnan(rolling_r2(s, 3).iloc[5])
+
+
+def test_precision_does_not_degrade_along_long_series():
+    n = 200_000
+    t = np.arange(n, dtype=float)
+    s = pd.Series(1000 + 0.5 * t + np.sin(t))
+    ref = np.polyfit(np.arange(20), s.to_numpy()[-20:], 1)[0]
+    assert rolling_slope(s, 20).iloc[-1] == pytest.approx(ref, rel=1e-9)
+
+
+def test_ndarray_in_ndarray_out_and_short_input():
+    arr = np.arange(10, dtype=float)
+    out = rolling_slope(arr, 3)
+    assert isinstance(out, np.ndarray)
+    np.testing.assert_allclose(out[2:], 1.0)
+    assert np.isnan(rolling_zscore(arr, 20)).all()
+    with pytest.raises(ValueError):
+        rolling_quantile(arr, 3, q=1.5)
+
+
+def test_rolling_helpers_available_in_sandbox():
+    df = pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=50),
+        "open": 1.0, "high": 1.0, "low": 1.0,
+        "close": np.arange(50, dtype=float) + 1,
+        "volume": 1.0,
+    })
+    out = exec_compute("{'slope': latest(rolling_slope(close, 10)), 'rank': latest(rolling_rank(close, 10))}", df, {})
+    assert out["result"] == {"rank": 1.0, "slope": pytest.approx(1.0)}
@@ -0,0 +1,73 @@
+"""
+[INPUT]: numpy, pandas, athenaclaw.tools.compute.{sandbox,scope}
+[OUTPUT]: compute 作用域单测（LRU 淘汰 / 超限拒收 / turn 覆盖 chat / 只捕获新绑定的顶层变量）
+[POS]: tests/ 单测层，验证 compute scope 的保留与清理语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from athenaclaw.tools.compute.sandbox import exec_compute
+from athenaclaw.tools.compute.scope import ComputeScope, ComputeScopes, estimate_nbytes
+
+
+def _frame(n: int = 10) -> pd.DataFrame:
+    close = np.arange(1, n + 1, dtype=float)
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=n),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1.0,
+    })
+
+
+def test_scope_evicts_least_recently_used_entries():
+    scope = ComputeScope(max_entries=2)
+    scope.store({"a": 1, "b": 2})
+    scope.variables()  # 读取刷新顺序
+    report = scope.store({"c": 3})
+
+    assert report == {"saved": ["c"], "evicted": ["a"], "rejected": []}
+    assert set(scope.variables()) == {"b", "c"}
+
+
+def test_scope_rejects_values_over_memory_budget():
+    big = np.zeros(1000)
+    scope = ComputeScope(max_bytes=estimate_nbytes(big) - 1)
+    report = scope.store({"big": big, "small": 1})
+
+    assert report["rejected"] == ["big"]
+    assert list(scope.variables()) == ["small"]
+
+
+def test_scopes_turn_shadows_chat_and_writes_move_names():
+    scopes = ComputeScopes()
+    scopes.store("chat", {"x": 1, "y": 1})
+    scopes.store("turn", {"x": 2})
+    assert scopes.visible() == {"x": 2, "y": 1}
+
+    scopes.store("chat", {"x": 3})
+    assert scopes.visible() == {"x": 3, "y": 1}
+    assert len(scopes.turn) == 0
+
+
+def test_exec_compute_captures_only_new_top_level_bindings():
+    captured: dict = {}
+    out = exec_compute(
+        "import_ok = 1\n_tmp = 2\nsig = close > 5\nkept = kept\nclose2 = close * 2",
+        _frame(), {}, scope={"kept": [1]}, capture=captured,
+    )
+
+    assert out == {"result": None}
+    assert set(captured) == {"import_ok", "sig", "close2"}
+    assert int(captured["sig"].sum()) == 5
+
+
+def test_exec_compute_without_scope_still_requires_output():
+    out = exec_compute("x = 1", _frame(), {})
+    assert "error" in out
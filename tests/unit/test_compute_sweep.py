@@ -0,0 +1,91 @@
+"""
+[INPUT]: threading, pytest, numpy, pandas, athenaclaw.tools.compute.sweep, athenaclaw.tools.compute.parallel
+[OUTPUT]: 参数寻优单测（网格展开校验 / 排名 / 失败隔离 / 进程池与串行结果一致 / worker 异常原样传播、不可序列化才串行兜底）
+[POS]: tests/ 单测层，验证 compute_sweep 的执行语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.parallel import run_chunked, shutdown_pool
+from athenaclaw.tools.compute.sweep import MAX_COMBINATIONS, expand_grid, run_sweep
+
+
+def _frame(n: int = 300) -> pd.DataFrame:
+    close = 100 + np.cumsum(np.random.default_rng(5).normal(0, 1, n))
+    return pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=n),
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": 1000.0,
+    })
+
+
+def test_expand_grid_builds_cartesian_product_and_validates_names():
+    assert expand_grid({"a": [1, 2], "b": ["x"]}) == [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}]
+    with pytest.raises(ValueError):
+        expand_grid({"close": [1]})
+    with pytest.raises(ValueError):
+        expand_grid({"a": []})
+    with pytest.raises(ValueError):
+        expand_grid({"a": list(range(MAX_COMBINATIONS + 1))})
+
+
+def test_run_sweep_ranks_scores_and_isolates_failures():
+    result = run_sweep(
+        "x = k * 2",
+        {"k": [1, 3, 2, 0]},
+        _frame(),
+        {},
+        score="10 / k",
+        minimize=True,
+        workers=1,
+    )
+
+    assert result["combinations"] == 4
+    assert result["failed"] == 1
+    assert "ZeroDivisionError" in result["errors"][0]["error"]
+    assert result["best"] == {"params": {"k": 3}, "score": pytest.approx(10 / 3)}
+    assert [row["k"] for row in result["top"]] == [3, 2, 1]
+
+
+def test_run_sweep_process_pool_matches_serial():
+    code = "bt = backtest((close.rolling(fast).mean() > close.rolling(slow).mean()).astype(int), df)"
+    grid = {"fast": [3, 5, 8], "slow": [20, 40]}
+    try:
+        parallel = run_sweep(code, grid, _frame(), {}, score="bt['metrics']['total_return']", workers=2)
+    finally:
+        shutdown_pool()
+    serial = run_sweep(code, grid, _frame(), {}, score="bt['metrics']['total_return']", workers=1)
+
+    assert parallel["top"] == serial["top"]
+    assert parallel["succeeded"] == 6
+
+
+def _double_or_fail(shared, chunk):
+    if shared == "fail":
+        raise ValueError("bad snippet")
+    return [x * 2 for x in chunk]
+
+
+def test_run_chunked_propagates_worker_errors_and_falls_back_only_for_pickling():
+    try:
+        with pytest.raises(ValueError, match="bad snippet"):
+            run_chunked(_double_or_fail, "fail", [1, 2, 3, 4], workers=2)
+        assert run_chunked(_double_or_fail, "ok", [1, 2, 3, 4], workers=2) == ([2, 4, 6, 8], {"mode": "process", "workers": 2})
+    finally:
+        shutdown_pool()
+
+    # 锁不可 pickle：不进进程池，直接串行
+    lock = threading.Lock()
+    assert run_chunked(lambda _s, chunk: [x + 1 for x in chunk], lock, [1, 2], workers=2) == (
+        [2, 3], {"mode": "serial", "workers": 1},
+    )
@@ -0,0 +1,146 @@
+"""
+[INPUT]: threading, athenaclaw.kernel (Kernel/EventBus/AsyncSubscriber)
+[OUTPUT]: kernel 事件分发单测（fnmatch 语义与顺序 / 路由缓存失效 / 异步订阅者不阻塞 emit / drop 与 coalesce 溢出策略 / 生命周期事件积压时不丢）
+[POS]: tests/ 单测层，验证 wire/emit 的分发与背压语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from athenaclaw.kernel import AsyncSubscriber, EventBus, Kernel
+
+
+def _gated(log: list, gate: threading.Event):
+    def handler(event, data):
+        gate.wait(5)
+        log.append((event, data))
+    return handler
+
+
+def _wait_taken(sub: AsyncSubscriber) -> None:
+    """等 worker 取走队首事件（此后它阻塞在 gate 上，队列容量全部可用）。"""
+    deadline = time.monotonic() + 5
+    while sub._queue and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_bus_matches_fnmatch_patterns_in_registration_order():
+    bus = EventBus()
+    seen: list[str] = []
+    bus.subscribe("llm.*", lambda e, d: seen.append(f"wild:{e}"))
+    bus.subscribe("llm.chunk", lambda e, d: seen.append(f"exact:{e}"))
+    bus.subscribe("tool:[we]*", lambda e, d: seen.append(f"set:{e}"))
+    bus.subscribe("llm.*", lambda e, d: seen.append(f"wild2:{e}"))
+
+    for event in ("llm.chunk", "tool:write", "tool:read", "LLM.chunk"):
+        bus.publish(event)
+
+    assert seen == ["wild:llm.chunk", "wild2:llm.chunk", "exact:llm.chunk", "set:tool:write"]
+
+
+def test_route_cache_is_invalidated_by_new_subscriptions():
+    bus = EventBus()
+    seen: list[str] = []
+    bus.subscribe("turn.*", lambda e, d: seen.append("a"))
+    bus.publish("turn.done")
+    bus.subscribe("turn.done", lambda e, d: seen.append("b"))
+    bus.publish("turn.done")
+
+    assert seen == ["a", "a", "b"]
+    assert len(bus.route("turn.done")) == 2
+
+
+def test_kernel_emit_dispatches_through_the_bus(monkeypatch):
+    kernel = Kernel()
+    published: list[tuple] = []
+    monkeypatch.setattr(kernel._events, "publish", lambda e, d=None: published.append((e, d)))
+
+    kernel.emit("turn.done", {"reply": "ok"})
+
+    assert published == [("turn.done", {"reply": "ok"})]
+
+
+def test_background_subscriber_never_blocks_emit():
+    kernel = Kernel()
+    gate = threading.Event()
+    log: list = []
+    sub = kernel.wire("llm.chunk", _gated(log, gate), background=True, maxsize=8)
+
+    for i in range(100):
+        kernel.emit("llm.chunk", {"content": str(i), "round": 1})   # handler 卡住时也必须立即返回
+    gate.set()
+    assert kernel.flush_events()
+
+    assert isinstance(sub, AsyncSubscriber)
+    assert sub.dropped > 0
+    assert len(log) <= 9
+    assert log[-1][1]["content"] == "99"
+
+
+def test_coalesce_merges_deltas_and_keeps_other_events():
+    gate = threading.Event()
+    log: list = []
+    sub = AsyncSubscriber(_gated(log, gate), maxsize=3, overflow="coalesce")
+
+    sub("llm.call.start", {"round": 1})       # 被 worker 取走后阻塞在 gate 上
+    _wait_taken(sub)
+    sub("llm.chunk", {"content": "a", "round": 1})
+    sub("llm.chunk", {"content": "b", "round": 1})
+    sub("tool.call.start", {"name": "x"})
+    sub("llm.chunk", {"content": "c", "round": 1})
+    sub("llm.chunk", {"content": "d", "round": 1})
+    gate.set()
+    assert sub.flush(5)
+
+    assert [e for e, _ in log] == ["llm.call.start", "llm.chunk", "llm.chunk", "tool.call.start"]
+    assert "".join(d["content"] for e, d in log if e == "llm.chunk") == "abcd"
+    assert sub.coalesced == 2 and sub.dropped == 0
+
+
+def test_flood_only_sheds_lossy_events_and_keeps_lifecycle_records():
+    gate = threading.Event()
+    log: list = []
+    sub = AsyncSubscriber(_gated(log, gate), maxsize=4, overflow="coalesce", lossy=("llm.chunk",))
+
+    sub("turn.start", {})
+    _wait_taken(sub)
+    for i in range(20):
+        sub("llm.chunk", {"content": str(i % 10), "round": i})
+        sub("tool.call.done", {"i": i})
+    sub("turn.done", {})
+    gate.set()
+    assert sub.flush(5)
+
+    events = [e for e, _ in log]
+    assert events[0] == "turn.start" and events[-1] == "turn.done"
+    assert [d["i"] for e, d in log if e == "tool.call.done"] == list(range(20))
+    assert sub.dropped > 0                              # 只有 llm.chunk 被挤掉
+
+
+def test_drop_newest_and_handler_errors_are_counted():
+    gate = threading.Event()
+
+    def failing(event, data):
+        gate.wait(5)
+        raise RuntimeError("boom")
+
+    sub = AsyncSubscriber(failing, maxsize=1, overflow="drop_newest")
+    sub("a", 1)
+    _wait_taken(sub)
+    sub("b", 2)
+    sub("c", 3)
+    gate.set()
+    assert sub.flush(5)
+
+    assert sub.dropped == 1
+    assert sub.errors == 2 and sub.last_error == "RuntimeError: boom"
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AsyncSubscriber(lambda e, d: None, overflow="block")
@@ -0,0 +1,151 @@
+"""
+[INPUT]: asyncio, json, pathlib, pytest, openai.types.chat, athenaclaw.kernel, athenaclaw.llm.cassette
+[OUTPUT]: 录制/回放单测（非流式工具调用往返 / 流式 chunk 往返 / aturn 异步回放 / 未命中报错 / 请求哈希归一化）
+[POS]: tests/ 单测层，验证 cassette 让 kernel 能离线确定性重放
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from athenaclaw.kernel import Kernel, Session
+from athenaclaw.llm.cassette import Cassette, CassetteMissError, request_key, use_cassette
+from athenaclaw.llm.providers import OpenAIChatProvider
+
+
+def _completion(content=None, tool_calls=None, finish_reason="stop") -> ChatCompletion:
+    message: dict = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return ChatCompletion.model_validate({
+        "id": "cmpl", "object": "chat.completion", "created": 0, "model": "m",
+        "choices": [{"index": 0, "finish_reason": finish_reason, "message": message}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    })
+
+
+def _chunk(delta: dict, finish_reason=None) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate({
+        "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": "m",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    })
+
+
+class _LiveClient:
+    """按脚本返回响应的“真实”client；calls 记录被打到的次数。"""
+
+    def __init__(self, *responses):
+        self.chat = self
+        self.completions = self
+        self.responses = list(responses)
+        self.calls = 0
+
+    def create(self, **_kwargs):
+        self.calls += 1
+        response = self.responses.pop(0)
+        return iter(response) if isinstance(response, list) else response
+
+
+class _OfflineClient:
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+
+    def create(self, **_kwargs):
+        raise AssertionError("replay 模式不应访问真实 client")
+
+
+def _kernel(provider: OpenAIChatProvider, *, stream: bool = False) -> tuple[Kernel, list]:
+    kernel = Kernel(model="m", provider=provider)
+    kernel.stream = stream
+    seen: list = []
+
+    def echo(args):
+        seen.append(args)
+        return {"echo": args["text"]}
+
+    kernel.tool("echo", "回显", {"type": "object", "properties": {"text": {"type": "string"}}}, echo)
+    return kernel, seen
+
+
+_ECHO_CALL = [{"id": "c1", "type": "function", "function": {"name": "echo", "arguments": '{"text": "hi"}'}}]
+
+
+def test_records_tool_round_trip_and_replays_it_offline(tmp_path: Path):
+    path = tmp_path / "run.jsonl"
+    live = _LiveClient(_completion(tool_calls=_ECHO_CALL, finish_reason="tool_calls"), _completion("完成"))
+    recorder = Cassette(path, mode="record")
+    kernel, _ = _kernel(use_cassette(OpenAIChatProvider(client=live), recorder))
+
+    assert kernel.turn("回显 hi", Session()) == "完成"
+    assert live.calls == 2 and recorder.recorded == 2
+
+    player = Cassette(path, mode="replay")
+    kernel, seen = _kernel(use_cassette(OpenAIChatProvider(client=_OfflineClient()), player))
+    session = Session()
+    assert kernel.turn("回显 hi", session) == "完成"
+
+    assert seen == [{"text": "hi"}]
+    assert player.hits == 2
+    assert json.loads(session.history[2]["content"]) == {"echo": "hi"}
+
+    with pytest.raises(CassetteMissError):
+        kernel.turn("另一个问题", Session())
+
+
+def test_streaming_chunks_replay_through_sync_and_async_turns(tmp_path: Path):
+    path = tmp_path / "stream.jsonl"
+    stream = [
+        _chunk({"role": "assistant", "content": "你"}),
+        _chunk({"content": "好"}),
+        _chunk({}, finish_reason="stop"),
+    ]
+    kernel, _ = _kernel(
+        use_cassette(OpenAIChatProvider(client=_LiveClient(stream)), Cassette(path, mode="record")),
+        stream=True,
+    )
+    assert kernel.turn("打个招呼", Session()) == "你好"
+
+    entry = json.loads(path.read_text(encoding="utf-8"))
+    assert entry["stream"] is True and len(entry["chunks"]) == len(entry["delays_ms"]) == 3
+
+    kernel, _ = _kernel(
+        use_cassette(OpenAIChatProvider(client=_OfflineClient()), Cassette(path, mode="replay")),
+        stream=True,
+    )
+    chunks: list[str] = []
+    kernel.wire("llm.chunk", lambda e, d: chunks.append(d["content"]))
+    assert kernel.turn("打个招呼", Session()) == "你好"
+    assert asyncio.run(kernel.aturn("打个招呼", Session())) == "你好"
+    assert "".join(chunks) == "你好你好"
+
+
+def test_auto_mode_records_only_misses(tmp_path: Path):
+    path = tmp_path / "auto.jsonl"
+    live = _LiveClient(_completion("一"), _completion("二"))
+    cassette = Cassette(path, mode="auto")
+    kernel, _ = _kernel(use_cassette(OpenAIChatProvider(client=live), cassette))
+
+    assert kernel.turn("第一问", Session()) == "一"
+    assert kernel.turn("第一问", Session()) == "一"        # 命中录制，不再请求
+    assert kernel.turn("第二问", Session()) == "二"
+
+    assert live.calls == 2
+    assert len(Cassette(path, mode="replay")) == 2
+
+
+def test_request_key_ignores_timestamps_and_transport_options():
+    base = {"model": "m", "messages": [{"role": "user", "content": "[2026-03-11 09:30] 行情"}]}
+    later = {
+        "model": "m", "messages": [{"role": "user", "content": "[2026-10-19 14:05] 行情"}],
+        "timeout": 30, "stream_options": {"include_usage": True},
+    }
+
+    assert request_key(base) == request_key(later)
+    assert request_key(base) != request_key({**base, "model": "other"})
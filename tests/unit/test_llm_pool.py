@@ -0,0 +1,137 @@
+"""
+[INPUT]: asyncio, threading, time, types, pytest, athenaclaw.llm.pool
+[OUTPUT]: 连接池与限流单测（优先级插队 / TPM 预扣与 usage 校正 / 异步等待不阻塞事件循环 / 进程级 client 复用与按事件循环隔离）
+[POS]: tests/ 单测层，验证多 bundle 共享 provider 配额的排队语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from athenaclaw.llm.pool import (
+    ClientPool,
+    RateLimitedClient,
+    RateLimiter,
+    current_priority,
+    llm_priority,
+    request_tokens,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert predicate()
+
+
+def test_interactive_requests_jump_ahead_of_queued_background_work():
+    clock = _Clock()
+    limiter = RateLimiter(rpm=6000, burst_seconds=0.01, clock=clock)  # 容量 1，每 10ms 补 1 个（假时钟）
+    limiter.acquire(priority="interactive")                          # 把桶取空
+    order: list[str] = []
+
+    def request(priority: str) -> None:
+        limiter.acquire(priority=priority)
+        order.append(priority)
+
+    threads = []
+    for priority in ("compaction", "automation", "interactive"):
+        thread = threading.Thread(target=request, args=(priority,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        _wait_until(lambda n=len(threads): limiter.stats()["queued"] == n)
+
+    for granted in range(1, 4):
+        clock.now += 1.0                                             # 桶容量只有 1：每次只放行一个请求
+        _wait_until(lambda g=granted: len(order) == g)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["interactive", "automation", "compaction"]
+    assert limiter.stats()["granted"] == {"interactive": 2, "automation": 1, "compaction": 1}
+
+
+def test_token_budget_is_reserved_up_front_and_corrected_by_usage():
+    clock = _Clock()
+    limiter = RateLimiter(tpm=600, burst_seconds=10, clock=clock)   # 容量 100 token，每秒补 10
+
+    class _Inner:
+        def __init__(self) -> None:
+            self.chat = self
+            self.completions = self
+
+        def create(self, **_kwargs):
+            return SimpleNamespace(usage=SimpleNamespace(total_tokens=20))
+
+    client = RateLimitedClient(_Inner(), limiter)
+    kwargs = {"model": "m", "messages": [{"role": "user", "content": "x" * 240}]}
+    assert request_tokens(kwargs) == 64
+
+    client.chat.completions.create(**kwargs)                          # 预扣 64，按 usage 退回 44
+
+    assert limiter._tokens.level == pytest.approx(80)
+    limiter.settle(10, 200)                                           # 低估时补扣，可以扣成负数
+    assert limiter._tokens.level == pytest.approx(-110)
+
+
+def test_async_waiters_yield_the_event_loop_and_respect_context_priority():
+    limiter = RateLimiter(rpm=600, burst_seconds=0.1)                 # 容量 1，每 0.1 秒补 1 个
+    ticks = 0
+
+    async def ticker(stop: asyncio.Event) -> None:
+        nonlocal ticks
+        while not stop.is_set():
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def main() -> None:
+        stop = asyncio.Event()
+        task = asyncio.create_task(ticker(stop))
+        await limiter.aacquire()
+        with llm_priority("compaction"):
+            await limiter.aacquire(priority=current_priority("interactive"))
+        stop.set()
+        await task
+
+    asyncio.run(main())
+
+    assert ticks >= 3                                                 # 等配额期间事件循环仍在跑
+    assert limiter.stats()["granted"]["compaction"] == 1
+
+
+def test_pool_shares_sync_clients_and_isolates_async_clients_per_loop():
+    made: list[str] = []
+    pool = ClientPool(
+        factory=lambda **kw: made.append("sync") or SimpleNamespace(**kw),
+        async_factory=lambda **kw: made.append("async") or SimpleNamespace(**kw),
+    )
+
+    a_sync, a_async = pool.clients("https://api.example", "k", rpm=10, priority="interactive")
+    b_sync, b_async = pool.clients("https://api.example", "k", priority="automation")
+
+    async def resolve():
+        return a_async.inner(), b_async.inner()
+
+    first = asyncio.run(resolve())
+    second = asyncio.run(resolve())
+
+    assert a_sync.inner is b_sync.inner and a_sync.limiter is b_sync.limiter
+    assert (a_sync.priority, b_sync.priority) == ("interactive", "automation")
+    assert first[0] is first[1] and second[0] is not first[0]
+    assert made.count("sync") == 1
+    assert pool.clients("https://other", "k")[0].inner is not a_sync.inner
@@ -0,0 +1,174 @@
+"""
+[INPUT]: asyncio, threading, types, openai, pytest, athenaclaw.llm.router
+[OUTPUT]: 多端点路由单测（瞬时错误换端点重试 / 非瞬时错误直接抛出 / 熔断后跳过故障端点 / 同步与异步对冲先到者胜 / 对冲线程继承 llm_priority）
+[POS]: tests/ 单测层，验证 provider 路由的重试、故障切换与对冲语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from athenaclaw.llm.pool import current_priority, llm_priority
+from athenaclaw.llm.router import Endpoint, ProviderRouter, is_transient
+
+
+def _status_error(status: int) -> openai.APIStatusError:
+    response = SimpleNamespace(status_code=status, request=None, headers={})
+    return openai.APIStatusError(f"HTTP {status}", response=response, body=None)
+
+
+class _Client:
+    """按脚本依次返回 / 抛出；可选在返回前阻塞到 gate 打开。"""
+
+    def __init__(self, *script, gate: threading.Event | None = None):
+        self.chat = self
+        self.completions = self
+        self.script = list(script)
+        self.gate = gate
+        self.models: list[str] = []
+
+    def create(self, **kwargs):
+        self.models.append(kwargs["model"])
+        if self.gate is not None:
+            self.gate.wait(5)
+        item = self.script.pop(0)
+        if isinstance(item, BaseException):
+            raise item
+        return iter(item) if isinstance(item, list) else item
+
+
+def _router(*endpoints, **kwargs) -> tuple[ProviderRouter, list]:
+    events: list = []
+    router = ProviderRouter(
+        list(endpoints), listener=lambda e, d: events.append((e, d)),
+        sleep=lambda _s: None, rng=lambda: 0.5, **kwargs,
+    )
+    return router, events
+
+
+def test_transient_errors_fail_over_and_fatal_errors_raise_immediately():
+    primary = _Client(_status_error(503), _status_error(400))
+    backup = _Client(SimpleNamespace(text="ok"))
+    router, events = _router(
+        Endpoint("primary", primary), Endpoint("backup", backup, model="backup-model"),
+    )
+
+    assert router.client.chat.completions.create(model="m", messages=[]).text == "ok"
+    assert backup.models == ["backup-model"]
+    assert [e for e, _ in events] == ["llm.retry"]
+    assert events[0][1]["next_endpoint"] == "backup" and events[0][1]["delay_s"] == 0.0
+
+    with pytest.raises(openai.APIStatusError):
+        router.client.chat.completions.create(model="m", messages=[])
+    assert is_transient(_status_error(429)) and not is_transient(_status_error(401))
+
+
+def test_single_endpoint_backs_off_with_jitter_then_gives_up():
+    client = _Client(_status_error(502), _status_error(502), _status_error(502))
+    delays: list[float] = []
+    router = ProviderRouter([Endpoint("only", client)], retries=2, backoff=1.0, sleep=delays.append, rng=lambda: 0.5)
+
+    with pytest.raises(openai.APIStatusError):
+        router.client.chat.completions.create(model="m", messages=[])
+
+    assert delays == [0.5, 1.0]                       # 0.5 × min(8, 1 × 2^n)
+    assert len(client.models) == 3
+
+
+def test_unhealthy_endpoint_is_skipped_until_cooldown_ends():
+    now = [0.0]
+    primary = _Client(_status_error(500), "recovered")
+    backup = _Client("b1", "b2")
+    router, events = _router(
+        Endpoint("primary", primary), Endpoint("backup", backup),
+        failure_threshold=1, cooldown=30, clock=lambda: now[0],
+    )
+
+    assert router.client.chat.completions.create(model="m") == "b1"
+    assert ("llm.endpoint.down", {"endpoint": "primary", "failures": 1, "cooldown_s": 30}) in events
+    assert router.client.chat.completions.create(model="m") == "b2"     # 熔断中：直接走备用端点
+    assert len(primary.models) == 1
+
+    now[0] = 31.0
+    assert router.client.chat.completions.create(model="m") == "recovered"
+    assert [s["healthy"] for s in router.stats()] == [True, True]
+
+
+def test_slow_first_token_is_hedged_to_the_next_endpoint():
+    gate = threading.Event()
+    slow = _Client(["late"], gate=gate)
+    fast = _Client(["fast-1", "fast-2"])
+    router, events = _router(Endpoint("slow", slow), Endpoint("fast", fast), hedge_after=0.05)
+
+    chunks = list(router.client.chat.completions.create(model="m", stream=True))
+    gate.set()
+
+    assert chunks == ["fast-1", "fast-2"]
+    assert events[0][0] == "llm.hedge" and events[0][1]["hedge_endpoint"] == "fast"
+    assert router.stats()[1]["ttft_ms"] is not None
+
+
+def test_hedged_requests_keep_the_callers_llm_priority():
+    gate = threading.Event()
+    seen: list[str] = []
+
+    class _PriorityClient(_Client):
+        def create(self, **kwargs):
+            seen.append(current_priority())
+            return super().create(**kwargs)
+
+    slow = _PriorityClient(["late"], gate=gate)
+    fast = _PriorityClient(["fast"])
+    router, _events = _router(Endpoint("slow", slow), Endpoint("fast", fast), hedge_after=0.05)
+
+    with llm_priority("automation"):
+        chunks = list(router.client.chat.completions.create(model="m", stream=True))
+    gate.set()
+
+    assert chunks == ["fast"]
+    assert seen == ["automation", "automation"]           # 主请求与对冲请求都在工作线程里看到调用方的优先级
+    assert router.executor is router.executor and router.executor._max_workers == 4
+
+
+def test_async_hedge_cancels_the_slower_request():
+    cancelled = asyncio.Event()
+
+    class _SlowAsync:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        async def create(self, **_kwargs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    class _FastAsync:
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        async def create(self, **_kwargs):
+            return SimpleNamespace(text="fast")
+
+    router, events = _router(
+        Endpoint("slow", None, async_client=_SlowAsync()),
+        Endpoint("fast", None, async_client=_FastAsync()),
+        hedge_after=0.05,
+    )
+
+    async def main():
+        response = await router.async_client.chat.completions.create(model="m", messages=[])
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return response
+
+    assert asyncio.run(main()).text == "fast"
+    assert [e for e, _ in events] == ["llm.hedge"]
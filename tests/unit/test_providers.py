@@ -1,19 +1,22 @@
 """
-[INPUT]: pytest, pathlib, unittest.mock, agent.providers
-[OUTPUT]: provider 单测（图片编译/不支持媒体）
+[INPUT]: pytest, base64, io, pathlib, unittest.mock, agent.providers
+[OUTPUT]: provider 单测（图片编译/不支持媒体/编译缓存命中与失效/图片编码缓存与缩放）
 [POS]: tests/ 单测层，验证 provider 编解码行为
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from __future__ import annotations
 
+import base64
+import io
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 
+from athenaclaw.llm.images import ImageEncoder, provider_image_limits
 from athenaclaw.llm.messages import AttachmentRef, TurnInput, build_user_message
-from athenaclaw.llm.providers import OpenAIChatProvider, UnsupportedMediaError
+from athenaclaw.llm.providers import CompiledMessageCache, OpenAIChatProvider, UnsupportedMediaError
 
 
 def test_openai_provider_compiles_image_ref_to_data_url(tmp_path: Path):
@@ -117,3 +120,82 @@ def test_openai_provider_backfills_empty_reasoning_content_for_tool_calls():
     assert compiled[0]["role"] == "assistant"
     assert compiled[0]["reasoning_content"] == ""
     assert compiled[0]["tool_calls"][0]["function"]["name"] == "portfolio"
+
+
+def test_openai_provider_reuses_compiled_messages_until_edited(monkeypatch):
+    provider = OpenAIChatProvider(client=MagicMock())
+    calls: list[str] = []
+    original = provider._compile_message
+
+    def counting(message):
+        calls.append(message.get("role"))
+        return original(message)
+
+    monkeypatch.setattr(provider, "_compile_message", counting)
+    history = [
+        {"role": "user", "content": "查一下 BTC"},
+        {"role": "assistant", "content": "好的"},
+    ]
+    system = [{"role": "system", "content": "你是交易助手"}]
+
+    first = provider.compile_messages(system + history)
+    history.append({"role": "user", "content": "再看 ETH"})
+    second = provider.compile_messages(system + history)
+
+    assert calls == ["system", "user", "assistant", "system", "user"]
+    assert second[1] is first[1] and second[2] is first[2]
+    assert second[3]["content"][0]["text"].endswith("再看 ETH")
+
+    history[1]["content"] = "改写后的回答"            # 整体替换字段 → 视为编辑，重新编译
+    third = provider.compile_messages(history)
+    assert third[1]["content"] == "改写后的回答"
+
+    provider.invalidate_compiled()
+    calls.clear()
+    provider.compile_messages(history)
+    assert calls == ["user", "assistant", "user"]
+
+
+def test_compiled_message_cache_evicts_least_recently_used():
+    cache = CompiledMessageCache(max_entries=2)
+    a, b, c = ({"role": "user", "content": x} for x in "abc")
+    cache.put(a, {"a": 1})
+    cache.put(b, {"b": 1})
+    assert cache.get(a) == {"a": 1}
+    cache.put(c, {"c": 1})
+
+    assert cache.get(b) is None
+    assert cache.get(a) == {"a": 1} and cache.get(c) == {"c": 1}
+    assert len(cache) == 2
+
+
+def test_image_encoder_encodes_each_image_once_until_file_changes(tmp_path: Path):
+    first = tmp_path / "a.png"
+    first.write_bytes(b"chart-v1")
+    copy = tmp_path / "b.png"
+    copy.write_bytes(b"chart-v1")
+    encoder = ImageEncoder()
+
+    url = encoder.data_url(str(first), "image/png")
+    assert url == "data:image/png;base64," + base64.b64encode(b"chart-v1").decode("ascii")
+    assert encoder.data_url(str(first), "image/png") is url
+    assert encoder.data_url(str(copy), "image/png") is url        # 同内容不同路径共享编码
+    assert (encoder.hits, encoder.misses) == (2, 1)
+
+    first.write_bytes(b"chart-v2!")
+    assert encoder.data_url(str(first), "image/png").endswith(base64.b64encode(b"chart-v2!").decode("ascii"))
+    assert encoder.misses == 2
+
+
+def test_image_encoder_downscales_to_provider_limits(tmp_path: Path):
+    Image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "big.png"
+    Image.effect_noise((1600, 400), 64).convert("RGB").save(path)
+    encoder = ImageEncoder(max_side=512)
+
+    url = encoder.data_url(str(path), "image/png")
+    mime, encoded = url[len("data:"):].split(";base64,")
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as img:
+        assert img.size == (512, 128)
+    assert mime == "image/jpeg"
+    assert provider_image_limits("low") == (512, None)
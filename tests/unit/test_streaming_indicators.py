@@ -0,0 +1,94 @@
+"""
+[INPUT]: pytest, numpy, pandas, athenaclaw.tools.compute.streaming, athenaclaw.tools.compute.sandbox (ta fallback)
+[OUTPUT]: 增量指标引擎单测（与批量计算一致 / 只回放新 bar / 未收盘 bar 修订）
+[POS]: tests/ 单测层，验证 IndicatorEngine 的 O(1) 增量语义
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athenaclaw.tools.compute.sandbox import ta
+from athenaclaw.tools.compute.streaming import IndicatorEngine
+
+
+def _frame(n: int = 120, *, start: str = "2024-01-02 09:30:00", freq: str = "1min") -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=n, freq=freq),
+        "open": close + rng.normal(0, 0.1, n),
+        "high": close + 0.5,
+        "low": close - 0.5,
+        "close": close,
+        "volume": rng.integers(100, 1000, n).astype(float),
+    })
+
+
+def test_streaming_snapshot_matches_batch_indicators():
+    df = _frame()
+    engine = IndicatorEngine()
+    # 逐段喂入，模拟多次 poll
+    for end in (30, 31, 80, len(df)):
+        snap = engine.ingest("TEST", "1m", df.iloc[:end].reset_index(drop=True))
+
+    close = df["close"]
+    assert snap["bars"] == len(df)
+    assert snap["ema_20"] == pytest.approx(ta.ema(close, length=20).iloc[-1])
+    macd = ta.macd(close)
+    assert snap["macd"] == pytest.approx(macd.iloc[-1, 0])
+    assert snap["macd_signal"] == pytest.approx(macd.iloc[-1, 1])
+    assert snap["macd_hist"] == pytest.approx(macd.iloc[-1, 2])
+    assert snap["rsi_14"] == pytest.approx(ta.rsi(close, length=14).iloc[-1])
+    bb = ta.bbands(close, length=20, std=2.0)
+    assert snap["bb_lower"] == pytest.approx(bb.iloc[-1, 0])
+    assert snap["bb_middle"] == pytest.approx(bb.iloc[-1, 1])
+    assert snap["bb_upper"] == pytest.approx(bb.iloc[-1, 2])
+    assert snap["high_20"] == pytest.approx(df["high"].tail(20).max())
+    assert snap["low_20"] == pytest.approx(df["low"].tail(20).min())
+    typical = (df["high"] + df["low"] + df["close"]) / 3
+    assert snap["vwap"] == pytest.approx((typical * df["volume"]).sum() / df["volume"].sum())
+
+
+def test_streaming_warmup_fields_are_none():
+    engine = IndicatorEngine()
+    snap = engine.ingest("TEST", "1m", _frame(5))
+
+    assert snap["close"] is not None
+    assert snap["rsi_14"] is None
+    assert snap["bb_upper"] is None
+    assert snap["high_20"] is None
+
+
+def test_streaming_ignores_replayed_history_and_revises_open_bar():
+    df = _frame(40)
+    engine = IndicatorEngine()
+    engine.ingest("TEST", "1m", df)
+    before = engine.snapshot("TEST", "1m")
+
+    # 重复喂入同一段历史不会重复累计
+    assert engine.ingest("TEST", "1m", df)["bars"] == before["bars"]
+    assert engine.snapshot("TEST", "1m")["ema_20"] == pytest.approx(before["ema_20"])
+
+    # 最后一根 bar 被修订：结果等价于用修订后的完整序列重算
+    revised = df.tail(1).copy()
+    revised["close"] = revised["close"] + 3.0
+    snap = engine.ingest("TEST", "1m", revised.reset_index(drop=True))
+    expected = pd.concat([df.iloc[:-1], revised]).reset_index(drop=True)
+    assert snap["bars"] == len(df)
+    assert snap["close"] == pytest.approx(float(revised["close"].iloc[0]))
+    assert snap["ema_20"] == pytest.approx(ta.ema(expected["close"], length=20).iloc[-1])
+
+
+def test_streaming_vwap_resets_each_session():
+    day1 = _frame(10, start="2024-01-02 09:30:00")
+    day2 = _frame(10, start="2024-01-03 09:30:00")
+    engine = IndicatorEngine()
+    engine.ingest("TEST", "1m", day1)
+    snap = engine.ingest("TEST", "1m", day2)
+
+    typical = (day2["high"] + day2["low"] + day2["close"]) / 3
+    assert snap["vwap"] == pytest.approx((typical * day2["volume"]).sum() / day2["volume"].sum())